@@ -45,106 +45,144 @@ void initGenI(GenI* this, int is_avg, int npix, double* x, double* y, double* z,
 
 /**
  * Compute 2D anisotropic
+ *
+ * The q-points and pixels are processed in tiles of Q_BLOCK x PIX_BLOCK
+ * so that the pixel data of a tile stays in cache while it is applied to
+ * every q-point of the tile.  Each q-block is independent, so the caller
+ * may split the q-points between threads (the python wrapper releases
+ * the GIL) and the q-block loop is parallelized when built with OpenMP.
+ *
+ * The polarized cross sections of cal_msld are linear in the pixel slds:
+ * for a q-angle qa (measured from the y axis) and a spin angle s,
+ *     sigma_x = A cos(qa+s),  sigma_y = -A sin(qa+s),  sigma_z = my
+ * with A = mx cos(qa) - mz sin(qa).  So only the four structure factors
+ * sum(v sld e^iqr) of sld_n, mx, my and mz are accumulated over the
+ * pixels, and the spin channels are combined once per q-point.
  */
 void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out){
-	//npoints is given negative for angular averaging
 	// Assumes that q doesn't have qz component and sld_n is all real
-	//double q = 0.0;
-	//double Pi = 4.0*atan(1.0);
-	polar_sld b_sld;
-	double qr = 0.0;
-	Cplx iqr;
-	Cplx ephase;
-	Cplx comp_sld;
-
-	Cplx sumj_uu;
-	Cplx sumj_ud;
-	Cplx sumj_du;
-	Cplx sumj_dd;
-	Cplx temp_fi;
-
+	double pi = 4.0*atan(1.0);
+	double s_theta = this->stheta * pi/180.0;
+	double in_spin = this->inspin;
+	double out_spin = this->outspin;
+	double f_uu, f_dd, f_ud, f_du;
 	double count = 0.0;
-	int i, j;
+	int is_mag = 0;
+	int qb, j;
 
-	cassign(&iqr, 0.0, 0.0);
-	cassign(&ephase, 0.0, 0.0);
-	cassign(&comp_sld, 0.0, 0.0);
+	//These are needed because of the precision of inputs
+	if (in_spin < 0.0) in_spin = 0.0;
+	if (in_spin > 1.0) in_spin = 1.0;
+	if (out_spin < 0.0) out_spin = 0.0;
+	if (out_spin > 1.0) out_spin = 1.0;
+	// Spin channel weights; a channel is skipped when its weight is zero
+	f_uu = sqrt(sqrt(in_spin * out_spin));
+	f_dd = sqrt(sqrt((1.0 - in_spin) * (1.0 - out_spin)));
+	f_ud = sqrt(sqrt(in_spin * (1.0 - out_spin)));
+	f_du = sqrt(sqrt((1.0 - in_spin) * out_spin));
 
 	//Assume that pixel volumes are given in vol_pix in A^3 unit
-	//int x_size = 0; //in Ang
-	//int y_size = 0; //in Ang
-	//int z_size = 0; //in Ang
-
-	// Loop over q-values and multiply apply matrix
-
-	//printf("npoints: %d, npix: %d\n", npoints, this->n_pix);
-	for(i=0; i<npoints; i++){
-		//I_out[i] = 0.0;
-		cassign(&sumj_uu, 0.0, 0.0);
-		cassign(&sumj_ud, 0.0, 0.0);
-		cassign(&sumj_du, 0.0, 0.0);
-		cassign(&sumj_dd, 0.0, 0.0);
-		//printf("i: %d\n", i);
-		//q = sqrt(qx[i]*qx[i] + qy[i]*qy[i]); // + qz[i]*qz[i]);
-
-		for(j=0; j<this->n_pix; j++){
-			if (this->sldn_val[j]!=0.0
-				||this->mx_val[j]!=0.0
-				||this->my_val[j]!=0.0
-				||this->mz_val[j]!=0.0)
-			{
-			    // printf("i,j: %d,%d\n", i,j);
-				//anisotropic
-				cassign(&temp_fi, 0.0, 0.0);
-				cal_msld(&b_sld, 0, qx[i], qy[i], this->sldn_val[j],
-							 this->mx_val[j], this->my_val[j], this->mz_val[j],
-			 				 this->inspin, this->outspin, this->stheta);
-				qr = (qx[i]*this->x_val[j] + qy[i]*this->y_val[j]);
-				cassign(&iqr, 0.0, qr);
-				cplx_exp(&ephase, iqr);
+	//The pixels are expected to be compacted by the caller: pixels with
+	//no nuclear nor magnetic sld are not skipped here.
+	for(j=0; j<this->n_pix; j++){
+		count += this->vol_pix[j];
+		if (this->mx_val[j]!=0.0 || this->my_val[j]!=0.0 || this->mz_val[j]!=0.0){
+			is_mag = 1;
+		}
+	}
 
-				//Let's multiply pixel(atomic) volume here
-				rcmult(&ephase, this->vol_pix[j], ephase);
-				//up_up
-				if (this->inspin > 0.0 && this->outspin > 0.0){
-					cassign(&comp_sld, b_sld.uu, 0.0);
-					cplx_mult(&temp_fi, comp_sld, ephase);
-					cplx_add(&sumj_uu, sumj_uu, temp_fi);
-				}
-				//down_down
-				if (this->inspin < 1.0 && this->outspin < 1.0){
-					cassign(&comp_sld, b_sld.dd, 0.0);
-					cplx_mult(&temp_fi, comp_sld, ephase);
-					cplx_add(&sumj_dd, sumj_dd, temp_fi);
-				}
-				//up_down
-				if (this->inspin > 0.0 && this->outspin < 1.0){
-					cassign(&comp_sld, b_sld.re_ud, b_sld.im_ud);
-					cplx_mult(&temp_fi, comp_sld, ephase);
-					cplx_add(&sumj_ud, sumj_ud, temp_fi);
-				}
-				//down_up
-				if (this->inspin < 1.0 && this->outspin > 0.0){
-					cassign(&comp_sld, b_sld.re_du, b_sld.im_du);
-					cplx_mult(&temp_fi, comp_sld, ephase);
-					cplx_add(&sumj_du, sumj_du, temp_fi);
-				}
+	// Loop over blocks of q-values and accumulate the pixel tiles
+	#ifdef _OPENMP
+	#pragma omp parallel for schedule(dynamic)
+	#endif
+	for(qb=0; qb<npoints; qb+=Q_BLOCK){
+		// structure factors of sld_n, mx, my and mz for the q-block
+		Cplx sum_n[Q_BLOCK];
+		Cplx sum_mx[Q_BLOCK];
+		Cplx sum_my[Q_BLOCK];
+		Cplx sum_mz[Q_BLOCK];
+		Cplx sum_a, sumj;
+		double qr, re_e, im_e, vol, q_angle, c_q, s_q, c_qs, s_qs;
+		int i, k, pb, pend;
+		int qend = (qb + Q_BLOCK < npoints) ? qb + Q_BLOCK : npoints;
 
-				if (i == 0){
-					count += this->vol_pix[j];
+		for(i=0; i<qend-qb; i++){
+			cassign(&sum_n[i], 0.0, 0.0);
+			cassign(&sum_mx[i], 0.0, 0.0);
+			cassign(&sum_my[i], 0.0, 0.0);
+			cassign(&sum_mz[i], 0.0, 0.0);
+		}
+		for(pb=0; pb<this->n_pix; pb+=PIX_BLOCK){
+			pend = (pb + PIX_BLOCK < this->n_pix) ? pb + PIX_BLOCK : this->n_pix;
+			for(i=qb; i<qend; i++){
+				Cplx *s_n = &sum_n[i-qb];
+				for(k=pb; k<pend; k++){
+					qr = (qx[i]*this->x_val[k] + qy[i]*this->y_val[k]);
+					//Let's multiply pixel(atomic) volume here
+					vol = this->vol_pix[k];
+					re_e = vol * cos(qr);
+					im_e = vol * sin(qr);
+					s_n->re += this->sldn_val[k] * re_e;
+					s_n->im += this->sldn_val[k] * im_e;
+					if (is_mag){
+						sum_mx[i-qb].re += this->mx_val[k] * re_e;
+						sum_mx[i-qb].im += this->mx_val[k] * im_e;
+						sum_my[i-qb].re += this->my_val[k] * re_e;
+						sum_my[i-qb].im += this->my_val[k] * im_e;
+						sum_mz[i-qb].re += this->mz_val[k] * re_e;
+						sum_mz[i-qb].im += this->mz_val[k] * im_e;
+					}
 				}
 			}
 		}
-		//printf("aa%d=%g %g %d\n", i, (sumj_uu.re*sumj_uu.re + sumj_uu.im*sumj_uu.im), (sumj_dd.re*sumj_dd.re + sumj_dd.im*sumj_dd.im), count);
+		for(i=qb; i<qend; i++){
+			k = i - qb;
+			// q-angle from the y axis, as in cal_msld
+			if (qx[i] == 0.0) q_angle = pi / 2.0;
+			else q_angle = atan(qy[i]/qx[i]);
+			if (qy[i] < 0.0 && qx[i] < 0.0) q_angle -= pi;
+			else if (qy[i] > 0.0 && qx[i] < 0.0) q_angle += pi;
+			q_angle = pi/2.0 - q_angle;
+			if (q_angle > pi) q_angle -= 2.0 * pi;
+			else if (q_angle < -pi) q_angle += 2.0 * pi;
+			c_q = cos(q_angle);
+			s_q = sin(q_angle);
+			c_qs = cos(q_angle + s_theta);
+			s_qs = sin(q_angle + s_theta);
+			// mx does not contribute at q = 0
+			if (fabs(qx[i]) < 1.0e-16 && fabs(qy[i]) < 1.0e-16) c_q = 0.0;
+			sum_a.re = c_q * sum_mx[k].re - s_q * sum_mz[k].re;
+			sum_a.im = c_q * sum_mx[k].im - s_q * sum_mz[k].im;
 
-		I_out[i] = (sumj_uu.re*sumj_uu.re + sumj_uu.im*sumj_uu.im);
-		I_out[i] += (sumj_ud.re*sumj_ud.re + sumj_ud.im*sumj_ud.im);
-		I_out[i] += (sumj_du.re*sumj_du.re + sumj_du.im*sumj_du.im);
-		I_out[i] += (sumj_dd.re*sumj_dd.re + sumj_dd.im*sumj_dd.im);
+			I_out[i] = 0.0;
+			//up_up
+			if (this->inspin > 0.0 && this->outspin > 0.0){
+				sumj.re = f_uu * (sum_n[k].re - c_qs * sum_a.re);
+				sumj.im = f_uu * (sum_n[k].im - c_qs * sum_a.im);
+				I_out[i] += (sumj.re*sumj.re + sumj.im*sumj.im);
+			}
+			//down_down
+			if (this->inspin < 1.0 && this->outspin < 1.0){
+				sumj.re = f_dd * (sum_n[k].re + c_qs * sum_a.re);
+				sumj.im = f_dd * (sum_n[k].im + c_qs * sum_a.im);
+				I_out[i] += (sumj.re*sumj.re + sumj.im*sumj.im);
+			}
+			//up_down: (sigma_y + i sigma_z)
+			if (this->inspin > 0.0 && this->outspin < 1.0){
+				sumj.re = f_ud * (-s_qs * sum_a.re - sum_my[k].im);
+				sumj.im = f_ud * (-s_qs * sum_a.im + sum_my[k].re);
+				I_out[i] += (sumj.re*sumj.re + sumj.im*sumj.im);
+			}
+			//down_up: (sigma_y - i sigma_z)
+			if (this->inspin < 1.0 && this->outspin > 0.0){
+				sumj.re = f_du * (-s_qs * sum_a.re + sum_my[k].im);
+				sumj.im = f_du * (-s_qs * sum_a.im - sum_my[k].re);
+				I_out[i] += (sumj.re*sumj.re + sumj.im*sumj.im);
+			}
 
-		I_out[i] *= (1.0E+8 / count); //in cm (unit) / number; //to be multiplied by vol_pix
+			I_out[i] *= (1.0E+8 / count); //in cm (unit) / number; //to be multiplied by vol_pix
+		}
 	}
-	//printf("count = %d %g %g %g %g\n", count, this->sldn_val[0],this->mx_val[0], this->my_val[0], this->mz_val[0]);
 }
 /**
  * Compute 1D isotropic
@@ -152,41 +190,45 @@ void genicomXY(GenI* this, int npoints, double *qx, double *qy, double *I_out){
  * Also assumes there is no polarization: No dependency on spin
  */
 void genicom(GenI* this, int npoints, double *q, double *I_out){
-	//npoints is given negative for angular averaging
 	// Assumes that q doesn't have qz component and sld_n is all real
-	//double Pi = 4.0*atan(1.0);
-	double qr = 0.0;
-	double sumj;
-	double sld_j = 0.0;
 	double count = 0.0;
-	int i, j, k;
+	int i, j;
 
 	//Assume that pixel volumes are given in vol_pix in A^3 unit
+	for(j=0; j<this->n_pix; j++){
+		count += this->vol_pix[j];
+	}
+
 	// Loop over q-values and multiply apply matrix
+	#ifdef _OPENMP
+	#pragma omp parallel for schedule(dynamic)
+	#endif
 	for(i=0; i<npoints; i++){
-		sumj =0.0;
-		for(j=0; j<this->n_pix; j++){
+		double qr = 0.0;
+		double sumj = 0.0;
+		double sld_j = 0.0;
+		int jj, k;
+		for(jj=0; jj<this->n_pix; jj++){
 			//Isotropic: Assumes all slds are real (no magnetic)
 			//Also assumes there is no polarization: No dependency on spin
 			if (this->is_avg == 1){
 				// approximation for a spherical symmetric particle
-				qr = sqrt(this->x_val[j]*this->x_val[j]+this->y_val[j]*this->y_val[j]+this->z_val[j]*this->z_val[j])*q[i];
+				qr = sqrt(this->x_val[jj]*this->x_val[jj]+this->y_val[jj]*this->y_val[jj]+this->z_val[jj]*this->z_val[jj])*q[i];
 				if (qr > 0.0){
 					qr = sin(qr) / qr;
-					sumj += this->sldn_val[j] * this->vol_pix[j] * qr;
+					sumj += this->sldn_val[jj] * this->vol_pix[jj] * qr;
 				}
 				else{
-					sumj += this->sldn_val[j] * this->vol_pix[j];
+					sumj += this->sldn_val[jj] * this->vol_pix[jj];
 				}
 			}
 			else{
 				//full calculation
-				//pragma omp parallel for
 				for(k=0; k<this->n_pix; k++){
-					sld_j =  this->sldn_val[j] * this->sldn_val[k] * this->vol_pix[j] * this->vol_pix[k];
-					qr = (this->x_val[j]-this->x_val[k])*(this->x_val[j]-this->x_val[k])+
-						      (this->y_val[j]-this->y_val[k])*(this->y_val[j]-this->y_val[k])+
-						      (this->z_val[j]-this->z_val[k])*(this->z_val[j]-this->z_val[k]);
+					sld_j =  this->sldn_val[jj] * this->sldn_val[k] * this->vol_pix[jj] * this->vol_pix[k];
+					qr = (this->x_val[jj]-this->x_val[k])*(this->x_val[jj]-this->x_val[k])+
+						      (this->y_val[jj]-this->y_val[k])*(this->y_val[jj]-this->y_val[k])+
+						      (this->z_val[jj]-this->z_val[k])*(this->z_val[jj]-this->z_val[k]);
 					qr = sqrt(qr) * q[i];
 					if (qr > 0.0){
 						sumj += sld_j*sin(qr)/qr;
@@ -196,9 +238,6 @@ void genicom(GenI* this, int npoints, double *q, double *I_out){
 					}
 				}
 			}
-			if (i == 0){
-				count += this->vol_pix[j];
-			}
 		}
 		I_out[i] = sumj;
 		if (this->is_avg == 1) {
@@ -206,5 +245,4 @@ void genicom(GenI* this, int npoints, double *q, double *I_out){
 		}
 		I_out[i] *= (1.0E+8 / count); //in cm (unit) / number; //to be multiplied by vol_pix
 	}
-	//printf("count = %d %g %g %g %g\n", count, sldn_val[0],mx_val[0], my_val[0], mz_val[0]);
 }
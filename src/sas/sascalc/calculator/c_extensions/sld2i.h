@@ -4,6 +4,10 @@ Computes the (magnetic) scattering form sld (n and m) profile
 #ifndef SLD2I_CLASS_H
 #define SLD2I_CLASS_H
 
+// Tile sizes (q-points x pixels) used by genicomXY
+#define Q_BLOCK 32
+#define PIX_BLOCK 2048
+
 /**
  * Base class
  */
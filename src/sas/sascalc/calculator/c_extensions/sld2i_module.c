@@ -123,7 +123,11 @@ PyObject * genicom_inputXY(PyObject *self, PyObject *args) {
 	// Sanity check
 	//if(n_q!=n_out) return Py_BuildValue("i",-1);
 
+	// The arrays are only read (or written by this call) so other python
+	// threads may run genicomXY on other q-chunks at the same time.
+	Py_BEGIN_ALLOW_THREADS
 	genicomXY(sld2i, (int)n_qx, qx, qy, I_out);
+	Py_END_ALLOW_THREADS
 	//printf("done calc\n");
 	//return PyCObject_FromVoidPtr(s, del_genicom);
 	return Py_BuildValue("i",1);
@@ -149,7 +153,9 @@ PyObject * genicom_input(PyObject *self, PyObject *args) {
 	// Sanity check
 	//if (n_q!=n_out) return Py_BuildValue("i",-1);
 
+	Py_BEGIN_ALLOW_THREADS
 	genicom(sld2i, (int)n_q, q, I_out);
+	Py_END_ALLOW_THREADS
 	return Py_BuildValue("i",1);
 }
 
@@ -6,12 +6,20 @@ from __future__ import print_function
 
 import os
 import sys
-import copy
+import json
+import time
+import shutil
+import hashlib
 import logging
+from functools import lru_cache
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 from periodictable import formula
 from periodictable import nsf
+from periodictable import xsf
 import numpy as np
+from scipy import ndimage
 
 from . import _sld2i
 from .BaseComponent import BaseComponent
@@ -30,6 +38,8 @@ MFACTOR_MT = 2.3164E-9
 METER2ANG = 1.0E+10
 #Avogadro constant [1/mol]
 NA = 6.02214129e+23
+#Cu K-alpha wavelength [A], default for X-ray SLDs
+CU_K_ALPHA = 1.5418
 
 def mag2sld(mag, v_unit=None):
     """
@@ -78,6 +88,20 @@ class GenSAS(BaseComponent):
         self.data_mz = None
         self.data_vol = None #[A^3]
         self.is_avg = False
+        self.num_threads = 1
+        # thread pool of num_threads threads, created on first use
+        self._pool = None
+        # compacted pixel table; see _get_pixels
+        self._pixels = None
+        self._pixels_key = None
+        self._pixels_vol = 0.0
+        # Debye pair-distance histogram; see set_debye_bin_width
+        self.debye_bin_width = None
+        self._pr = None
+        # 2D evaluation backend; see set_backend
+        self.backend = 'direct'
+        self.fft_tolerance = 1.0e-3
+        self._fft = None
         ## Name of the model
         self.name = "GenSAS"
         ## Define parameters
@@ -110,6 +134,7 @@ class GenSAS(BaseComponent):
         if self.data_vol is None:
             raise TypeError("data_vol is missing")
         self.data_vol = volume
+        self._pixels = None
 
     def set_is_avg(self, is_avg=False):
         """
@@ -117,6 +142,266 @@ class GenSAS(BaseComponent):
         """
         self.is_avg = is_avg
 
+    def set_debye_bin_width(self, bin_width=None):
+        """
+        Sets the bin width of the pair distance histogram used for the
+        isotropic 1D (is_avg=False) calculation.
+
+        When set, the weighted pair distance histogram P(r) is computed once
+        per sld data and solvent sld, and I(q) is evaluated from it as a
+        sinc transform instead of the O(Nq Npix^2) direct Debye sum.  Each
+        pair distance is rounded to the nearest multiple of bin_width, so
+        the error on every pair term is below 0.22 * q * bin_width of its
+        weight (see debye_bin_width to pick a value from a tolerance).
+
+        :Param bin_width: [float] bin width in A; None for the direct sum
+        """
+        if bin_width is not None and bin_width <= 0:
+            raise ValueError("bin_width must be positive")
+        self.debye_bin_width = bin_width
+        self._pr = None
+
+    def set_backend(self, backend='direct', tolerance=1.0e-3):
+        """
+        Sets the backend used for the 2D (runXY) evaluation.
+
+        'direct' sums over every pixel for every q-point.  'fft' applies to
+        pixel data on a regular x/y grid (e.g., OMF): since q has no qz
+        component the pixels are projected along z, and the structure
+        factors are interpolated with cubic splines from a zero-padded 2D
+        FFT of the projected grid, costing O(Npix log Npix) once per sld
+        data plus O(1) per q-point.  The oversampling is chosen so that the
+        spline bound 5/384 (pi/oversampling)^4 is below tolerance, which
+        bounds the error of each structure factor by tolerance times
+        sum(volume * |sld|).  Atomic (PDB) and irregular data fall back to
+        the direct sum.
+
+        :Param backend: 'direct' or 'fft'
+        :Param tolerance: [float] relative accuracy of the fft backend
+        """
+        if backend not in ('direct', 'fft'):
+            raise ValueError("Unknown backend %r" % backend)
+        self.backend = backend
+        self.fft_tolerance = tolerance
+        self._fft = None
+
+    def set_num_threads(self, num_threads=None):
+        """
+        Sets the number of threads used to evaluate the q-points
+        :Param num_threads: [int] number of threads; None or 0 for all cores
+        """
+        if not num_threads:
+            num_threads = cpu_count()
+        num_threads = max(1, int(num_threads))
+        if num_threads != self.num_threads and self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        self.num_threads = num_threads
+
+    def __getstate__(self):
+        # the thread pool can't be copied; the copy creates its own
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def _get_pool(self):
+        """
+        Returns the thread pool, which is kept for all the evaluations
+        """
+        if self._pool is None:
+            self._pool = ThreadPool(self.num_threads)
+        return self._pool
+
+    def _compute(self, fn, model, q_list, I_out):
+        """
+        Run the C kernel *fn* on the q-points, splitting them in chunks
+        over the thread pool when num_threads > 1.  The kernel releases
+        the GIL, and each chunk writes to its own slice of I_out.
+        """
+        num_chunks = min(self.num_threads, len(I_out))
+        if num_chunks <= 1:
+            fn(model, *(q_list + [I_out]))
+            return
+        bounds = np.linspace(0, len(I_out), num_chunks + 1).astype(int)
+        chunks = [[q[lo:hi] for q in q_list] + [I_out[lo:hi]]
+                  for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self._get_pool().map(lambda args: fn(model, *args), chunks)
+
+    def _get_pixels(self):
+        """
+        Returns the pixels which contribute to the scattering as a compacted
+        struct-of-arrays: a (8, n) array whose contiguous rows are
+        x, y, z, sld_n - solvent_SLD, sld_mx, sld_my, sld_mz and volume.
+
+        The table is built once per sld data and solvent sld, and is reused
+        by every evaluation so the kernels never see empty pixels.
+        """
+        key = (self.params['solvent_SLD'], self.is_avg is None)
+        if self._pixels is not None and self._pixels_key == key:
+            return self._pixels
+        pos_x = self.data_x
+        pos_y = self.data_y
+        pos_z = self.data_z
+        if self.is_avg is None:
+            pos_x, pos_y, pos_z = transform_center(pos_x, pos_y, pos_z)
+        sldn = self.data_sldn - self.params['solvent_SLD']
+        vol = self.data_vol * np.ones_like(sldn)
+        is_nonzero = ((sldn != 0.0) | (self.data_mx != 0.0)
+                      | (self.data_my != 0.0) | (self.data_mz != 0.0))
+        columns = (pos_x, pos_y, pos_z, sldn, self.data_mx, self.data_my,
+                   self.data_mz, vol)
+        pixels = np.empty((len(columns), np.count_nonzero(is_nonzero)), 'd')
+        for row, column in zip(pixels, columns):
+            row[:] = column[is_nonzero]
+        self._pixels = pixels
+        self._pixels_key = key
+        self._pr = None
+        self._fft = None
+        # the 1D kernel normalizes by the volume of all the pixels
+        self._pixels_vol = np.sum(vol)
+        return pixels
+
+    def _get_pr(self):
+        """
+        Returns (r, P(r)), the pair distance histogram of the pixel table
+        weighted by sld_n * volume of both pixels of each pair.
+        """
+        pixels = self._get_pixels()
+        if self._pr is not None:
+            return self._pr
+        bin_width = self.debye_bin_width
+        pos = pixels[:3]
+        weight = pixels[3] * pixels[7]
+        npix = len(weight)
+        extent = np.sqrt(np.sum((pos.max(axis=1) - pos.min(axis=1))**2))
+        nbins = int(extent / bin_width + 0.5) + 1
+        hist = np.zeros(nbins)
+        # Rows are taken in blocks of ~4M pairs against the pixels j >= i;
+        # pairs j > i are counted twice and the self term once.
+        block = max(1, (1 << 22) // max(npix, 1))
+        for start in range(0, npix, block):
+            stop = min(start + block, npix)
+            dist = np.zeros((stop - start, npix - start))
+            for axis in pos:
+                dist += (axis[start:stop, None] - axis[None, start:])**2
+            index = np.rint(np.sqrt(dist) / bin_width).astype(int)
+            offset = (np.arange(start, npix)[None, :]
+                      - np.arange(start, stop)[:, None])
+            pair_weight = (weight[start:stop, None] * weight[None, start:]
+                           * np.where(offset > 0, 2.0, (offset == 0) * 1.0))
+            hist += np.bincount(index.ravel(), weights=pair_weight.ravel(),
+                                minlength=nbins)[:nbins]
+        self._pr = (np.arange(nbins) * bin_width, hist)
+        return self._pr
+
+    def _debye(self, q, I_out):
+        """
+        Evaluate the Debye sum from the pair distance histogram
+        """
+        r, hist = self._get_pr()
+        I_out[:] = np.dot(np.sinc(np.outer(q, r) / np.pi), hist)
+        I_out *= 1.0e+8 / self._pixels_vol
+
+    def _get_fft(self):
+        """
+        Returns the spline coefficients of the FFT of the z-projected pixel
+        grid for the fft backend, or None when the pixels are not on a
+        regular x/y grid.
+        """
+        pixels = self._get_pixels()
+        if self._fft is not None:
+            return self._fft or None
+        self._fft = False
+        data = self.sld_data
+        if (data is None or data.pix_type != 'pixel'
+                or not data.xstepsize or not data.ystepsize
+                or pixels.shape[1] == 0):
+            return None
+        grid = []
+        for pos, step in ((pixels[0], data.xstepsize),
+                          (pixels[1], data.ystepsize)):
+            index = np.rint((pos - pos.min()) / step).astype(int)
+            if not np.allclose(pos.min() + index * step, pos,
+                               rtol=0, atol=1.0e-6 * step):
+                return None
+            # center the grid so the transform varies slowly between nodes
+            center = index.max() // 2
+            grid.append((index - center, pos.min() + center * step, step,
+                         index.max() + 1))
+        (index_x, center_x, step_x, nx), (index_y, center_y, step_y, ny) = grid
+        oversampling = 2
+        while 5.0 / 384.0 * (np.pi / oversampling)**4 > self.fft_tolerance:
+            oversampling += 1
+        shape = (oversampling * nx, oversampling * ny)
+        # the interpolation needs a few periodic cells around the FFT
+        pad = 4
+        splines = []
+        for row in pixels[3:7]:
+            weight = row * pixels[7]
+            if not weight.any():
+                splines.append(None)
+                continue
+            projected = np.zeros(shape)
+            np.add.at(projected, (index_x % shape[0], index_y % shape[1]),
+                      weight)
+            transform = np.fft.ifft2(projected) * projected.size
+            transform = np.pad(transform, pad, mode='wrap')
+            splines.append((ndimage.spline_filter(transform.real, 3),
+                            ndimage.spline_filter(transform.imag, 3)))
+        self._fft = (center_x, center_y, step_x, step_y, shape, pad, splines)
+        return self._fft
+
+    def _gen_fft(self, fft, qx, qy, I_out):
+        """
+        Evaluate the 2D intensity from the FFT of the pixel grid
+        """
+        center_x, center_y, step_x, step_y, shape, pad, splines = fft
+        coords = [(qx * step_x * shape[0] / (2 * np.pi)) % shape[0] + pad,
+                  (qy * step_y * shape[1] / (2 * np.pi)) % shape[1] + pad]
+        phase = np.exp(1j * (qx * center_x + qy * center_y))
+        sums = []
+        for spline in splines:
+            if spline is None:
+                sums.append(np.zeros_like(phase))
+                continue
+            real = ndimage.map_coordinates(spline[0], coords, prefilter=False)
+            imag = ndimage.map_coordinates(spline[1], coords, prefilter=False)
+            sums.append(phase * (real + 1j * imag))
+        I_out[:] = self._polarized_intensity(qx, qy, *sums)
+        I_out *= 1.0e+8 / np.sum(self._get_pixels()[7])
+
+    def _polarized_intensity(self, qx, qy, sum_n, sum_mx, sum_my, sum_mz):
+        """
+        Combine the structure factors of sld_n, mx, my and mz into the
+        spin channels, as genicomXY does.
+        """
+        in_spin = min(max(self.params['Up_frac_in'], 0.0), 1.0)
+        out_spin = min(max(self.params['Up_frac_out'], 0.0), 1.0)
+        s_theta = np.radians(self.params['Up_theta'])
+        # q-angle from the y axis, as in cal_msld
+        q_angle = np.pi / 2 - np.where(qx == 0.0, np.pi / 2,
+                                       np.arctan2(qy, qx))
+        c_q = np.cos(q_angle)
+        # mx does not contribute at q = 0
+        c_q[(np.fabs(qx) < 1.0e-16) & (np.fabs(qy) < 1.0e-16)] = 0.0
+        sum_a = c_q * sum_mx - np.sin(q_angle) * sum_mz
+        c_qs = np.cos(q_angle + s_theta)
+        s_qs = np.sin(q_angle + s_theta)
+        result = np.zeros(len(qx))
+        if in_spin > 0.0 and out_spin > 0.0:
+            amp = (in_spin * out_spin)**0.25 * (sum_n - c_qs * sum_a)
+            result += np.abs(amp)**2
+        if in_spin < 1.0 and out_spin < 1.0:
+            amp = ((1 - in_spin) * (1 - out_spin))**0.25 * (sum_n + c_qs * sum_a)
+            result += np.abs(amp)**2
+        if in_spin > 0.0 and out_spin < 1.0:
+            amp = (in_spin * (1 - out_spin))**0.25 * (-s_qs * sum_a + 1j * sum_my)
+            result += np.abs(amp)**2
+        if in_spin < 1.0 and out_spin > 0.0:
+            amp = ((1 - in_spin) * out_spin)**0.25 * (-s_qs * sum_a - 1j * sum_my)
+            result += np.abs(amp)**2
+        return result
+
     def _gen(self, qx, qy):
         """
         Evaluate the function
@@ -125,36 +410,33 @@ class GenSAS(BaseComponent):
         :Param i: array of initial i-value
         :return: function value
         """
-        pos_x = self.data_x
-        pos_y = self.data_y
-        pos_z = self.data_z
-        if self.is_avg is None:
-            pos_x, pos_y, pos_z = transform_center(pos_x, pos_y, pos_z)
-        sldn = copy.deepcopy(self.data_sldn)
-        sldn -= self.params['solvent_SLD']
-        # **** WARNING **** new_GenI holds pointers to numpy vectors
-        # be sure that they are contiguous double precision arrays and make 
-        # sure the GC doesn't eat them before genicom is called.
-        # TODO: rewrite so that the parameters are passed directly to genicom
-        args = (
-            (1 if self.is_avg else 0),
-            pos_x, pos_y, pos_z,
-            sldn, self.data_mx, self.data_my,
-            self.data_mz, self.data_vol,
-            self.params['Up_frac_in'],
-            self.params['Up_frac_out'],
-            self.params['Up_theta'])
-        model = _sld2i.new_GenI(*args)
+        pixels = self._get_pixels()
         if len(qy):
             qx, qy = _vec(qx), _vec(qy)
-            I_out = np.empty_like(qx)
-            #print("npoints", qx.shape, "npixels", pos_x.shape)
-            _sld2i.genicomXY(model, qx, qy, I_out)
-            #print("I_out after", I_out)
         else:
             qx = _vec(qx)
-            I_out = np.empty_like(qx)
-            _sld2i.genicom(model, qx, I_out)
+        I_out = np.zeros_like(qx)
+        if pixels.shape[1] > 0:
+            # **** WARNING **** new_GenI holds pointers to numpy vectors
+            # be sure that they are contiguous double precision arrays and
+            # make sure the GC doesn't eat them before genicom is called.
+            # The rows of the pixel table are contiguous views.
+            args = ((1 if self.is_avg else 0),) + tuple(pixels) + (
+                self.params['Up_frac_in'],
+                self.params['Up_frac_out'],
+                self.params['Up_theta'])
+            model = _sld2i.new_GenI(*args)
+            fft = self._get_fft() if self.backend == 'fft' else None
+            if len(qy) and fft is not None:
+                self._gen_fft(fft, qx, qy, I_out)
+            elif len(qy):
+                self._compute(_sld2i.genicomXY, model, [qx, qy], I_out)
+            elif not self.is_avg and self.debye_bin_width is not None:
+                self._debye(qx, I_out)
+            else:
+                self._compute(_sld2i.genicom, model, [qx], I_out)
+                # genicom normalizes by the compacted volume only
+                I_out *= np.sum(pixels[7]) / self._pixels_vol
         vol_correction = self.data_total_volume / self.params['total_volume']
         result = (self.params['scale'] * vol_correction * I_out
                   + self.params['background'])
@@ -176,6 +458,7 @@ class GenSAS(BaseComponent):
         self.data_vol = _vec(sld_data.vol_pix)
         self.data_total_volume = sum(sld_data.vol_pix)
         self.params['total_volume'] = sum(sld_data.vol_pix)
+        self._pixels = None
 
     def getProfile(self):
         """
@@ -228,6 +511,20 @@ class GenSAS(BaseComponent):
             mesg += "a list [qx,qy] where qx,qy are arrays."
             raise RuntimeError(mesg)
 
+def debye_bin_width(qmax, tolerance=1.0e-3):
+    """
+    Returns the histogram bin width for GenSAS.set_debye_bin_width which
+    keeps the error on each pair term of the Debye sum below tolerance
+    (relative to the pair weight) for q <= qmax.
+
+    Rounding a distance by at most bin_width/2 changes sin(qr)/qr by at most
+    0.4362 * q * bin_width/2, 0.4362 being the maximum slope of sin(x)/x.
+
+    :Param qmax: [float] largest q to evaluate in 1/A
+    :Param tolerance: [float] error bound on each pair term
+    """
+    return 2.0 * tolerance / (0.4362 * qmax)
+
 def _vec(v):
     return np.ascontiguousarray(v, 'd')
 
@@ -359,142 +656,319 @@ class OMF2SLD(object):
         return self.output
 
 
-class OMFReader(object):
+# Bump when the readers or the cached objects change
+CACHE_VERSION = 2
+
+class CachedReader(object):
+    """
+    Base class for the model readers, which can keep a binary copy of the
+    loaded object keyed on the content hash of the source file, so that a
+    file is only parsed the first time it is read.
+
+    The cache is off unless use_cache is set. Each cached object is a
+    directory holding a .npy file per array, which are memory-mapped when
+    loaded. The entries older than cache_max_age and, past cache_max_bytes,
+    the least recently used entries are removed after each new entry.
+
+    Subclasses implement _read(path).
     """
-    Class to load omf/ascii files (3 columns w/header).
+    ## Set to True to keep the loaded objects in the cache directory
+    use_cache = False
+    ## Cache directory; defaults to sld_cache in the user directory
+    cache_dir = None
+    ## Total size of the cache [bytes]
+    cache_max_bytes = 2**30
+    ## Age of the entries not used since then are removed [s]
+    cache_max_age = 30 * 24 * 3600
+
+    def read(self, path):
+        """
+        Load data file, from the cache when it holds the same content
+        :param path: file path
+        """
+        if not self.use_cache:
+            return self._read(path)
+        cache_path = None
+        try:
+            cache_path = self._cache_path(path)
+            if os.path.isdir(cache_path):
+                output = load_cache(cache_path)
+                output.filename = os.path.basename(path)
+                # mark the entry as recently used
+                os.utime(cache_path, None)
+                return output
+        except Exception as exc:
+            logger.warning("Ignoring model cache of %s: %s" % (path, exc))
+        output = self._read(path)
+        if cache_path is not None:
+            try:
+                save_cache(cache_path, output)
+                prune_cache(os.path.dirname(cache_path),
+                            self.cache_max_bytes, self.cache_max_age)
+            except Exception as exc:
+                logger.warning("Could not cache %s: %s" % (path, exc))
+        return output
+
+    def _cache_key(self):
+        """
+        Reader options which change the loaded object
+        """
+        return "%s:%d" % (self.__class__.__name__, CACHE_VERSION)
+
+    def _cache_path(self, path):
+        """
+        Returns the cache directory of the content of path
+        """
+        digest = hashlib.sha1(self._cache_key().encode())
+        with open(path, 'rb') as input_f:
+            for chunk in iter(lambda: input_f.read(1 << 20), b''):
+                digest.update(chunk)
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            import sas
+            cache_dir = os.path.join(sas.get_user_dir(), 'sld_cache')
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        return os.path.join(cache_dir, digest.hexdigest())
+
+def save_cache(path, data):
+    """
+    Save a MagSLD or OMFData object to the directory path
+
+    Arrays are stored as .npy files, the bond lists as (n, 2) arrays, and
+    the other attributes in a json header.
+    """
+    arrays = {}
+    meta = {'class': data.__class__.__name__, 'attrs': {}, 'lists': []}
+    for name, value in data.__dict__.items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, list):
+            arrays[name] = np.array(value)
+            meta['lists'].append(name)
+        elif isinstance(value, np.generic):
+            meta['attrs'][name] = value.item()
+        else:
+            meta['attrs'][name] = value
+    meta['arrays'] = sorted(arrays)
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    os.makedirs(tmp_path)
+    try:
+        for name, value in arrays.items():
+            np.save(os.path.join(tmp_path, name + '.npy'), value)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as output_f:
+            json.dump(meta, output_f)
+        os.rename(tmp_path, path)
+    finally:
+        # another process got there first, or the entry is incomplete
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+
+def load_cache(path):
+    """
+    Load a MagSLD or OMFData object saved by save_cache
+
+    The arrays are memory-mapped copy-on-write: they are read from the
+    cache as they are used, and changing them does not change the cache.
+    """
+    classes = {'MagSLD': MagSLD, 'OMFData': OMFData}
+    with open(os.path.join(path, 'meta.json')) as input_f:
+        meta = json.load(input_f)
+    output = classes[meta['class']].__new__(classes[meta['class']])
+    output.__dict__.update(meta['attrs'])
+    for name in meta['arrays']:
+        value = np.load(os.path.join(path, name + '.npy'), mmap_mode='c',
+                        allow_pickle=False)
+        if name in meta['lists']:
+            value = [tuple(item) for item in value.tolist()]
+        setattr(output, name, value)
+    return output
+
+def _disk_size(path):
+    """
+    Returns the size of a file or of the files of a directory
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path))
+
+def prune_cache(cache_dir, max_bytes=None, max_age=None):
+    """
+    Remove the cache entries last used more than max_age seconds ago, then
+    the least recently used ones until the cache holds at most max_bytes
+
+    :param cache_dir: cache directory
+    :param max_bytes: total size of the cache, or None for no limit
+    :param max_age: age of the entries in seconds, or None for no limit
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.tmp'):
+            # being written
+            continue
+        path = os.path.join(cache_dir, name)
+        entries.append((os.path.getmtime(path), _disk_size(path), path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        too_old = max_age is not None and now - mtime > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            break
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+        total -= size
+
+class OMFReader(CachedReader):
+    """
+    Class to load omf/ovf files: OOMMF text data (3 columns w/header), and
+    OVF 2.0 (or 1.0) binary 4 and binary 8 data segments.
     """
     ## File type
     type_name = "OMF ASCII"
 
     ## Wildcards
-    type = ["OMF files (*.OMF, *.omf)|*.omf"]
+    type = ["OMF files (*.OMF, *.omf)|*.omf",
+            "OVF files (*.OVF, *.ovf)|*.ovf"]
     ## List of allowed extensions
-    ext = ['.omf', '.OMF']
+    ext = ['.omf', '.OMF', '.ovf', '.OVF']
 
-    def read(self, path):
+    ## Header entries copied to OMFData, scaled to A when in mesh units
+    _mesh_keys = ['xbase', 'ybase', 'zbase', 'xstepsize', 'ystepsize',
+                  'zstepsize', 'xmin', 'ymin', 'zmin', 'xmax', 'ymax', 'zmax']
+    _node_keys = ['xnodes', 'ynodes', 'znodes']
+    ## Check values of the binary data segments
+    _binary_check = {4: 1234567.0, 8: 123456789012345.0}
+
+    def _read(self, path):
         """
         Load data file
         :param path: file path
         :return: x, y, z, sld_n, sld_mx, sld_my, sld_mz
         """
-        desc = ""
-        mx = np.zeros(0)
-        my = np.zeros(0)
-        mz = np.zeros(0)
         try:
-            input_f = open(path, 'rb')
-            buff = decode(input_f.read())
-            lines = buff.split('\n')
-            input_f.close()
+            with open(path, 'rb') as input_f:
+                header, data_type = self._read_header(input_f)
+                count = 1
+                for key in self._node_keys:
+                    count *= int(float(header[key]))
+                count *= int(header.get('valuedim', 3))
+                if data_type == 'text':
+                    values = self._read_text(input_f, count)
+                else:
+                    values = self._read_binary(input_f, int(data_type[1]),
+                                               count)
+            valueunit = header.get('valueunit', None)
+            if valueunit is None and 'valueunits' in header:
+                valueunit = header['valueunits'].split()[0]
+            meshunit = header['meshunit']
+            if meshunit.count("m") < 1:
+                msg = "Error: \n"
+                msg += "We accept only m as meshunit"
+                raise ValueError(msg)
+            values = values.reshape(-1, 3)
+            # Magnitudes for OVF 2.0 files which do not store the range
+            if 'valuerangeminmag' not in header:
+                magnitude = np.sqrt(np.sum(values**2, axis=1))
+                header['valuerangeminmag'] = magnitude.min()
+                header['valuerangemaxmag'] = magnitude.max()
+            sld_m = mag2sld(values, valueunit)
+
             output = OMFData()
-            valueunit = None
-            for line in lines:
-                line = line.strip()
-                # Read data
-                if line and not line.startswith('#'):
-                    try:
-                        toks = line.split()
-                        _mx = float(toks[0])
-                        _my = float(toks[1])
-                        _mz = float(toks[2])
-                        _mx = mag2sld(_mx, valueunit)
-                        _my = mag2sld(_my, valueunit)
-                        _mz = mag2sld(_mz, valueunit)
-                        mx = np.append(mx, _mx)
-                        my = np.append(my, _my)
-                        mz = np.append(mz, _mz)
-                    except Exception as exc:
-                        # Skip non-data lines
-                        logger.error(str(exc)+" when processing %r"%line)
-                #Reading Header; Segment count ignored
-                s_line = line.split(":", 1)
-                if s_line[0].lower().count("oommf") > 0:
-                    oommf = s_line[1].lstrip()
-                if s_line[0].lower().count("title") > 0:
-                    title = s_line[1].lstrip()
-                if s_line[0].lower().count("desc") > 0:
-                    desc += s_line[1].lstrip()
-                    desc += '\n'
-                if s_line[0].lower().count("meshtype") > 0:
-                    meshtype = s_line[1].lstrip()
-                if s_line[0].lower().count("meshunit") > 0:
-                    meshunit = s_line[1].lstrip()
-                    if meshunit.count("m") < 1:
-                        msg = "Error: \n"
-                        msg += "We accept only m as meshunit"
-                        raise ValueError(msg)
-                if s_line[0].lower().count("xbase") > 0:
-                    xbase = s_line[1].lstrip()
-                if s_line[0].lower().count("ybase") > 0:
-                    ybase = s_line[1].lstrip()
-                if s_line[0].lower().count("zbase") > 0:
-                    zbase = s_line[1].lstrip()
-                if s_line[0].lower().count("xstepsize") > 0:
-                    xstepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("ystepsize") > 0:
-                    ystepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("zstepsize") > 0:
-                    zstepsize = s_line[1].lstrip()
-                if s_line[0].lower().count("xnodes") > 0:
-                    xnodes = s_line[1].lstrip()
-                if s_line[0].lower().count("ynodes") > 0:
-                    ynodes = s_line[1].lstrip()
-                if s_line[0].lower().count("znodes") > 0:
-                    znodes = s_line[1].lstrip()
-                if s_line[0].lower().count("xmin") > 0:
-                    xmin = s_line[1].lstrip()
-                if s_line[0].lower().count("ymin") > 0:
-                    ymin = s_line[1].lstrip()
-                if s_line[0].lower().count("zmin") > 0:
-                    zmin = s_line[1].lstrip()
-                if s_line[0].lower().count("xmax") > 0:
-                    xmax = s_line[1].lstrip()
-                if s_line[0].lower().count("ymax") > 0:
-                    ymax = s_line[1].lstrip()
-                if s_line[0].lower().count("zmax") > 0:
-                    zmax = s_line[1].lstrip()
-                if s_line[0].lower().count("valueunit") > 0:
-                    valueunit = s_line[1].lstrip().rstrip()
-                if s_line[0].lower().count("valuemultiplier") > 0:
-                    valuemultiplier = s_line[1].lstrip()
-                if s_line[0].lower().count("valuerangeminmag") > 0:
-                    valuerangeminmag = s_line[1].lstrip()
-                if s_line[0].lower().count("valuerangemaxmag") > 0:
-                    valuerangemaxmag = s_line[1].lstrip()
-                if s_line[0].lower().count("end") > 0:
-                    output.filename = os.path.basename(path)
-                    output.oommf = oommf
-                    output.title = title
-                    output.desc = desc
-                    output.meshtype = meshtype
-                    output.xbase = float(xbase) * METER2ANG
-                    output.ybase = float(ybase) * METER2ANG
-                    output.zbase = float(zbase) * METER2ANG
-                    output.xstepsize = float(xstepsize) * METER2ANG
-                    output.ystepsize = float(ystepsize) * METER2ANG
-                    output.zstepsize = float(zstepsize) * METER2ANG
-                    output.xnodes = float(xnodes)
-                    output.ynodes = float(ynodes)
-                    output.znodes = float(znodes)
-                    output.xmin = float(xmin) * METER2ANG
-                    output.ymin = float(ymin) * METER2ANG
-                    output.zmin = float(zmin) * METER2ANG
-                    output.xmax = float(xmax) * METER2ANG
-                    output.ymax = float(ymax) * METER2ANG
-                    output.zmax = float(zmax) * METER2ANG
-                    output.valuemultiplier = valuemultiplier
-                    output.valuerangeminmag = mag2sld(float(valuerangeminmag), \
-                                                      valueunit)
-                    output.valuerangemaxmag = mag2sld(float(valuerangemaxmag), \
-                                                      valueunit)
-            output.set_m(mx, my, mz)
+            output.filename = os.path.basename(path)
+            output.oommf = header['oommf']
+            output.title = header.get('title', '')
+            output.desc = header.get('desc', '')
+            output.meshtype = header['meshtype']
+            for key in self._mesh_keys:
+                setattr(output, key, float(header[key]) * METER2ANG)
+            for key in self._node_keys:
+                setattr(output, key, float(header[key]))
+            output.valuemultiplier = header.get('valuemultiplier', 1.)
+            output.valuerangeminmag = mag2sld(
+                float(header['valuerangeminmag']), valueunit)
+            output.valuerangemaxmag = mag2sld(
+                float(header['valuerangemaxmag']), valueunit)
+            output.set_m(np.ascontiguousarray(sld_m[:, 0]),
+                         np.ascontiguousarray(sld_m[:, 1]),
+                         np.ascontiguousarray(sld_m[:, 2]))
             return output
         except Exception:
             msg = "%s is not supported: \n" % path
-            msg += "We accept only Text format OMF file."
+            msg += "We accept only Text or Binary 4/8 format OMF file."
             raise RuntimeError(msg)
 
-class PDBReader(object):
+    def _read_header(self, input_f):
+        """
+        Read the header lines up to the start of the data segment.
+
+        :return: dict of the lower case header entries, and the data type
+            ('text', 'b4' or 'b8')
+        """
+        header = {'desc': ''}
+        for line in iter(input_f.readline, b''):
+            line = decode(line).strip()
+            if not line.startswith('#'):
+                continue
+            s_line = line.lstrip('#').split(":", 1)
+            key = s_line[0].strip().lower()
+            if key.startswith('oommf'):
+                # "OOMMF: rectangular mesh v1.0" or "OOMMF OVF 2.0"
+                header['oommf'] = (s_line[1] if len(s_line) > 1
+                                   else key[5:]).strip()
+            elif len(s_line) < 2:
+                continue
+            elif key == 'desc':
+                header['desc'] += s_line[1].strip() + '\n'
+            elif key == 'begin' and s_line[1].lower().split()[0] == 'data':
+                toks = s_line[1].lower().split()
+                if toks[1] == 'text':
+                    return header, 'text'
+                if toks[1] == 'binary' and int(toks[2]) in (4, 8):
+                    return header, 'b' + toks[2]
+                raise ValueError("Unsupported data type %r" % s_line[1])
+            else:
+                header[key] = s_line[1].strip()
+        raise ValueError("No data segment")
+
+    def _read_text(self, input_f, count):
+        """
+        Parse the text data segment in one pass.
+        """
+        buff = input_f.read()
+        end = buff.find(b'#')
+        if end >= 0:
+            buff = buff[:end]
+        values = np.array(buff.split(), dtype=float)
+        if len(values) != count:
+            raise ValueError("Expected %d values, got %d"
+                             % (count, len(values)))
+        return values
+
+    def _read_binary(self, input_f, size, count):
+        """
+        Read a binary data segment of 4 or 8 byte floats.  OVF 2.0 is little
+        endian and OVF 1.0 big endian; the leading check value tells which.
+        """
+        kind = 'f%d' % size
+        check = np.frombuffer(input_f.read(size), dtype='<' + kind)[0]
+        if check == self._binary_check[size]:
+            dtype = '<' + kind
+        elif check.byteswap() == self._binary_check[size]:
+            dtype = '>' + kind
+        else:
+            raise ValueError("Invalid binary check value")
+        values = np.frombuffer(input_f.read(count * size), dtype=dtype)
+        if len(values) != count:
+            raise ValueError("Expected %d values, got %d"
+                             % (count, len(values)))
+        return values.astype(float)
+
+class PDBReader(CachedReader):
     """
     PDB reader class: limited for reading the lines starting with 'ATOM'
     """
@@ -504,7 +978,22 @@ class PDBReader(object):
     ## List of allowed extensions
     ext = ['.pdb', '.PDB']
 
-    def read(self, path):
+    def __init__(self, probe='neutron', wavelength=None):
+        """
+        :param probe: 'neutron' or 'xray' SLD of the atoms
+        :param wavelength: X-ray wavelength [A], Cu K-alpha by default
+        """
+        self.probe = probe
+        self.wavelength = wavelength
+
+    def _cache_key(self):
+        """
+        The atom SLDs depend on the probe
+        """
+        return "%s:%s:%s" % (CachedReader._cache_key(self), self.probe,
+                             self.wavelength)
+
+    def _read(self, path):
         """
         Load data file
 
@@ -512,103 +1001,69 @@ class PDBReader(object):
         :return: MagSLD
         :raise RuntimeError: when the file can't be opened
         """
-        pos_x = np.zeros(0)
-        pos_y = np.zeros(0)
-        pos_z = np.zeros(0)
-        sld_n = np.zeros(0)
-        sld_mx = np.zeros(0)
-        sld_my = np.zeros(0)
-        sld_mz = np.zeros(0)
-        vol_pix = np.zeros(0)
-        pix_symbol = np.zeros(0)
+        pos_x = []
+        pos_y = []
+        pos_z = []
+        sld_n = []
+        vol_pix = []
+        pix_symbol = []
         x_line = []
         y_line = []
         z_line = []
-        x_lines = []
-        y_lines = []
-        z_lines = []
+        # bonds already drawn, as (lower, higher) atom index pairs
+        bonds = set()
         try:
-            input_f = open(path, 'rb')
-            buff = decode(input_f.read())
-            lines = buff.split('\n')
-            input_f.close()
-            num = 0
+            with open(path, 'rb') as input_f:
+                lines = decode(input_f.read()).split('\n')
             for line in lines:
                 try:
+                    record = line[0:6].strip()
                     # check if line starts with "ATOM"
-                    if line[0:6].strip().count('ATM') > 0 or \
-                                line[0:6].strip() == 'ATOM':
+                    if record.count('ATM') > 0 or record == 'ATOM':
                         # define fields of interest
-                        atom_name = line[12:16].strip()
-                        try:
-                            float(line[12])
-                            atom_name = atom_name[1].upper()
-                        except Exception:
-                            if len(atom_name) == 4:
-                                atom_name = atom_name[0].upper()
-                            elif line[12] != ' ':
-                                atom_name = atom_name[0].upper() + \
-                                        atom_name[1].lower()
-                            else:
-                                atom_name = atom_name[0].upper()
-                        _pos_x = float(line[30:38].strip())
-                        _pos_y = float(line[38:46].strip())
-                        _pos_z = float(line[46:54].strip())
-                        pos_x = np.append(pos_x, _pos_x)
-                        pos_y = np.append(pos_y, _pos_y)
-                        pos_z = np.append(pos_z, _pos_z)
-                        try:
-                            val = nsf.neutron_sld(atom_name)[0]
-                            # sld in Ang^-2 unit
-                            val *= 1.0e-6
-                            sld_n = np.append(sld_n, val)
-                            atom = formula(atom_name)
-                            # cm to A units
-                            vol = 1.0e+24 * atom.mass / atom.density / NA
-                            vol_pix = np.append(vol_pix, vol)
-                        except Exception:
-                            logger.error("Error: set the sld of %s to zero"% atom_name)
-                            sld_n = np.append(sld_n, 0.0)
-                        sld_mx = np.append(sld_mx, 0)
-                        sld_my = np.append(sld_my, 0)
-                        sld_mz = np.append(sld_mz, 0)
-                        pix_symbol = np.append(pix_symbol, atom_name)
-                    elif line[0:6].strip().count('CONECT') > 0:
+                        atom_name = _pdb_atom_name(line)
+                        pos_x.append(float(line[30:38].strip()))
+                        pos_y.append(float(line[38:46].strip()))
+                        pos_z.append(float(line[46:54].strip()))
+                        props = element_sld(atom_name, self.probe,
+                                            self.wavelength)
+                        if props is not None:
+                            sld_n.append(props[0])
+                            vol_pix.append(props[1])
+                        else:
+                            sld_n.append(0.0)
+                        pix_symbol.append(atom_name)
+                    elif record.count('CONECT') > 0:
                         toks = line.split()
                         num = int(toks[1]) - 1
-                        val_list = []
                         for val in toks[2:]:
                             try:
-                                int_val = int(val)
+                                index = int(val) - 1
                             except Exception:
                                 break
-                            if int_val == 0:
+                            if index == -1:
                                 break
-                            val_list.append(int_val)
-                        #need val_list ordered
-                        for val in val_list:
-                            index = val - 1
-                            if (pos_x[index], pos_x[num]) in x_line and \
-                               (pos_y[index], pos_y[num]) in y_line and \
-                               (pos_z[index], pos_z[num]) in z_line:
+                            bond = (min(num, index), max(num, index))
+                            if bond in bonds:
                                 continue
+                            bonds.add(bond)
                             x_line.append((pos_x[num], pos_x[index]))
                             y_line.append((pos_y[num], pos_y[index]))
                             z_line.append((pos_z[num], pos_z[index]))
-                    if len(x_line) > 0:
-                        x_lines.append(x_line)
-                        y_lines.append(y_line)
-                        z_lines.append(z_line)
                 except Exception as exc:
                     logger.error(exc)
 
-            output = MagSLD(pos_x, pos_y, pos_z, sld_n, sld_mx, sld_my, sld_mz)
+            pos_x = np.array(pos_x)
+            sld_mx = np.zeros(len(pos_x))
+            output = MagSLD(pos_x, np.array(pos_y), np.array(pos_z),
+                            np.array(sld_n), sld_mx, sld_mx.copy(),
+                            sld_mx.copy())
             output.set_conect_lines(x_line, y_line, z_line)
             output.filename = os.path.basename(path)
             output.set_pix_type('atom')
-            output.set_pixel_symbols(pix_symbol)
+            output.set_pixel_symbols(np.array(pix_symbol))
             output.set_nodes()
-            output.set_pixel_volumes(vol_pix)
+            output.set_pixel_volumes(np.array(vol_pix))
             output.sld_unit = '1/A^(2)'
             return output
         except Exception:
@@ -620,7 +1075,58 @@ class PDBReader(object):
         """
         print("Not implemented... ")
 
-class SLDReader(object):
+def element_sld(symbol, probe='neutron', wavelength=None):
+    """
+    Returns the SLD [1/A^2] and atomic volume [A^3] of an element, or None
+    when periodictable does not know it.
+
+    The values are memoized, since a PDB file repeats a handful of elements
+    over every ATOM line.
+
+    :param symbol: element symbol
+    :param probe: 'neutron' or 'xray'
+    :param wavelength: X-ray wavelength [A], Cu K-alpha by default
+    """
+    if probe not in ('neutron', 'xray'):
+        raise ValueError("Unknown probe %r" % probe)
+    return _element_sld(symbol, probe, wavelength)
+
+@lru_cache(maxsize=1024)
+def _element_sld(symbol, probe, wavelength):
+    """
+    Looks up element_sld in periodictable
+    """
+    try:
+        atom = formula(symbol)
+        if probe == 'neutron':
+            val = nsf.neutron_sld(atom)[0]
+        else:
+            val = xsf.xray_sld(atom, wavelength=wavelength or CU_K_ALPHA)[0]
+        # sld in Ang^-2 unit; cm to A units for the volume
+        return (val * 1.0e-6, 1.0e+24 * atom.mass / atom.density / NA)
+    except Exception:
+        logger.error("Error: set the sld of %s to zero"% symbol)
+        return None
+
+def _pdb_atom_name(line):
+    """
+    Returns the element symbol of a PDB ATOM/HETATM line
+    """
+    atom_name = line[12:16].strip()
+    try:
+        float(line[12])
+        atom_name = atom_name[1].upper()
+    except Exception:
+        if len(atom_name) == 4:
+            atom_name = atom_name[0].upper()
+        elif line[12] != ' ':
+            atom_name = atom_name[0].upper() + \
+                    atom_name[1].lower()
+        else:
+            atom_name = atom_name[0].upper()
+    return atom_name
+
+class SLDReader(CachedReader):
     """
     Class to load ascii files (7 columns).
     """
@@ -632,7 +1138,7 @@ class SLDReader(object):
             "all files (*.*)|*.*"]
     ## List of allowed extensions
     ext = ['.sld', '.SLD', '.txt', '.TXT', '.*']
-    def read(self, path):
+    def _read(self, path):
         """
         Load data file
         :param path: file path
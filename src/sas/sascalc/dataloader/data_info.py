@@ -23,9 +23,8 @@ from __future__ import print_function
 
 #from sas.guitools.plottables import Data1D as plottable_1D
 from sas.sascalc.data_util.uncertainty import Uncertainty
+import copy
 import numpy as np
-import math
-from math import fabs
 
 class plottable_1D(object):
     """
@@ -82,6 +81,80 @@ class plottable_1D(object):
         self._yunit = unit
 
 
+class PolarIndex(object):
+    """
+    Polar coordinates of the pixels of a 2D data set.
+
+    The finite pixels are also kept sorted by |q| so that the pixels of
+    a ring are found with a binary search instead of a pass over the
+    whole detector. The index is only valid for the arrays it was built
+    from; use plottable_2D.get_polar_index to get an up to date one.
+    """
+    def __init__(self, data2D):
+        self._source = self._get_source(data2D)
+        qx_data = np.asarray(data2D.qx_data, dtype=float)
+        qy_data = np.asarray(data2D.qy_data, dtype=float)
+        ## Pixels with a finite intensity
+        self.finite = np.isfinite(data2D.data)
+        ## Position of each pixel among the finite pixels
+        self.finite_rank = np.cumsum(self.finite) - 1
+        ## |q| of each pixel
+        if data2D.q_data is not None and \
+                np.shape(data2D.q_data) == qx_data.shape:
+            self.q = np.asarray(data2D.q_data, dtype=float)
+        else:
+            self.q = np.sqrt(qx_data * qx_data + qy_data * qy_data)
+        ## Angle of each pixel, -pi <= phi <= pi
+        self.phi = np.arctan2(qy_data, qx_data)
+        ## Finite pixels sorted by |q|
+        finite_pixels = np.flatnonzero(self.finite)
+        self.order = finite_pixels[np.argsort(self.q[finite_pixels],
+                                              kind='mergesort')]
+        self.q_sorted = self.q[self.order]
+        self._dq = None
+
+    @staticmethod
+    def _get_source(data2D):
+        return (data2D.data, data2D.qx_data, data2D.qy_data,
+                data2D.q_data, data2D.mask, data2D.dqx_data, data2D.dqy_data)
+
+    def get_dq(self, data2D):
+        """
+        Get the 1D resolution of the finite pixels, computing it on the
+        first call.
+
+        :param data2D: 2D data set the index was built from
+        :return: dq of each finite pixel, indexed by finite_rank
+        """
+        if self._dq is None:
+            from .manipulations import get_dq_data
+            self._dq = get_dq_data(data2D)
+        return self._dq
+
+    def is_current(self, data2D):
+        """
+        Check that the data arrays were not replaced since the index
+        was built.
+
+        :param data2D: 2D data set
+        :return: True if the index describes data2D
+        """
+        return all(old is new for old, new in
+                   zip(self._source, self._get_source(data2D)))
+
+    def ring(self, r_min, r_max):
+        """
+        Find the finite pixels with r_min <= |q| <= r_max.
+
+        :param r_min: minimum |q|
+        :param r_max: maximum |q|
+        :return: array of pixel indices, in detector order
+        """
+        start = np.searchsorted(self.q_sorted, r_min, side='left')
+        stop = np.searchsorted(self.q_sorted, r_max, side='right')
+        return np.sort(self.order[start:stop])
+
+
 class plottable_2D(object):
     """
     Data2D is a place holder for 2D plottables.
@@ -98,6 +171,7 @@ class plottable_2D(object):
     dqx_data = None
     dqy_data = None
     mask = None
+    _polar_index = None
 
     # Units
     _xaxis = ''
@@ -146,6 +220,26 @@ class plottable_2D(object):
         self._zaxis = label
         self._zunit = unit
 
+    def __getstate__(self):
+        # The polar index describes the arrays of this object: copies,
+        # whose arrays may then be changed in place, build their own
+        state = self.__dict__.copy()
+        state.pop('_polar_index', None)
+        return state
+
+    def get_polar_index(self):
+        """
+        Get the polar coordinate index of the pixels, building it when
+        the data, q, mask or dq arrays have been replaced since the last
+        call. Copies of the data set don't share its index.
+        Arrays of this object modified in place are not detected.
+
+        :return: PolarIndex object
+        """
+        if self._polar_index is None or not self._polar_index.is_current(self):
+            self._polar_index = PolarIndex(self)
+        return self._polar_index
+
 
 class Vector(object):
     """
@@ -710,6 +804,12 @@ class Data1D(plottable_1D, DataInfo):
     """
     1D data class
     """
+    ## Operations with a data set on other x values interpolate it at the
+    ## x values of this one when set to 'linear' or 'log', see interpolate
+    interpolation = None
+    ## Arrays of x length, carried over by interpolate
+    _point_arrays = ('x', 'y', 'dx', 'dy', 'dxl', 'dxw', 'lam', 'dlam')
+
     def __init__(self, x=None, y=None, dx=None, dy=None, lam=None, dlam=None, isSesans=None):
         DataInfo.__init__(self)
         plottable_1D.__init__(self, x, y, dx, dy,None, None, lam, dlam)
@@ -748,6 +848,114 @@ class Data1D(plottable_1D, DataInfo):
             return False
         return _check(self.dxl) or _check(self.dxw)
 
+    def interpolate(self, x, scale='linear'):
+        """
+        Interpolate the data set at new x values, propagating the errors of
+        the two neighbouring points. Resolutions are interpolated linearly.
+
+        :param x: new x values, within the x range of the data
+        :param scale: 'linear' to interpolate y linearly in x, or 'log' to
+            interpolate log(y) linearly in log(x) where y is positive
+        :return: new data set of the same class
+        :raise ValueError: when x is outside of the data range
+        """
+        x = np.asarray(x, dtype=float)
+        x_data = np.asarray(self.x, dtype=float)
+        order = np.argsort(x_data, kind='mergesort')
+        x_data = x_data[order]
+        if len(x_data) < 2 or (len(x) > 0 and
+                               (x.min() < x_data[0] or x.max() > x_data[-1])):
+            msg = "Unable to interpolate: x-values outside of the data range"
+            raise ValueError(msg)
+        if scale == 'log':
+            if x_data[0] <= 0:
+                msg = "Unable to interpolate: x-values are not all positive"
+                raise ValueError(msg)
+            x, x_data = np.log(x), np.log(x_data)
+        elif scale != 'linear':
+            raise ValueError("Unknown interpolation scale: %s" % scale)
+
+        # Interpolate between the points low and low + 1
+        low = np.searchsorted(x_data, x, side='right') - 1
+        low = np.clip(low, 0, len(x_data) - 2)
+        high = low + 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = (x - x_data[low]) / (x_data[high] - x_data[low])
+        # Repeated x values
+        weight[~np.isfinite(weight)] = 0.0
+
+        def _interpolate(values):
+            values = np.asarray(values, dtype=float)[order]
+            return (1 - weight)*values[low] + weight*values[high]
+
+        y = np.asarray(self.y, dtype=float)[order]
+        dy = self.dy
+        if dy is None or len(dy) != len(y):
+            dy = np.zeros(len(y))
+        dy = np.asarray(dy, dtype=float)[order]
+        y_new = (1 - weight)*y[low] + weight*y[high]
+        dy_new = np.sqrt(((1 - weight)*dy[low])**2 + (weight*dy[high])**2)
+        if scale == 'log':
+            positive = (y[low] > 0) & (y[high] > 0)
+            w_pos, low_pos, high_pos = weight[positive], low[positive], \
+                high[positive]
+            y_low, y_high = y[low_pos], y[high_pos]
+            y_log = np.exp((1 - w_pos)*np.log(y_low) + w_pos*np.log(y_high))
+            relative = np.sqrt(((1 - w_pos)*dy[low_pos]/y_low)**2
+                               + (w_pos*dy[high_pos]/y_high)**2)
+            y_new[positive] = y_log
+            dy_new[positive] = y_log*relative
+
+        arrays = dict(x=np.exp(x) if scale == 'log' else x, y=y_new,
+                      dy=dy_new)
+        for name in ('dx', 'dxl', 'dxw'):
+            values = getattr(self, name)
+            if values is not None and len(values) == len(y):
+                arrays[name] = _interpolate(values)
+        return self._copy_with_arrays(arrays)
+
+    def _copy_with_arrays(self, arrays):
+        """
+        Shallow copy of the data set with new point arrays; the arrays that
+        are not given are set to None
+
+        :param arrays: dictionary of x, y, dx, dy, dxl, dxw, lam and dlam
+        """
+        data = copy.copy(self)
+        for name in self._point_arrays:
+            setattr(data, name, arrays.get(name))
+        data.interpolation = None
+        return data
+
+    def _common_x_operands(self, other):
+        """
+        Operands of an operation with the other data set, on the x values of
+        this one. When interpolation is set and x values differ, the points
+        of this data set outside of the other's x range are dropped, and the
+        other data set is interpolated at the remaining x values.
+
+        :param other: other operand
+        :return: this data set or a copy, other operand
+        :raise ValueError: when the x ranges do not overlap
+        """
+        if self.interpolation is None or not isinstance(other, Data1D):
+            return self, other
+        x = np.asarray(self.x, dtype=float)
+        x_other = np.asarray(other.x, dtype=float)
+        if len(x) == len(x_other) and np.array_equal(x, x_other):
+            return self, other
+        inside = (x >= x_other.min()) & (x <= x_other.max())
+        if not inside.any():
+            msg = "Incompatible data sets: x-ranges do not overlap"
+            raise ValueError(msg)
+        arrays = {}
+        for name in self._point_arrays:
+            values = getattr(self, name)
+            if values is not None and len(values) == len(x):
+                arrays[name] = np.asarray(values)[inside]
+        data = self._copy_with_arrays(arrays)
+        return data, other.interpolate(data.x, self.interpolation)
+
     def clone_without_data(self, length=0, clone=None):
         """
         Clone the current object, without copying the data (which
@@ -805,10 +1013,10 @@ class Data1D(plottable_1D, DataInfo):
                 raise ValueError(msg)
             # Here we could also extrapolate between data points
             TOLERANCE = 0.01
-            for i in range(len(self.x)):
-                if fabs(self.x[i] - other.x[i]) > self.x[i]*TOLERANCE:
-                    msg = "Incompatible data sets: x-values do not match"
-                    raise ValueError(msg)
+            x = np.asarray(self.x)
+            if np.any(np.fabs(x - np.asarray(other.x)) > x*TOLERANCE):
+                msg = "Incompatible data sets: x-values do not match"
+                raise ValueError(msg)
 
             # Check that the other data set has errors, otherwise
             # create zero vector
@@ -826,6 +1034,9 @@ class Data1D(plottable_1D, DataInfo):
     def _perform_operation(self, other, operation):
         """
         """
+        data, other = self._common_x_operands(other)
+        if data is not self:
+            return data._perform_operation(other, operation)
         # First, check the data compatibility
         dy, dy_other = self._validity_check(other)
         result = self.clone_without_data(len(self.x))
@@ -838,34 +1049,32 @@ class Data1D(plottable_1D, DataInfo):
         else:
             result.dxl = np.zeros(len(self.x))
 
-        for i in range(len(self.x)):
-            result.x[i] = self.x[i]
-            if self.dx is not None and len(self.x) == len(self.dx):
-                result.dx[i] = self.dx[i]
-            if self.dxw is not None and len(self.x) == len(self.dxw):
-                result.dxw[i] = self.dxw[i]
-            if self.dxl is not None and len(self.x) == len(self.dxl):
-                result.dxl[i] = self.dxl[i]
-
-            a = Uncertainty(self.y[i], dy[i]**2)
-            if isinstance(other, Data1D):
-                b = Uncertainty(other.y[i], dy_other[i]**2)
-                if other.dx is not None:
-                    result.dx[i] *= self.dx[i]
-                    result.dx[i] += (other.dx[i]**2)
-                    result.dx[i] /= 2
-                    result.dx[i] = math.sqrt(result.dx[i])
-                if result.dxl is not None and other.dxl is not None:
-                    result.dxl[i] *= self.dxl[i]
-                    result.dxl[i] += (other.dxl[i]**2)
-                    result.dxl[i] /= 2
-                    result.dxl[i] = math.sqrt(result.dxl[i])
-            else:
-                b = other
-
-            output = operation(a, b)
-            result.y[i] = output.x
-            result.dy[i] = math.sqrt(math.fabs(output.variance))
+        result.x[:] = self.x
+        if self.dx is not None and len(self.x) == len(self.dx):
+            result.dx[:] = self.dx
+        if self.dxw is not None and len(self.x) == len(self.dxw):
+            result.dxw[:] = self.dxw
+        if self.dxl is not None and len(self.x) == len(self.dxl):
+            result.dxl[:] = self.dxl
+
+        # Operate on whole arrays: Uncertainty propagates the errors
+        # element by element
+        a = Uncertainty(np.asarray(self.y), np.asarray(dy)**2)
+        if isinstance(other, Data1D):
+            b = Uncertainty(np.asarray(other.y), np.asarray(dy_other)**2)
+            # Resolutions are combined as sqrt((dq_1**2 + dq_2**2)/2)
+            if other.dx is not None and self.dx is not None:
+                result.dx[:] = np.sqrt((result.dx*self.dx
+                                        + np.asarray(other.dx)**2) / 2)
+            if result.dxl is not None and other.dxl is not None:
+                result.dxl[:] = np.sqrt((result.dxl*self.dxl
+                                         + np.asarray(other.dxl)**2) / 2)
+        else:
+            b = other
+
+        output = operation(a, b)
+        result.y[:] = output.x
+        result.dy[:] = np.sqrt(np.fabs(output.variance))
         return result
 
     def _validity_check_union(self, other):
@@ -1037,12 +1246,13 @@ class Data2D(plottable_2D, DataInfo):
                 len(self.qy_data) != len(other.qy_data):
                 msg = "Unable to perform operation: data length are not equal"
                 raise ValueError(msg)
-            for ind in range(len(self.data)):
-                if fabs(self.qx_data[ind] - other.qx_data[ind]) > fabs(self.qx_data[ind])*TOLERANCE:
-                    msg = "Incompatible data sets: qx-values do not match: %s %s" % (self.qx_data[ind], other.qx_data[ind])
-                    raise ValueError(msg)
-                if fabs(self.qy_data[ind] - other.qy_data[ind]) > fabs(self.qy_data[ind])*TOLERANCE:
-                    msg = "Incompatible data sets: qy-values do not match: %s %s" % (self.qy_data[ind], other.qy_data[ind])
+            for name in ('qx', 'qy'):
+                values = np.asarray(getattr(self, name + '_data'))
+                other_values = np.asarray(getattr(other, name + '_data'))
+                ind = np.flatnonzero(np.fabs(values - other_values)
+                                     > np.fabs(values)*TOLERANCE)
+                if len(ind) > 0:
+                    msg = "Incompatible data sets: %s-values do not match: %s %s" % (name, values[ind[0]], other_values[ind[0]])
                     raise ValueError(msg)
 
             # Check that the scales match
@@ -1055,7 +1265,7 @@ class Data2D(plottable_2D, DataInfo):
         err = self.err_data
         if self.err_data is None or \
             (len(self.err_data) != len(self.data)):
-            err = np.zeros(len(other.data))
+            err = np.zeros(len(self.data))
         return err, err_other
 
     def _perform_operation(self, other, operation):
@@ -1072,42 +1282,32 @@ class Data2D(plottable_2D, DataInfo):
             result.dqx_data = None
             result.dqy_data = None
         else:
-            result.dqx_data = np.zeros(len(self.data))
-            result.dqy_data = np.zeros(len(self.data))
-        for i in range(np.size(self.data)):
-            result.data[i] = self.data[i]
-            if self.err_data is not None and \
-                            np.size(self.data) == np.size(self.err_data):
-                result.err_data[i] = self.err_data[i]
-            if self.dqx_data is not None:
-                result.dqx_data[i] = self.dqx_data[i]
-            if self.dqy_data is not None:
-                result.dqy_data[i] = self.dqy_data[i]
-            result.qx_data[i] = self.qx_data[i]
-            result.qy_data[i] = self.qy_data[i]
-            result.q_data[i] = self.q_data[i]
-            result.mask[i] = self.mask[i]
-
-            a = Uncertainty(self.data[i], dy[i]**2)
-            if isinstance(other, Data2D):
-                b = Uncertainty(other.data[i], dy_other[i]**2)
-                if other.dqx_data is not None and \
-                        result.dqx_data is not None:
-                    result.dqx_data[i] *= self.dqx_data[i]
-                    result.dqx_data[i] += (other.dqx_data[i]**2)
-                    result.dqx_data[i] /= 2
-                    result.dqx_data[i] = math.sqrt(result.dqx_data[i])
-                if other.dqy_data is not None and \
-                        result.dqy_data is not None:
-                    result.dqy_data[i] *= self.dqy_data[i]
-                    result.dqy_data[i] += (other.dqy_data[i]**2)
-                    result.dqy_data[i] /= 2
-                    result.dqy_data[i] = math.sqrt(result.dqy_data[i])
-            else:
-                b = other
-            output = operation(a, b)
-            result.data[i] = output.x
-            result.err_data[i] = math.sqrt(math.fabs(output.variance))
+            result.dqx_data = np.array(self.dqx_data, dtype=float)
+            result.dqy_data = np.array(self.dqy_data, dtype=float)
+        result.qx_data[:] = self.qx_data
+        result.qy_data[:] = self.qy_data
+        result.q_data[:] = self.q_data
+        result.mask[:] = self.mask
+
+        # Operate on whole arrays: Uncertainty propagates the errors
+        # element by element
+        a = Uncertainty(np.asarray(self.data), np.asarray(dy)**2)
+        if isinstance(other, Data2D):
+            b = Uncertainty(np.asarray(other.data), np.asarray(dy_other)**2)
+            # Resolutions are combined as sqrt((dq_1**2 + dq_2**2)/2)
+            if other.dqx_data is not None and result.dqx_data is not None:
+                result.dqx_data = np.sqrt((result.dqx_data**2
+                                           + np.asarray(other.dqx_data)**2)
+                                          / 2)
+            if other.dqy_data is not None and result.dqy_data is not None:
+                result.dqy_data = np.sqrt((result.dqy_data**2
+                                           + np.asarray(other.dqy_data)**2)
+                                          / 2)
+        else:
+            b = other
+        output = operation(a, b)
+        result.data[:] = output.x
+        result.err_data[:] = np.sqrt(np.fabs(output.variance))
         return result
 
     def _validity_check_union(self, other):
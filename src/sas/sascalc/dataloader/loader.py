@@ -24,20 +24,95 @@ import os
 import sys
 import logging
 import time
+import threading
+import importlib
+from functools import partial
 from zipfile import ZipFile
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
 
 from sas.sascalc.data_util.registry import ExtensionRegistry
 
 # Default readers are defined in the readers sub-module
 from . import readers
+from . import sniffer
 from .loader_exceptions import NoKnownLoaderException, FileContentsException,\
     DefaultReaderException
-from .readers import ascii_reader
-from .readers import cansas_reader
-from .readers import cansas_reader_HDF5
 
 logger = logging.getLogger(__name__)
 
+# Reader modules for the formats identified by the sniffer
+SNIFFED_READERS = {
+    'hdf5': 'cansas_reader_HDF5',
+    'tiff': 'tiff_reader',
+    'cansas': 'cansas_reader',
+    'sesans': 'sesans_reader',
+    'danse': 'danse_reader',
+    'red2d': 'red2d_reader',
+    'abs': 'abs_reader',
+}
+
+
+class LazyReader(object):
+    """
+    Stand-in for the Reader of a module that is only imported
+    the first time a file is read with it.
+
+    Readers keep the state of the file being read, so each thread
+    gets its own Reader object.
+    """
+    def __init__(self, module_name):
+        ## Full name of the module defining the Reader class
+        self.module_name = module_name
+        self._local = threading.local()
+
+    def get_reader(self):
+        """
+        Import the module and instantiate its reader for this thread.
+
+        :return: Reader object
+        """
+        reader = getattr(self._local, 'reader', None)
+        if reader is None:
+            module = importlib.import_module(self.module_name)
+            reader = self._local.reader = module.Reader()
+        return reader
+
+    def read(self, path):
+        """
+        Read a file with the reader of the module.
+
+        :param path: file path
+        """
+        return self.get_reader().read(path)
+
+
+def _reader_module(loader):
+    """
+    Get the name of the module defining the reader behind a load method.
+
+    :param loader: bound read method of a reader or LazyReader
+    :return: module name, or None for plain functions
+    """
+    reader = getattr(loader, '__self__', None)
+    if reader is None:
+        return None
+    if isinstance(reader, LazyReader):
+        return reader.module_name
+    return type(reader).__module__
+
+
+def _load_in_process(path, format=None):
+    """
+    Load a file in a worker process of Registry.load_many, using the
+    registry of the process.
+
+    :param path: file path
+    :param format: explicit extension
+    :return: (path, data, exception)
+    """
+    return Loader()._load_one(path, format)
+
 
 class Registry(ExtensionRegistry):
     """
@@ -51,7 +126,10 @@ class Registry(ExtensionRegistry):
         self.writers = {}
 
         # List of wildcards
-        self.wildcards = ['All (*.*)|*.*']
+        self._wildcards = ['All (*.*)|*.*']
+
+        # Readers registered by module name and not imported yet
+        self._lazy_readers = []
 
         # Creation time, for testing
         self._created = time.time()
@@ -59,6 +137,15 @@ class Registry(ExtensionRegistry):
         # Register default readers
         readers.read_associations(self)
 
+    @property
+    def wildcards(self):
+        """
+        List of wildcards for all the readers; this imports the
+        default reader modules.
+        """
+        self._import_lazy_readers()
+        return self._wildcards
+
     def load(self, path, format=None, debug=False):
         """
         Call the loader for the file type of path.
@@ -68,8 +155,10 @@ class Registry(ExtensionRegistry):
             of a particular reader
         :param debug: when True, print the traceback for each loader that fails
 
-        Defaults to the ascii (multi-column), cansas XML, and cansas NeXuS
-        readers if no reader was registered for the file's extension.
+        If no reader was registered for the file's extension, or if it
+        fails, the format is identified from the start of the file. Defaults
+        to the ascii (multi-column), cansas XML, and cansas NeXuS readers if
+        the format is not recognized.
         """
         import traceback
 
@@ -91,6 +180,38 @@ class Registry(ExtensionRegistry):
             pass
 
         # File has no associated reader, or the associated reader failed.
+        # Look at the first few KB of the file to find the right reader.
+        file_format = sniffer.sniff(path)
+        if file_format == 'bsl':
+            msg = "\n{} is a BSL/OTOKO header file. ".format(path)
+            msg += "Convert it with the Data File Converter before loading it.\n"
+            raise NoKnownLoaderException(msg)
+        if file_format in SNIFFED_READERS:
+            reader = self._get_sniffed_reader(file_format, path, format)
+            if reader is not None:
+                try:
+                    return reader.read(path)
+                except FileContentsException as e:
+                    if debug: traceback.print_exc()
+                    err_msg = msg_from_reader if msg_from_reader is not None else e.message
+                    raise RuntimeError(err_msg)
+                except Exception as e:
+                    if debug: traceback.print_exc()
+                    if msg_from_reader is None:
+                        msg_from_reader = "\nUnable to load {} as {} data: {}\n"\
+                            .format(path, file_format, e)
+            if file_format in sniffer.BINARY_FORMATS:
+                # The default readers below only handle text and XML
+                if msg_from_reader is None:
+                    msg_from_reader = "\nUnable to load {} as {} data.\n"\
+                        .format(path, file_format)
+                raise RuntimeError(msg_from_reader)
+
+        # As a last resort, try each of the default readers.
+        from .readers import ascii_reader
+        from .readers import cansas_reader
+        from .readers import cansas_reader_HDF5
+
         # Try the ASCII reader
         try:
             ascii_loader = ascii_reader.Reader()
@@ -145,6 +266,95 @@ class Registry(ExtensionRegistry):
             err_msg = msg_from_reader if msg_from_reader is not None else e.message
             raise RuntimeError(err_msg)
 
+    def _load_one(self, path, format=None):
+        """
+        Load a file, returning the error instead of raising it.
+
+        :param path: file path
+        :param format: explicit extension
+        :return: (path, data, exception) with either data or exception None
+        """
+        try:
+            return path, self.load(path, format), None
+        except Exception as exc:
+            return path, None, exc
+
+    def load_many(self, paths, format=None, workers=None, executor='thread',
+                  ordered=True):
+        """
+        Load several files in parallel.
+
+        Threads suit files on slow or network storage; processes suit
+        large files whose parsing is CPU bound. With threads, readers added
+        with find_plugins or associate_file_type are shared between the
+        threads. Worker processes use their own registry, so these readers
+        may be missing from it.
+
+        :param paths: list of file paths
+        :param format: explicit extension, to force the use of a reader
+        :param workers: number of threads or processes, defaults to the
+            number of cores
+        :param executor: 'thread' or 'process'
+        :param ordered: if True, the files are returned in the order of
+            paths, otherwise as soon as they are loaded
+        :return: iterator over (path, data, exception), where data is
+            what load returned, or None when loading raised exception
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError("Unknown executor %r" % executor)
+        paths = list(paths)
+        if workers is None:
+            workers = cpu_count()
+        workers = max(1, min(workers, len(paths)))
+        if workers == 1:
+            return (self._load_one(path, format) for path in paths)
+        return self._load_parallel(paths, format, workers, executor, ordered)
+
+    def _load_parallel(self, paths, format, workers, executor, ordered):
+        """
+        Generator doing the work of load_many with a pool of workers
+        """
+        if executor == 'thread':
+            pool = ThreadPool(workers)
+            load = partial(self._load_one, format=format)
+        else:
+            pool = Pool(workers)
+            load = partial(_load_in_process, format=format)
+        try:
+            imap = pool.imap if ordered else pool.imap_unordered
+            for result in imap(load, paths):
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _get_sniffed_reader(self, file_format, path, format=None):
+        """
+        Get a reader for a file in a format identified by the sniffer.
+
+        :param file_format: format returned by sniffer.sniff
+        :param path: file path
+        :param format: explicit extension used to look up the readers
+        :return: reader object, or None if the reader was already tried
+            by extension or cannot be imported
+        """
+        module_name = readers.__name__ + '.' + SNIFFED_READERS[file_format]
+        if format is None:
+            tried = self.lookup(path)
+        else:
+            tried = self.loaders.get(format, [])
+        if any(_reader_module(fn) == module_name for fn in tried):
+            return None
+        try:
+            reader = LazyReader(module_name).get_reader()
+        except Exception as exc:
+            logger.error("Loader: Error importing %s\n  %s", module_name, exc)
+            return None
+        # The content, not the extension, identified this reader
+        reader.allow_all = True
+        return reader
+
     def find_plugins(self, dir):
         """
         Find readers in a given directory. This method
@@ -246,8 +456,8 @@ class Registry(ExtensionRegistry):
 
                 wcard = "%s files (*%s)|*%s" % (type_name, ext.lower(),
                                                 ext.lower())
-                if wcard not in self.wildcards:
-                    self.wildcards.append(wcard)
+                if wcard not in self._wildcards:
+                    self._wildcards.append(wcard)
 
                 # Check whether writing is supported
                 if hasattr(loader, 'write'):
@@ -262,6 +472,49 @@ class Registry(ExtensionRegistry):
                 logger.error(msg)
         return reader_found
 
+    def associate_lazy_reader(self, ext, module_name):
+        """
+        Register the Reader of a module for an extension without importing
+        the module. It is imported when a file is first read with it, or
+        when the wildcards or writers are needed.
+
+        :param ext: file extension [string]
+        :param module_name: full name of the module defining Reader
+        """
+        lazy = LazyReader(module_name)
+        if ext not in self.loaders:
+            self.loaders[ext] = []
+        self.loaders[ext].append(lazy.read)
+        self._lazy_readers.append((ext, lazy))
+
+    def _import_lazy_readers(self):
+        """
+        Import the modules of the lazily registered readers to add
+        their wildcards and writers.
+        """
+        while self._lazy_readers:
+            ext, lazy = self._lazy_readers.pop(0)
+            try:
+                loader = lazy.get_reader()
+            except Exception as exc:
+                msg = "Loader: Error importing"
+                msg += " %s\n  %s" % (lazy.module_name, exc)
+                logger.error(msg)
+                continue
+
+            # Keep track of wildcards
+            type_name = getattr(loader, 'type_name', lazy.module_name)
+            wcard = "%s files (*%s)|*%s" % (type_name, ext.lower(),
+                                            ext.lower())
+            if wcard not in self._wildcards:
+                self._wildcards.append(wcard)
+
+            # Check whether writing is supported
+            if hasattr(loader, 'write'):
+                if ext not in self.writers:
+                    self.writers[ext] = []
+                self.writers[ext].append(loader.write)
+
     def associate_file_reader(self, ext, loader):
         """
         Append a reader object to readers
@@ -286,8 +539,8 @@ class Registry(ExtensionRegistry):
 
                 wcard = "%s files (*%s)|*%s" % (type_name, ext.lower(),
                                                 ext.lower())
-                if wcard not in self.wildcards:
-                    self.wildcards.append(wcard)
+                if wcard not in self._wildcards:
+                    self._wildcards.append(wcard)
 
         except Exception as exc:
             msg = "Loader: Error accessing Reader "
@@ -324,8 +577,8 @@ class Registry(ExtensionRegistry):
                         type_name = loader.type_name
                     wcard = "%s files (*%s)|*%s" % (type_name, ext.lower(),
                                                     ext.lower())
-                    if wcard not in self.wildcards:
-                        self.wildcards.append(wcard)
+                    if wcard not in self._wildcards:
+                        self._wildcards.append(wcard)
 
                 # Check whether writing is supported
                 if hasattr(loader, 'write'):
@@ -345,6 +598,7 @@ class Registry(ExtensionRegistry):
         :return: the loader associated with the file type of path.
         :Raises ValueError: if file type is not known.
         """
+        self._import_lazy_readers()
         # Find matching extensions
         extlist = [ext for ext in self.extensions() if path.endswith(ext)]
         # Sort matching extensions by decreasing order of length
@@ -377,6 +631,7 @@ class Registry(ExtensionRegistry):
         if format is None:
             writers = self.lookup_writers(path)
         else:
+            self._import_lazy_readers()
             writers = self.writers[format]
         for fn in writers:
             try:
@@ -425,6 +680,27 @@ class Loader(object):
         """
         return self.__registry.load(file, format)
 
+    def load_many(self, paths, format=None, workers=None, executor='thread',
+                  ordered=True):
+        """
+        Load several files in parallel
+
+        :param paths: list of file names (paths)
+        :param format: specified format to use (optional)
+        :param workers: number of threads or processes (optional)
+        :param executor: 'thread' or 'process'
+        :param ordered: return the files in order rather than as they load
+        :return: iterator over (path, data, exception)
+        """
+        return self.__registry.load_many(paths, format, workers, executor,
+                                         ordered)
+
+    def _load_one(self, path, format=None):
+        """
+        Load a file, returning the error instead of raising it
+        """
+        return self.__registry._load_one(path, format)
+
     def save(self, file, data, format):
         """
         Save a DataInfo object to file
@@ -78,6 +78,30 @@ def flip_phi(phi):
         phi_out = phi
     return phi_out
 
+def _variance(data, err_data):
+    """
+    Get the squared error of each point, falling back on |I|
+    where no error is given.
+
+    :param data: intensities
+    :param err_data: errors on the intensities
+    :return: array of variances
+    """
+    return np.where(err_data == 0.0, np.fabs(data), err_data * err_data)
+
+def _bin_sums(index, nbins, *weights):
+    """
+    Accumulate each of the weights into nbins bins.
+
+    :param index: bin index of each point, 0 <= index < nbins
+    :param nbins: number of bins
+    :return: the number of points in each bin followed by
+        the sum of each weight array in each bin
+    """
+    counts = np.bincount(index, minlength=nbins).astype(float)
+    sums = [np.bincount(index, weights=w, minlength=nbins) for w in weights]
+    return [counts] + sums
+
 def get_pixel_fraction_square(x, xmin, xmax):
     """
     Return the fraction of the length
@@ -196,8 +220,8 @@ def get_dq_data(data2D):
     q = 0. Note This method works on only pinhole geometry.
     Extrapolate dqx(r) and dqy(phi) at q = 0, and take an average.
     '''
-    z_max = max(data2D.q_data)
-    z_min = min(data2D.q_data)
+    z_max = np.max(data2D.q_data)
+    z_min = np.min(data2D.q_data)
     dqx_at_z_max = data2D.dqx_data[np.argmax(data2D.q_data)]
     dqx_at_z_min = data2D.dqx_data[np.argmin(data2D.q_data)]
     dqy_at_z_max = data2D.dqy_data[np.argmax(data2D.q_data)]
@@ -205,14 +229,14 @@ def get_dq_data(data2D):
     # Find qdx at q = 0
     dq_overlap_x = (dqx_at_z_min * z_max - dqx_at_z_max * z_min) / (z_max - z_min)
     # when extrapolation goes wrong
-    if dq_overlap_x > min(data2D.dqx_data):
-        dq_overlap_x = min(data2D.dqx_data)
+    if dq_overlap_x > np.min(data2D.dqx_data):
+        dq_overlap_x = np.min(data2D.dqx_data)
     dq_overlap_x *= dq_overlap_x
     # Find qdx at q = 0
     dq_overlap_y = (dqy_at_z_min * z_max - dqy_at_z_max * z_min) / (z_max - z_min)
     # when extrapolation goes wrong
-    if dq_overlap_y > min(data2D.dqy_data):
-        dq_overlap_y = min(data2D.dqy_data)
+    if dq_overlap_y > np.min(data2D.dqy_data):
+        dq_overlap_y = np.min(data2D.dqy_data)
     # get dq at q=0.
     dq_overlap_y *= dq_overlap_y
 
@@ -300,6 +324,25 @@ class Binning(object):
         # Bin index calulation
         return int(math.floor(temp_x / temp_y))
 
+    def get_bin_indices(self, values):
+        '''
+        Array version of get_bin_index.
+
+        :param values: array of values to bin
+        :return: floor of the bin coordinate of each value, as floats
+            so that values outside the log domain come back as NaN or -inf
+        '''
+        values = np.asarray(values, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.base:
+                temp_x = self.n_bins * (np.log(values) / math.log(self.base)
+                                        - math.log(self.min, self.base))
+                temp_y = math.log(self.max, self.base) - math.log(self.min, self.base)
+            else:
+                temp_x = self.n_bins * (values - self.min)
+                temp_y = self.max - self.min
+            return np.floor(temp_x / temp_y)
+
 
 ################################################################################
 
@@ -591,84 +634,45 @@ class CircularAverage(object):
         :param data2D: Data2D object
         :return: Data1D object
         """
-        # Get data W/ finite values
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        mask_data = data2D.mask[np.isfinite(data2D.data)]
-
-        dq_data = None
-        if data2D.dqx_data is not None and data2D.dqy_data is not None:
-            dq_data = get_dq_data(data2D)
-
-        if len(q_data) == 0:
+        index = data2D.get_polar_index()
+        if not index.finite.any():
             msg = "Circular averaging: invalid q_data: %g" % data2D.q_data
             raise RuntimeError(msg)
+        if self.r_min >= self.r_max:
+            raise ValueError("Limit Error: min > max")
 
         # Build array of Q intervals
         nbins = int(math.ceil((self.r_max - self.r_min) / self.bin_width))
 
-        x = np.zeros(nbins)
-        y = np.zeros(nbins)
-        err_y = np.zeros(nbins)
-        err_x = np.zeros(nbins)
-        y_counts = np.zeros(nbins)
+        # Finite pixels to be averaged
+        pixels = index.ring(self.r_min, self.r_max)
+        if ismask:
+            pixels = pixels[data2D.mask[pixels].astype(bool)]
+        data = data2D.data[pixels]
+        q_value = index.q[pixels]
 
-        for npt in range(len(data)):
+        i_q = np.floor((q_value - self.r_min) / self.bin_width).astype(int)
+        # Take care of the edge case at q = r_max.
+        i_q[i_q == nbins] = nbins - 1
 
-            if ismask and not mask_data[npt]:
-                continue
-
-            frac = 0
-
-            # q-value at the pixel (j,i)
-            q_value = q_data[npt]
-            data_n = data[npt]
-
-            # No need to calculate the frac when all data are within range
-            if self.r_min >= self.r_max:
-                raise ValueError("Limit Error: min > max")
-
-            if self.r_min <= q_value and q_value <= self.r_max:
-                frac = 1
-            if frac == 0:
-                continue
-            i_q = int(math.floor((q_value - self.r_min) / self.bin_width))
-
-            # Take care of the edge case at phi = 2pi.
-            if i_q == nbins:
-                i_q = nbins - 1
-            y[i_q] += frac * data_n
-            # Take dqs from data to get the q_average
-            x[i_q] += frac * q_value
-            if err_data is None or err_data[npt] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                err_y[i_q] += frac * frac * data_n
-            else:
-                err_y[i_q] += frac * frac * err_data[npt] * err_data[npt]
-            if dq_data is not None:
-                # To be consistent with dq calculation in 1d reduction,
-                # we need just the averages (not quadratures) because
-                # it should not depend on the number of the q points
-                # in the qr bins.
-                err_x[i_q] += frac * dq_data[npt]
-            else:
-                err_x = None
-            y_counts[i_q] += frac
+        y_counts, y, x, err_y = _bin_sums(
+            i_q, nbins, data, q_value, _variance(data, data2D.err_data[pixels]))
+        if data2D.dqx_data is not None and data2D.dqy_data is not None:
+            # To be consistent with dq calculation in 1d reduction,
+            # we need just the averages (not quadratures) because
+            # it should not depend on the number of the q points
+            # in the qr bins.
+            dq_data = index.get_dq(data2D)[index.finite_rank[pixels]]
+            err_x = np.bincount(i_q, weights=dq_data, minlength=nbins)
+        else:
+            err_x = None
 
         # Average the sums
-        for n in range(nbins):
-            if err_y[n] < 0:
-                err_y[n] = -err_y[n]
-            err_y[n] = math.sqrt(err_y[n])
-            # if err_x is not None:
-            #    err_x[n] = math.sqrt(err_x[n])
-
-        err_y = err_y / y_counts
-        err_y[err_y == 0] = np.average(err_y)
-        y = y / y_counts
-        x = x / y_counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err_y = np.sqrt(np.fabs(err_y)) / y_counts
+            err_y[err_y == 0] = np.average(err_y)
+            y = y / y_counts
+            x = x / y_counts
         idx = (np.isfinite(y)) & (np.isfinite(x))
 
         if err_x is not None:
@@ -724,57 +728,31 @@ class Ring(object):
 
         Pi = math.pi
 
-        # Get data
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        qx_data = data2D.qx_data[np.isfinite(data2D.data)]
-        qy_data = data2D.qy_data[np.isfinite(data2D.data)]
-
-        # Set space for 1d outputs
-        phi_bins = np.zeros(self.nbins_phi)
-        phi_counts = np.zeros(self.nbins_phi)
-        phi_values = np.zeros(self.nbins_phi)
-        phi_err = np.zeros(self.nbins_phi)
+        # Get the finite points in the ring
+        index = data2D.get_polar_index()
+        pixels = index.ring(self.r_min, self.r_max)
+        data = data2D.data[pixels]
 
         # Shift to apply to calculated phi values in order
         # to center first bin at zero
         phi_shift = Pi / self.nbins_phi
 
-        for npt in range(len(data)):
-            frac = 0
-            # q-value at the point (npt)
-            q_value = q_data[npt]
-            data_n = data[npt]
+        # phi-value of the points in the ring
+        phi_value = index.phi[pixels] + Pi
 
-            # phi-value at the point (npt)
-            phi_value = math.atan2(qy_data[npt], qx_data[npt]) + Pi
+        # binning
+        i_phi = np.floor((self.nbins_phi) *
+                         (phi_value + phi_shift) / (2 * Pi)).astype(int)
+        # Take care of the edge case at phi = 2pi.
+        i_phi[i_phi >= self.nbins_phi] = 0
 
-            if self.r_min <= q_value and q_value <= self.r_max:
-                frac = 1
-            if frac == 0:
-                continue
-            # binning
-            i_phi = int(math.floor((self.nbins_phi) *
-                                   (phi_value + phi_shift) / (2 * Pi)))
-
-            # Take care of the edge case at phi = 2pi.
-            if i_phi >= self.nbins_phi:
-                i_phi = 0
-            phi_bins[i_phi] += frac * data[npt]
-
-            if err_data is None or err_data[npt] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                phi_err[i_phi] += frac * frac * math.fabs(data_n)
-            else:
-                phi_err[i_phi] += frac * frac * err_data[npt] * err_data[npt]
-            phi_counts[i_phi] += frac
+        phi_counts, phi_bins, phi_err = _bin_sums(
+            i_phi, self.nbins_phi, data, _variance(data, data2D.err_data[pixels]))
 
-        for i in range(self.nbins_phi):
-            phi_bins[i] = phi_bins[i] / phi_counts[i]
-            phi_err[i] = math.sqrt(phi_err[i]) / phi_counts[i]
-            phi_values[i] = 2.0 * math.pi / self.nbins_phi * (1.0 * i)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            phi_bins = phi_bins / phi_counts
+            phi_err = np.sqrt(phi_err) / phi_counts
+        phi_values = 2.0 * math.pi / self.nbins_phi * np.arange(self.nbins_phi)
 
         idx = (np.isfinite(phi_bins))
 
@@ -825,106 +803,71 @@ class _Sector(object):
         if data2D.__class__.__name__ not in ["Data2D", "plottable_2D"]:
             raise RuntimeError("Ring averaging only take plottable_2D objects")
 
-        # Get the all data & info
-        data = data2D.data[np.isfinite(data2D.data)]
-        q_data = data2D.q_data[np.isfinite(data2D.data)]
-        err_data = data2D.err_data[np.isfinite(data2D.data)]
-        qx_data = data2D.qx_data[np.isfinite(data2D.data)]
-        qy_data = data2D.qy_data[np.isfinite(data2D.data)]
-
-        dq_data = None
-        if data2D.dqx_data is not None and data2D.dqy_data is not None:
-            dq_data = get_dq_data(data2D)
-
-        # set space for 1d outputs
-        x = np.zeros(self.nbins)
-        y = np.zeros(self.nbins)
-        y_err = np.zeros(self.nbins)
-        x_err = np.zeros(self.nbins)
-        y_counts = np.zeros(self.nbins)  # Cycle counts (for the mean)
-
         # Get the min and max into the region: 0 <= phi < 2Pi
         phi_min = flip_phi(self.phi_min)
         phi_max = flip_phi(self.phi_max)
 
-        #  binning object
+        # Get the finite data within the radius
+        index = data2D.get_polar_index()
+        pixels = index.ring(self.r_min, self.r_max)
+        q_data = index.q[pixels]
+
+        # phi-value of the pixels
+        phi_value = index.phi[pixels] + math.pi
+
+        # In case of two ROIs (symmetric major and minor regions)(for 'q2')
+        is_in = np.zeros(len(pixels), dtype=bool)
+        if run.lower() == 'q2':
+            # For minor sector wing
+            # Calculate the minor wing phis
+            phi_min_minor = flip_phi(phi_min - math.pi)
+            phi_max_minor = flip_phi(phi_max - math.pi)
+            # Check if phis of the minor ring is within 0 to 2pi
+            if phi_min_minor > phi_max_minor:
+                is_in = ((phi_value > phi_min_minor) |
+                         (phi_value < phi_max_minor))
+            else:
+                is_in = ((phi_value > phi_min_minor) &
+                         (phi_value < phi_max_minor))
+
+        # For all cases(i.e.,for 'q', 'q2', and 'phi')
+        # Find pixels within ROI
+        if phi_min > phi_max:
+            is_in |= (phi_value > phi_min) | (phi_value < phi_max)
+        else:
+            is_in |= (phi_value >= phi_min) & (phi_value < phi_max)
+
+        # Get the binning index
         if run.lower() == 'phi':
             binning = Binning(self.phi_min, self.phi_max, self.nbins, self.base)
+            i_bin = binning.get_bin_indices(phi_value[is_in])
         else:
             binning = Binning(self.r_min, self.r_max, self.nbins, self.base)
-
-        for n in range(len(data)):
-
-            # q-value at the pixel (j,i)
-            q_value = q_data[n]
-            data_n = data[n]
-
-            # Is pixel within range?
-            is_in = False
-
-            # phi-value of the pixel (j,i)
-            phi_value = math.atan2(qy_data[n], qx_data[n]) + math.pi
-
-            # No need to calculate: data outside of the radius
-            if self.r_min > q_value or q_value > self.r_max:
-                continue
-
-            # In case of two ROIs (symmetric major and minor regions)(for 'q2')
-            if run.lower() == 'q2':
-                # For minor sector wing
-                # Calculate the minor wing phis
-                phi_min_minor = flip_phi(phi_min - math.pi)
-                phi_max_minor = flip_phi(phi_max - math.pi)
-                # Check if phis of the minor ring is within 0 to 2pi
-                if phi_min_minor > phi_max_minor:
-                    is_in = (phi_value > phi_min_minor or
-                             phi_value < phi_max_minor)
-                else:
-                    is_in = (phi_value > phi_min_minor and
-                             phi_value < phi_max_minor)
-
-            # For all cases(i.e.,for 'q', 'q2', and 'phi')
-            # Find pixels within ROI
-            if phi_min > phi_max:
-                is_in = is_in or (phi_value > phi_min or
-                                  phi_value < phi_max)
-            else:
-                is_in = is_in or (phi_value >= phi_min and
-                                  phi_value < phi_max)
-
-            # data oustide of the phi range
-            if not is_in:
-                continue
-
-            # Get the binning index
-            if run.lower() == 'phi':
-                i_bin = binning.get_bin_index(phi_value)
-            else:
-                i_bin = binning.get_bin_index(q_value)
-
-            # Take care of the edge case at phi = 2pi.
-            if i_bin == self.nbins:
-                i_bin = self.nbins - 1
-
-            # Get the total y
-            y[i_bin] += data_n
-            x[i_bin] += q_value
-            if err_data[n] is None or err_data[n] == 0.0:
-                if data_n < 0:
-                    data_n = -data_n
-                y_err[i_bin] += data_n
-            else:
-                y_err[i_bin] += err_data[n]**2
-
-            if dq_data is not None:
-                # To be consistent with dq calculation in 1d reduction,
-                # we need just the averages (not quadratures) because
-                # it should not depend on the number of the q points
-                # in the qr bins.
-                x_err[i_bin] += dq_data[n]
-            else:
-                x_err = None
-            y_counts[i_bin] += 1
+            i_bin = binning.get_bin_indices(q_data[is_in])
+
+        # Take care of the edge case at phi = 2pi.
+        i_bin[i_bin == self.nbins] = self.nbins - 1
+        # Negative indices wrap around to the last bins as they do when
+        # indexing the output arrays; points beyond the bins are dropped.
+        i_bin[i_bin < 0] += self.nbins
+        is_binned = (i_bin >= 0) & (i_bin < self.nbins)
+        i_bin = i_bin[is_binned].astype(int)
+        is_in[is_in] = is_binned
+        pixels = pixels[is_in]
+        data = data2D.data[pixels]
+
+        y_counts, y, x, y_err = _bin_sums(
+            i_bin, self.nbins, data, q_data[is_in],
+            _variance(data, data2D.err_data[pixels]))
+        if data2D.dqx_data is not None and data2D.dqy_data is not None:
+            # To be consistent with dq calculation in 1d reduction,
+            # we need just the averages (not quadratures) because
+            # it should not depend on the number of the q points
+            # in the qr bins.
+            dq_data = index.get_dq(data2D)[index.finite_rank[pixels]]
+            x_err = np.bincount(i_bin, weights=dq_data, minlength=self.nbins)
+        else:
+            x_err = None
 
         # Organize the results
         with np.errstate(divide='ignore', invalid='ignore'):
@@ -1036,9 +979,7 @@ class Ringcut(object):
             raise RuntimeError("Ring cut only take plottable_2D objects")
 
         # Get data
-        qx_data = data2D.qx_data
-        qy_data = data2D.qy_data
-        q_data = np.sqrt(qx_data * qx_data + qy_data * qy_data)
+        q_data = data2D.get_polar_index().q
 
         # check whether or not the data point is inside ROI
         out = (self.r_min <= q_data) & (self.r_max >= q_data)
@@ -1138,12 +1079,8 @@ class Sectorcut(object):
         if data2D.__class__.__name__ not in ["Data2D", "plottable_2D"]:
             raise RuntimeError("Sectorcut take only plottable_2D objects")
         Pi = math.pi
-        # Get data
-        qx_data = data2D.qx_data
-        qy_data = data2D.qy_data
-
         # get phi from data
-        phi_data = np.arctan2(qy_data, qx_data)
+        phi_data = data2D.get_polar_index().phi
 
         # Get the min and max into the region: -pi <= phi < Pi
         phi_min_major = flip_phi(self.phi_min + Pi) - Pi
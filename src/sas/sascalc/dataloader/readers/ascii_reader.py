@@ -13,6 +13,10 @@
 #############################################################################
 
 import logging
+import warnings
+
+import numpy as np
+
 from sas.sascalc.dataloader.file_reader_base_class import FileReader
 from sas.sascalc.dataloader.data_info import DataInfo, plottable_1D
 from sas.sascalc.dataloader.loader_exceptions import FileContentsException,\
@@ -39,6 +43,64 @@ class Reader(FileReader):
     # data unless that is the only data
     min_data_pts = 5
 
+    # Number of lines of the data section converted at once
+    block_lines = 10000
+
+    @staticmethod
+    def get_delimiter(line):
+        """
+        Find the delimiter splitline uses for a line
+
+        :param line: A single line of text
+        :return: ',', ';' or None for whitespace
+        """
+        for delimiter in (',', ';'):
+            if len(line.split(delimiter)) >= 2:
+                return delimiter
+        return None
+
+    @staticmethod
+    def _read_block(lines, lentoks, delimiter):
+        """
+        Convert a block of lines of data in a single call
+
+        :param lines: list of lines, blank lines are skipped
+        :param lentoks: number of columns of data
+        :param delimiter: column delimiter, None for whitespace
+        :return: array of shape (rows, lentoks), or None if any line of
+            the block does not hold lentoks numbers
+        """
+        try:
+            with warnings.catch_warnings():
+                # A block of blank lines is not an error
+                warnings.simplefilter("ignore")
+                values = np.loadtxt(lines, delimiter=delimiter,
+                                    comments=None, ndmin=2)
+        except ValueError:
+            return None
+        if values.size and values.shape[1] != lentoks:
+            return None
+        return values
+
+    def _store_block(self, start, values):
+        """
+        Store the columns of a block of data lines in the current data set
+
+        :param start: index of the first line of the block in the data set
+        :param values: array of shape (rows, columns) from _read_block
+        """
+        if not values.size:
+            return
+        end = start + len(values)
+        columns = values.shape[1]
+        self.current_dataset.x[start:end] = values[:, 0]
+        if columns > 1:
+            self.current_dataset.y[start:end] = values[:, 1]
+        if columns > 2:
+            self.current_dataset.dy[start:end] = values[:, 2]
+        if columns > 3:
+            self.current_dataset.dx[start:end] = values[:, 3]
+
     def get_file_contents(self):
         """
         Get the contents of the file
@@ -68,7 +130,29 @@ class Reader(FileReader):
         line_no = 0
         # minimum required number of columns of data
         lentoks = 2
-        for line in lines:
+        # column delimiter of the current line of data
+        delimiter = None
+        # Lines before this one are read one at a time
+        bulk_start = 0
+        n_lines = len(lines)
+        i_line = 0
+        while i_line < n_lines:
+            if is_data and i_line >= bulk_start:
+                # Convert the next block of the data section in one call
+                block = lines[i_line:i_line + self.block_lines]
+                values = self._read_block(block, lentoks, delimiter)
+                if values is not None:
+                    n_rows = len(values)
+                    self._store_block(candidate_lines, values)
+                    candidate_lines += n_rows
+                    line_no += n_rows
+                    i_line += len(block)
+                    continue
+                # The data ends within this block, or it does not follow
+                # the first data lines: read it line by line
+                bulk_start = i_line + len(block)
+            line = lines[i_line]
+            i_line += 1
             toks = self.splitline(line.strip())
             # To remember the number of columns in the current line of data
             new_lentoks = len(toks)
@@ -115,6 +199,7 @@ class Reader(FileReader):
                 # To remember the # of columns on the current line
                 # for the next line of data
                 lentoks = new_lentoks
+                delimiter = self.get_delimiter(line.strip())
                 line_no += 1
             except ValueError:
                 # ValueError is raised when non numeric strings conv. to float
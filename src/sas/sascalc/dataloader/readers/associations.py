@@ -1,7 +1,7 @@
 """
 Module to associate default readers to file extensions.
-The module reads an xml file to get the readers for each file extension.
 The readers are tried in order they appear when reading a file.
+Reader modules are only imported when they are first used.
 """
 ############################################################################
 #This software was developed by the University of Tennessee as part of the
@@ -13,8 +13,8 @@ The readers are tried in order they appear when reading a file.
 #This work benefited from DANSE software developed under NSF award DMR-0520547.
 #copyright 2009, University of Tennessee
 #############################################################################
-import sys
 import logging
+import importlib
 
 logger = logging.getLogger(__name__)
 
@@ -34,25 +34,27 @@ FILE_ASSOCIATIONS = {
 
 def read_associations(loader, settings=FILE_ASSOCIATIONS):
     """
-    Read the specified settings file to associate
-    default readers to file extension.
+    Associate default readers to file extensions.
+
+    When the loader supports it, the reader modules are registered by
+    name and only imported on first use.
 
     :param loader: Loader object
-    :param settings: path to the json settings file [string]
+    :param settings: dictionary of extension to reader module name
     """
     # For each FileType entry, get the associated reader and extension
     for ext, reader in settings.items():
         if reader is not None and ext is not None:
             # Associate the extension with a particular reader
             # TODO: Modify the Register code to be case-insensitive
-            # FIXME: Remove exec statements
-            # and remove the extra line below.
+            module_name = "%s.%s" % (__name__.rpartition(".")[0], reader)
             try:
-                exec("from . import %s" % reader)
-                exec("loader.associate_file_type('%s', %s)"
-                     % (ext.lower(), reader))
-                exec("loader.associate_file_type('%s', %s)"
-                     % (ext.upper(), reader))
+                for case_ext in (ext.lower(), ext.upper()):
+                    if hasattr(loader, 'associate_lazy_reader'):
+                        loader.associate_lazy_reader(case_ext, module_name)
+                    else:
+                        module = importlib.import_module(module_name)
+                        loader.associate_file_type(case_ext, module)
             except Exception as exc:
                 msg = "read_associations: skipping association"
                 msg += " for %s\n  %s" % (ext.lower(), exc)
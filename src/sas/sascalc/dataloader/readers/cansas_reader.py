@@ -9,6 +9,7 @@ import numpy as np
 # The following 2 imports *ARE* used. Do not remove either.
 import xml.dom.minidom
 from xml.dom.minidom import parseString
+from xml.sax.saxutils import escape
 
 from lxml import etree
 
@@ -37,6 +38,9 @@ CONSTANTS = CansasConstants()
 CANSAS_FORMAT = CONSTANTS.format
 CANSAS_NS = CONSTANTS.names
 ALLOW_ALL = True
+# Characters escaped in attribute values, as lxml does
+ATTRIBUTE_ENTITIES = {'"': "&quot;", "\n": "&#10;", "\r": "&#13;",
+                      "\t": "&#9;"}
 
 class Reader(XMLreader):
     cansas_version = "1.0"
@@ -60,6 +64,11 @@ class Reader(XMLreader):
     ext = ['.xml', '.svs']
     # Flag to bypass extension check
     allow_all = True
+    # Number of data points written at once
+    write_chunk = 10000
+    # Idata columns of each SASdata element, streamed to the file by write
+    # rather than added to the document
+    _streamed_idata = None
 
     def reset_state(self):
         """
@@ -664,15 +673,54 @@ class Reader(XMLreader):
         :param filename: name of the file to write
         :param datainfo: Data1D object
         """
-        # Create XML document
-        doc, _ = self._to_xml_doc(datainfo)
-        # Write the file
-        file_ref = open(filename, 'wb')
+        self._streamed_idata = []
+        try:
+            # Create XML document, without the Idata elements
+            doc, _ = self._to_xml_doc(datainfo)
+            self._write_doc(filename, doc)
+        finally:
+            self._streamed_idata = None
+
+    def _write_doc(self, filename, doc):
+        """
+        Write a document built by _to_xml_doc, streaming the Idata elements
+        of its SASdata elements to the file write_chunk points at a time.
+
+        The document is serialized without the data points, then each
+        placeholder left by _write_idata is replaced by its Idata elements,
+        indented as lxml would.
+
+        :param filename: name of the file to write
+        :param doc: lxml ElementTree
+        """
         if self.encoding is None:
             self.encoding = "UTF-8"
-        doc.write(file_ref, encoding=self.encoding,
-                  pretty_print=True, xml_declaration=True)
-        file_ref.close()
+        text = "<?xml version='1.0' encoding='%s'?>\n" % self.encoding
+        text += etree.tostring(doc, encoding='unicode', pretty_print=True)
+        with open(filename, 'wb') as file_ref:
+            for index, columns in enumerate(self._streamed_idata):
+                marker = "<!--%s-->\n" % self._idata_marker(index)
+                position = text.index(marker)
+                line_start = text.rindex("\n", 0, position) + 1
+                file_ref.write(self._encode(text[:line_start]))
+                indent = text[line_start:position]
+                for chunk in self._format_idata(columns, indent):
+                    file_ref.write(self._encode(chunk))
+                text = text[position + len(marker):]
+            file_ref.write(self._encode(text))
+
+    def _encode(self, text):
+        """
+        Encode text for the file, as character references if need be
+        """
+        return text.encode(self.encoding, 'xmlcharrefreplace')
+
+    @staticmethod
+    def _idata_marker(index):
+        """
+        Text of the comment standing for the Idata elements of a SASdata
+        """
+        return "sasview-idata-%d" % index
 
     def _to_xml_doc(self, datainfo):
         """
@@ -808,26 +856,12 @@ class Reader(XMLreader):
         node = self.create_element("SASdata")
         self.append(node, entry_node)
 
-        for i in range(len(datainfo.x)):
-            point = self.create_element("Idata")
-            node.append(point)
-            self.write_node(point, "Q", datainfo.x[i],
-                            {'unit': datainfo._xunit})
-            if len(datainfo.y) >= i:
-                self.write_node(point, "I", datainfo.y[i],
-                                {'unit': datainfo._yunit})
-            if datainfo.dy is not None and len(datainfo.dy) > i:
-                self.write_node(point, "Idev", datainfo.dy[i],
-                                {'unit': datainfo._yunit})
-            if datainfo.dx is not None and len(datainfo.dx) > i:
-                self.write_node(point, "Qdev", datainfo.dx[i],
-                                {'unit': datainfo._xunit})
-            if datainfo.dxw is not None and len(datainfo.dxw) > i:
-                self.write_node(point, "dQw", datainfo.dxw[i],
-                                {'unit': datainfo._xunit})
-            if datainfo.dxl is not None and len(datainfo.dxl) > i:
-                self.write_node(point, "dQl", datainfo.dxl[i],
-                                {'unit': datainfo._xunit})
+        self._write_idata(node, [("Q", datainfo.x, datainfo._xunit),
+                                 ("I", datainfo.y, datainfo._yunit),
+                                 ("Idev", datainfo.dy, datainfo._yunit),
+                                 ("Qdev", datainfo.dx, datainfo._xunit),
+                                 ("dQw", datainfo.dxw, datainfo._xunit),
+                                 ("dQl", datainfo.dxl, datainfo._xunit)])
         if datainfo.isSesans:
             sesans_attrib = {'x_axis': datainfo._xaxis,
                              'y_axis': datainfo._yaxis,
@@ -842,6 +876,82 @@ class Reader(XMLreader):
                              {'unit': datainfo.sample.zacceptance[1]})
 
 
+    def _write_idata(self, node, columns):
+        """
+        Writes an Idata element per data point to a SASdata element.
+
+        When called from write, the points are streamed to the file and
+        the element only gets a placeholder. Otherwise the elements are
+        formatted as text and parsed write_chunk points at a time, rather
+        than built one value at a time. A column shorter than the first one
+        is only written for the points it covers.
+
+        :param node: SASdata lxml element to append the Idata elements to
+        :param columns: list of (tag, values, unit) tuples, the values are
+            None for a column that is not written
+        """
+        columns = [(tag, values, unit) for tag, values, unit in columns
+                   if values is not None]
+        if len(columns[0][1]) == 0:
+            return
+        if self._streamed_idata is not None:
+            node.append(etree.Comment(
+                self._idata_marker(len(self._streamed_idata))))
+            self._streamed_idata.append(columns)
+            return
+        for text in self._format_idata(columns):
+            node.extend(etree.fromstring("<SASdata>" + text + "</SASdata>"))
+
+    def _format_idata(self, columns, indent=None):
+        """
+        Formats the Idata elements of the data points, write_chunk points
+        at a time.
+
+        :param columns: list of (tag, values, unit) tuples
+        :param indent: indentation of the Idata elements, or None to
+            format them without whitespace
+        :return: iterator over the text of the Idata elements of each chunk
+        """
+        if indent is None:
+            newline = indent = inner = ""
+        else:
+            newline, inner = "\n", indent + "  "
+        n_points = len(columns[0][1])
+        # Ranges of points with the same columns
+        bounds = set([0, n_points])
+        bounds.update(min(len(values), n_points) for _, values, _ in columns)
+        bounds = sorted(bounds)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            present = [column for column in columns if len(column[1]) > start]
+            template = indent + "<Idata>" + newline
+            for tag, _, unit in present:
+                unit = escape(str(unit), ATTRIBUTE_ENTITIES).replace("%", "%%")
+                template += inner + '<{0} unit="{1}">%s</{0}>'.format(tag, unit)
+                template += newline
+            template += indent + "</Idata>" + newline
+            for first in range(start, stop, self.write_chunk):
+                last = min(first + self.write_chunk, stop)
+                # Interleave the columns, point by point
+                text = [None] * ((last - first) * len(present))
+                for i, (_, values, _) in enumerate(present):
+                    text[i::len(present)] = \
+                        self._format_values(values[first:last])
+                yield template * (last - first) % tuple(text)
+
+    @staticmethod
+    def _format_values(values):
+        """
+        Converts values to the strings written by write_node.
+
+        :param values: array or list of values
+        :return: list of strings
+        """
+        values = np.asarray(values)
+        if values.dtype == np.float64 or values.dtype.kind in 'iub':
+            # Python floats and ints convert to the same strings, faster
+            return [str(value) for value in values.tolist()]
+        return [escape(str(value)) for value in values]
+
     def _write_data_2d(self, datainfo, entry_node):
         """
         Writes 2D data to the XML file
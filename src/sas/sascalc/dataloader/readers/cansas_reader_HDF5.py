@@ -4,6 +4,7 @@
 
 import h5py
 import numpy as np
+import copy
 import re
 import os
 import sys
@@ -44,6 +45,10 @@ class Reader(FileReader):
     within each SASdata group can be a single 1D I(Q), multi-framed 1D I(Q),
     2D I(Qx, Qy) or multi-framed 2D I(Qx, Qy).
 
+    Multi-framed data gives one data set per frame. Only the frames selected
+    with the frames argument of read() are read from the file, a frame at a
+    time, so large time resolved files can be opened a few frames at once.
+
     :Dependencies:
         The NXcanSAS HDF5 reader requires h5py => v2.5.0 or later.
     """
@@ -58,6 +63,23 @@ class Reader(FileReader):
     ext = ['.h5', '.H5']
     # Flag to bypass extension check
     allow_all = True
+    # Frames read from multi-framed data, None for all of them
+    frames = None
+
+    def read(self, filepath, frames=None):
+        """
+        Read an NXcanSAS file.
+
+        :param filepath: The full or relative path to a file to be loaded
+        :param frames: index, list of indices or slice of the frames to read
+            from multi-framed data sets, all frames by default
+        :return: List of Data1D/2D objects, one per SASdata group and frame
+        """
+        self.frames = frames
+        try:
+            return super(Reader, self).read(filepath)
+        finally:
+            self.frames = None
 
     def get_file_contents(self):
         """
@@ -149,10 +171,6 @@ class Reader(FileReader):
                 class_name = class_name[0]
             if class_name is None:
                 class_name = h5attr(value, u'NX_class')
-            if class_name is not None:
-                class_prog = re.compile(class_name)
-            else:
-                class_prog = re.compile(value.name)
 
             if isinstance(value, h5py.Group):
                 # Set parent class before recursion
@@ -161,9 +179,9 @@ class Reader(FileReader):
                 parent_list.append(key)
                 # If a new sasentry, store the current data sets and create
                 # a fresh Data1D/2D object
-                if class_prog.match(u'SASentry'):
+                if class_name == u'SASentry':
                     self.add_data_set(key)
-                elif class_prog.match(u'SASdata'):
+                elif class_name == u'SASdata':
                     self._find_data_attributes(value)
                     self._initialize_new_data_set(value)
                 # Recursion step to access data within the group
@@ -175,8 +193,17 @@ class Reader(FileReader):
 
             elif isinstance(value, h5py.Dataset):
                 # If this is a dataset, store the data appropriately
-                data_set = value.value
                 unit = self._get_unit(value)
+                if (self.parent_class == u'SASdata'
+                        and key not in (u'definition', u'run', u'title',
+                                        u'SASnote')):
+                    # The data is read from the file by the processor
+                    if isinstance(self.current_dataset, plottable_2D):
+                        self.process_2d_data_object(value, key, unit)
+                    else:
+                        self.process_1d_data_object(value, key, unit)
+                    continue
+                data_set = self._read_dataset(value)
 
                 for data_point in data_set:
                     if isinstance(data_point, np.ndarray):
@@ -238,17 +265,10 @@ class Reader(FileReader):
                     # Source
                     elif self.parent_class == u'SASsource':
                         self.process_source(data_point, key, unit)
-                    # Everything else goes in meta_data
-                    elif self.parent_class == u'SASdata':
-                        if isinstance(self.current_dataset, plottable_2D):
-                            self.process_2d_data_object(data_set, key, unit)
-                        else:
-                            self.process_1d_data_object(data_set, key, unit)
-
-                        break
                     elif self.parent_class == u'SAStransmission_spectrum':
                         self.process_trans_spectrum(data_set, key)
                         break
+                    # Everything else goes in meta_data
                     else:
                         new_key = self._create_unique_key(
                             self.current_datainfo.meta_data, key)
@@ -258,24 +278,27 @@ class Reader(FileReader):
                 # I don't know if this reachable code
                 self.errors.append("ShouldNeverHappenException")
 
-    def process_1d_data_object(self, data_set, key, unit):
+    def process_1d_data_object(self, value, key, unit):
         """
         SASdata processor method for 1d data items
-        :param data_set: data from HDF5 file
+        :param value: h5py Dataset from HDF5 file
         :param key: canSAS_class attribute
         :param unit: unit attribute
         """
         if key == self.i_name:
             if self.multi_frame:
-                for x in range(0, data_set.shape[0]):
-                    self.data_frames.append(data_set[x].flatten())
+                self.data_frames = [frame.flatten()
+                                    for frame in self._read_frames(value)]
             else:
-                self.current_dataset.y = data_set.flatten()
-                self.current_dataset.yaxis("Intensity", unit)
-        elif key == self.i_uncertainties_name:
-            if self.multi_frame:
-                for x in range(0, data_set.shape[0]):
-                    self.data_uncertainty_frames.append(data_set[x].flatten())
+                self.current_dataset.y = value[()].flatten()
+            self.current_dataset.yaxis("Intensity", unit)
+            return
+        elif key == self.i_uncertainties_name and self.multi_frame:
+            self.data_uncertainty_frames = [
+                frame.flatten() for frame in self._read_frames(value)]
+            return
+        data_set = self._read_dataset(value)
+        if key == self.i_uncertainties_name:
             self.current_dataset.dy = data_set.flatten()
         elif key in self.q_names:
             self.current_dataset.xaxis("Q", unit)
@@ -304,11 +327,25 @@ class Reader(FileReader):
             self.current_datainfo.source.wavelength = data_set[0]
             self.current_datainfo.source.wavelength_unit = unit
 
-    def process_2d_data_object(self, data_set, key, unit):
+    def process_2d_data_object(self, value, key, unit):
+        """
+        SASdata processor method for 2d data items
+        :param value: h5py Dataset from HDF5 file
+        :param key: canSAS_class attribute
+        :param unit: unit attribute
+        """
         if key == self.i_name:
-            self.current_dataset.data = data_set
+            if self.multi_frame:
+                self.data_frames = self._read_frames(value)
+            else:
+                self.current_dataset.data = value[()]
             self.current_dataset.zaxis("Intensity", unit)
-        elif key == self.i_uncertainties_name:
+            return
+        elif key == self.i_uncertainties_name and self.multi_frame:
+            self.data_uncertainty_frames = self._read_frames(value)
+            return
+        data_set = self._read_dataset(value)
+        if key == self.i_uncertainties_name:
             self.current_dataset.err_data = data_set.flatten()
         elif key in self.q_names:
             self.current_dataset.xaxis("Q_x", unit)
@@ -536,17 +573,28 @@ class Reader(FileReader):
             self.aperture = Aperture()
         elif self.parent_class == u'SASdata':
             if isinstance(self.current_dataset, plottable_2D):
-                self.data2d.append(self.current_dataset)
+                if self.multi_frame:
+                    for x in range(0, len(self.data_frames)):
+                        frame = copy.copy(self.current_dataset)
+                        frame.data = self.data_frames[x]
+                        if len(self.data_uncertainty_frames) > x:
+                            frame.err_data = \
+                                self.data_uncertainty_frames[x].flatten()
+                        self.data2d.append(frame)
+                else:
+                    self.data2d.append(self.current_dataset)
             elif isinstance(self.current_dataset, plottable_1D):
                 if self.multi_frame:
                     for x in range(0, len(self.data_frames)):
-                        self.current_dataset.y = self.data_frames[x]
+                        frame = copy.copy(self.current_dataset)
+                        frame.y = self.data_frames[x]
                         if len(self.data_uncertainty_frames) > x:
-                            self.current_dataset.dy = \
-                                self.data_uncertainty_frames[x]
-                        self.data1d.append(self.current_dataset)
+                            frame.dy = self.data_uncertainty_frames[x]
+                        self.data1d.append(frame)
                 else:
                     self.data1d.append(self.current_dataset)
+            self.data_frames = []
+            self.data_uncertainty_frames = []
 
     def final_data_cleanup(self):
         """
@@ -708,8 +756,57 @@ class Reader(FileReader):
         self.multi_frame = (i_vals is not None and q_vals is not None
                             and len(i_vals.shape) != 1
                             and len(q_vals.shape) == 1)
-        return (i_vals is not None and len(i_vals.shape) != 1
-                and not self.multi_frame)
+        is_2d = (i_vals is not None and len(i_vals.shape) != 1
+                 and not self.multi_frame)
+        if is_2d and q_vals is not None:
+            # Number of detector dimensions, the first axis of a single Q
+            # data set holds the Qx and Qy components
+            image_ndim = len(q_vals.shape)
+            if len(q_basename) > 1 and q_basename[0] == q_basename[1]:
+                image_ndim -= 1
+            # Frames of 2D data are stored along the first axis of I
+            self.multi_frame = len(i_vals.shape) > image_ndim
+        return is_2d
+
+    def _frame_indices(self, n_frames):
+        """
+        Find the indices of the frames selected for reading.
+
+        :param n_frames: number of frames in the data set
+        :return: list of frame indices
+        """
+        indices = list(range(n_frames))
+        if self.frames is None:
+            return indices
+        if isinstance(self.frames, slice):
+            return indices[self.frames]
+        frames = self.frames
+        if np.ndim(frames) == 0:
+            frames = [frames]
+        return [indices[int(frame)] for frame in frames]
+
+    def _read_frames(self, value):
+        """
+        Read the selected frames of a multi-framed data set, one frame at a
+        time, so the rest of the data set is never loaded into memory.
+
+        :param value: h5py Dataset with the frames along the first axis
+        :return: list of arrays, one per frame
+        """
+        return [value[index] for index in self._frame_indices(value.shape[0])]
+
+    @staticmethod
+    def _read_dataset(value):
+        """
+        Read the whole of a data set.
+
+        :param value: h5py Dataset
+        :return: the data set as a numpy array, or a string for string data
+        """
+        data_set = value[()]
+        if isinstance(data_set, bytes):
+            data_set = decode(data_set)
+        return data_set
 
     def _create_unique_key(self, dictionary, name, numb=0):
         """
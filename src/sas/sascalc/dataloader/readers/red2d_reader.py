@@ -41,6 +41,9 @@ class Reader(FileReader):
     ## Extension
     ext = ['.DAT', '.dat']
 
+    # Number of points formatted at once when writing
+    write_chunk = 10000
+
     def write(self, filename, data):
         """
         Write to .dat
@@ -51,21 +54,84 @@ class Reader(FileReader):
         # Write the file
         try:
             fd = open(filename, 'w')
-            t = time.localtime()
-            time_str = time.strftime("%H:%M on %b %d %y", t)
-
-            header_str = "Data columns are Qx - Qy - I(Qx,Qy)\n\nASCII data"
-            header_str += " created at %s \n\n" % time_str
-            # simple 2D header
-            fd.write(header_str)
+            fd.write(self.header_string())
             # write qx qy I values
-            for i in range(len(data.data)):
-                fd.write("%g  %g  %g\n" % (data.qx_data[i],
-                                            data.qy_data[i],
-                                           data.data[i]))
+            for lines in self.format_data_lines(data):
+                fd.write(lines)
         finally:
             fd.close()
 
+    @staticmethod
+    def header_string():
+        """
+        :return: the simple 2D header written before the data
+        """
+        t = time.localtime()
+        time_str = time.strftime("%H:%M on %b %d %y", t)
+
+        header_str = "Data columns are Qx - Qy - I(Qx,Qy)\n\nASCII data"
+        header_str += " created at %s \n\n" % time_str
+        return header_str
+
+    def format_data_lines(self, data):
+        """
+        Format the qx, qy and I values of the data points, write_chunk
+        points at a time.
+
+        :param data: data2D
+        :return: generator of strings holding the lines of each chunk
+        """
+        columns = np.column_stack((data.qx_data, data.qy_data, data.data))
+        for start in range(0, len(columns), self.write_chunk):
+            chunk = columns[start:start + self.write_chunk]
+            yield ("%g  %g  %g\n" * len(chunk)) % tuple(chunk.ravel().tolist())
+
+    def _read_data_points(self, data_lines, col_num):
+        """
+        Convert the data lines to an array of col_num rows.
+
+        The block is parsed in a single call; a block that does not hold
+        col_num numbers on every line goes through the token by token
+        conversion, where non numbers are set to zero.
+
+        :param data_lines: list of data lines
+        :param col_num: number of columns of data
+        :return: array of shape (col_num, len(data_lines))
+        """
+        row_num = len(data_lines)
+        try:
+            data_array = np.loadtxt(data_lines, comments=None, ndmin=2)
+            if data_array.shape == (row_num, col_num):
+                return data_array.transpose()
+        except ValueError:
+            pass
+
+        # make it as list again to control the separators
+        data_list = " ".join(data_lines)
+        # split all data to one big list w/" "separator
+        data_list = data_list.split()
+
+        # Check if the size is consistent with data, otherwise
+        #try the tab(\t) separator
+        # (this may be removed once get the confidence
+        #the former working all cases).
+        if len(data_list) != row_num * col_num:
+            data_list = "\t".join(data_lines)
+            data_list = data_list.split()
+
+        # Change it(string) into float
+        data_list1 = list(map(check_point, data_list))
+
+        # numpy array form
+        data_array = np.array(data_list1)
+        # Redimesion based on the row_num and col_num,
+        #otherwise raise an error.
+        try:
+            return data_array.reshape(row_num, col_num).transpose()
+        except Exception:
+            msg = "red2d_reader can't read this file: Incorrect number of data points provided."
+            raise FileContentsException(msg)
+
     def get_file_contents(self):
         # Read file
         buf = self.readall()
@@ -169,42 +235,11 @@ class Reader(FileReader):
                 col_num = len(line_toks)
                 break
 
-        # Make numpy array to remove header lines using index
-        lines_array = np.array(lines)
-
-        # index for lines_array
-        lines_index = np.arange(len(lines))
-
         # get the data lines
-        data_lines = lines_array[lines_index >= (line_num - 1)]
+        data_lines = lines[line_num - 1:]
         # Now we get the total number of rows (i.e., # of data points)
         row_num = len(data_lines)
-        # make it as list again to control the separators
-        data_list = " ".join(data_lines.tolist())
-        # split all data to one big list w/" "separator
-        data_list = data_list.split()
-
-        # Check if the size is consistent with data, otherwise
-        #try the tab(\t) separator
-        # (this may be removed once get the confidence
-        #the former working all cases).
-        if len(data_list) != (len(data_lines)) * col_num:
-            data_list = "\t".join(data_lines.tolist())
-            data_list = data_list.split()
-
-        # Change it(string) into float
-        #data_list = map(float,data_list)
-        data_list1 = list(map(check_point, data_list))
-
-        # numpy array form
-        data_array = np.array(data_list1)
-        # Redimesion based on the row_num and col_num,
-        #otherwise raise an error.
-        try:
-            data_point = data_array.reshape(row_num, col_num).transpose()
-        except Exception:
-            msg = "red2d_reader can't read this file: Incorrect number of data points provided."
-            raise FileContentsException(msg)
+        data_point = self._read_data_points(data_lines, col_num)
         ## Get the all data: Let's HARDcoding; Todo find better way
         # Defaults
         dqx_data = np.zeros(0)
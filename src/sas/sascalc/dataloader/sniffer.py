@@ -0,0 +1,90 @@
+"""
+Identify the format of a data file from its first few KB.
+
+The loader uses this when the reader registered for the file extension
+fails, or when no reader is registered for it, so that a single reader
+parses the file instead of each of the default readers in turn.
+"""
+
+import re
+
+# Number of bytes read from the start of the file
+HEADER_SIZE = 4096
+
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+# The HDF5 superblock may follow a user block of 512 * 2**n bytes
+HDF5_OFFSETS = (0, 512, 1024, 2048)
+TIFF_SIGNATURES = (b'II*\x00', b'MM\x00*')
+
+# Formats that are not text: no other reader is worth trying on them
+BINARY_FORMATS = ('hdf5', 'tiff')
+
+_BSL_INDICATORS = re.compile(r'^\s*(\d+\s+){9}\d+\s*$')
+
+
+def read_header(path, size=HEADER_SIZE):
+    """
+    Read the start of a file.
+
+    :param path: file path
+    :param size: number of bytes to read
+    :return: the first size bytes of the file
+    """
+    with open(path, 'rb') as fid:
+        return fid.read(size)
+
+
+def sniff_header(header):
+    """
+    Identify the format of a data file from its first bytes.
+
+    :param header: first bytes of the file
+    :return: one of 'hdf5', 'tiff', 'cansas', 'sesans', 'danse', 'red2d',
+        'abs', 'bsl' or None when the format is not recognized
+    """
+    if any(header[offset:offset + len(HDF5_SIGNATURE)] == HDF5_SIGNATURE
+           for offset in HDF5_OFFSETS):
+        return 'hdf5'
+    if header[:4] in TIFF_SIGNATURES:
+        return 'tiff'
+    if b'\x00' in header:
+        # Some other binary format
+        return None
+
+    text = header.decode('latin-1')
+    start = text.lstrip(u'\ufeff\xef\xbb\xbf \t\r\n')
+    if start.startswith('<'):
+        return 'cansas' if 'SASroot' in text else None
+
+    lines = text.splitlines()
+    first = lines[0].split() if lines else []
+    if first and first[0] == 'FileFormatVersion':
+        return 'sesans'
+    if first and first[0].startswith('FORMATVERSION:'):
+        return 'danse'
+    if any('Data columns' in line and 'Qx' in line for line in lines):
+        # IGOR/NIST 2D Q map, with or without the NIST header
+        return 'red2d'
+    if 'LABEL:' in text and ('The 6 columns' in text or '.bt5' in text):
+        # NIST/IGOR reduced 1D (.ABS) or USANS (.COR) data
+        return 'abs'
+    if len(lines) > 3 and _BSL_INDICATORS.match(lines[2]) \
+            and len(lines[3].split()) == 1:
+        # BSL/OTOKO header: two title lines, ten integer indicators
+        # and the name of the binary data file
+        return 'bsl'
+    return None
+
+
+def sniff(path):
+    """
+    Identify the format of a data file.
+
+    :param path: file path
+    :return: format name, see sniff_header, or None
+    """
+    try:
+        header = read_header(path)
+    except (IOError, OSError):
+        return None
+    return sniff_header(header)
@@ -140,54 +140,75 @@ class BSLLoader:
         self._swap_bytes = bool(swap_bytes)
 
 
-    def load_frames(self, frames):
+    def get_frames(self):
+        """
+        Maps the frames of the BSL data file into memory. Nothing is read
+        from the file until a frame is accessed.
+
+        :return: read-only np.memmap of shape (n_frames, n_rasters*n_pixels)
+            of 4 byte floats.
         """
-        Loads all frames of the BSl file into a Data2D object.
+        # Set dtype to 4 byte float, big or little endian depending on swap_bytes.
+        dtype = ('>f4', '<f4')[self.swap_bytes]
+        frame_size = self.n_pixels * self.n_rasters
+        n_bytes = self.n_frames * frame_size * np.dtype(dtype).itemsize
+        if os.path.getsize(self.filename) < n_bytes:
+            err_msg = "{} is too small to hold {} frames of {} pixels".format(
+                self.filename, self.n_frames, frame_size)
+            raise BSLParsingError(err_msg)
 
-        :param frames: Number of frames.
+        return np.memmap(self.filename, dtype=dtype, mode='r',
+                         shape=(self.n_frames, frame_size))
 
-        :return: Data2D frame_data.
+    def iter_frames(self, frames=None):
         """
-        frame_data = []
+        Generates a Data2D object for each of the selected frames. A frame is
+        only read from the file, and converted to 8 byte floats, when its
+        Data2D object is generated.
+
+        :param frames: list or slice of the frame numbers, all by default.
+
+        :return: generator of Data2D frame_data.
+        """
+        data = self.get_frames()
+        if frames is None:
+            frames = range(self.n_frames)
+        elif isinstance(frames, slice):
+            frames = range(self.n_frames)[frames]
+
         # Prepare axis values (arbitrary scale)
-        x = self.n_rasters * range(1, self.n_pixels+1)
-        y = [self.n_pixels * [i] for i in range(1, self.n_rasters+1)]
-        y = np.reshape(y, (1, self.n_pixels*self.n_rasters))[0]
+        x = np.tile(np.arange(1, self.n_pixels+1), self.n_rasters)
+        y = np.repeat(np.arange(1, self.n_rasters+1), self.n_pixels)
         x_bins = x[:self.n_pixels]
         y_bins = y[0::self.n_pixels]
 
         for frame in frames:
-            raw_frame_data = self.load_data(frame)
+            raw_frame_data = np.float64(data[frame])
             data2d = Data2D(data=raw_frame_data, qx_data=x, qy_data=y)
             data2d.x_bins = x_bins
             data2d.y_bins = y_bins
             data2d.Q_unit = '' # Using arbitrary units
-            frame_data.append(data2d)
+            yield data2d
 
-        return frame_data
+    def load_frames(self, frames):
+        """
+        Loads the selected frames of the BSl file into Data2D objects.
+
+        :param frames: list or slice of the frame numbers.
+
+        :return: list of Data2D frame_data.
+        """
+        return list(self.iter_frames(frames))
 
     def load_data(self, frame):
         """
-        Loads the file named in filename in 4 byte float, in either
-        little or big Endian depending on self.swap_bytes.
+        Loads a frame of the file named in filename, stored as 4 byte float
+        in either little or big Endian depending on self.swap_bytes.
 
         :param frame: The frame to load.
         :return: np array of loaded floats.
         """
-        # Set dtype to 4 byte float, big or little endian depending on swap_bytes.
-        dtype = ('>f4', '<f4')[self.swap_bytes]
-
-        # Size of float as stored in binary file should be 4 bytes.
-        float_size = 4
-
-        offset = self.n_pixels * self.n_rasters * frame * float_size
-
-        with open(self.filename, 'rb') as input_file:
-            input_file.seek(offset)
-            # CRUFT: With numpy 1.17, could use np.fromfile(self.filename, dtype=dtype, offset=offset).
-            data = np.float64(np.fromfile(input_file, dtype=dtype))
-
-        return data
+        return np.float64(self.get_frames()[frame])
 
     def __str__(self):
         """
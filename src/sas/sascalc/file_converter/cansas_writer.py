@@ -12,14 +12,13 @@ class CansasWriter(CansasReader):
         :param filename: name of the file to write
         :param datainfo: Data1D object
         """
-        # Create XML document
-        doc, _ = self._to_xml_doc(frame_data, sasentry_attrs)
-        if self.encoding is None:
-            self.encoding = "UTF-8"
-        # Write the file
-        with open(filename, 'wb') as file_ref:
-            doc.write(file_ref, encoding=self.encoding,
-                      pretty_print=True, xml_declaration=True)
+        self._streamed_idata = []
+        try:
+            # Create XML document, without the Idata elements
+            doc, _ = self._to_xml_doc(frame_data, sasentry_attrs)
+            self._write_doc(filename, doc)
+        finally:
+            self._streamed_idata = None
 
 
     def _to_xml_doc(self, frame_data, sasentry_attrs=None):
@@ -86,23 +85,9 @@ class CansasWriter(CansasReader):
         node = self.create_element("SASdata")
         self.append(node, entry_node)
 
-        for i in range(len(datainfo.x)):
-            point = self.create_element("Idata")
-            node.append(point)
-            self.write_node(point, "Q", datainfo.x[i],
-                            {'unit': datainfo.x_unit})
-            if len(datainfo.y) >= i:
-                self.write_node(point, "I", datainfo.y[i],
-                                {'unit': datainfo.y_unit})
-            if datainfo.dy is not None and len(datainfo.dy) > i:
-                self.write_node(point, "Idev", datainfo.dy[i],
-                                {'unit': datainfo.y_unit})
-            if datainfo.dx is not None and len(datainfo.dx) > i:
-                self.write_node(point, "Qdev", datainfo.dx[i],
-                                {'unit': datainfo.x_unit})
-            if datainfo.dxw is not None and len(datainfo.dxw) > i:
-                self.write_node(point, "dQw", datainfo.dxw[i],
-                                {'unit': datainfo.x_unit})
-            if datainfo.dxl is not None and len(datainfo.dxl) > i:
-                self.write_node(point, "dQl", datainfo.dxl[i],
-                                {'unit': datainfo.x_unit})
+        self._write_idata(node, [("Q", datainfo.x, datainfo.x_unit),
+                                 ("I", datainfo.y, datainfo.y_unit),
+                                 ("Idev", datainfo.dy, datainfo.y_unit),
+                                 ("Qdev", datainfo.dx, datainfo.x_unit),
+                                 ("dQw", datainfo.dxw, datainfo.x_unit),
+                                 ("dQl", datainfo.dxl, datainfo.x_unit)])
@@ -4,6 +4,7 @@
 
 import h5py
 import numpy as np
+import itertools
 import re
 import os
 
@@ -21,6 +22,28 @@ class NXcanSASWriter(Reader):
         The NXcanSAS writer requires h5py => v2.5.0 or later.
     """
 
+    def __init__(self, compression=None, compression_opts=None, chunks=None,
+                 float32=False, multi_frame=False):
+        """
+        :param compression: compression filter of the data arrays, 'gzip'
+            or 'lzf', None for uncompressed data
+        :param compression_opts: compression level, 0 to 9, for 'gzip'
+        :param chunks: chunk shape of the data arrays, True to let h5py
+            choose one, None for the default layout
+        :param float32: store the intensities and their uncertainties as 4
+            byte floats
+        :param multi_frame: write the data sets as the frames of a single
+            SASdata group, with I and Idev extended by one frame per data
+            set along a first axis. All frames must share the Q values of
+            the first one.
+        """
+        super(NXcanSASWriter, self).__init__()
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.chunks = chunks
+        self.float32 = float32
+        self.multi_frame = multi_frame
+
     def write(self, dataset, filename):
         """
         Write an array of Data1d or Data2D objects to an NXcanSAS file, as
@@ -28,7 +51,9 @@ class NXcanSASWriter(Reader):
         elememt in the array will be written as the SASentry metadata
         (detector, instrument, sample, etc).
 
-        :param dataset: A list of Data1D or Data2D objects to write
+        :param dataset: A list of Data1D or Data2D objects to write, or any
+            iterable of them, such as a generator of frames which are then
+            written one at a time
         :param filename: Where to write the NXcanSAS file
         """
 
@@ -86,13 +111,13 @@ class NXcanSASWriter(Reader):
                 if units is not None:
                     entry[names[2]].attrs['units'] = units
 
-        valid_data = all([isinstance(d, (Data1D, Data2D)) for d in dataset])
-        if not valid_data:
-            raise ValueError("All entries of dataset must be Data1D or Data2D"
-                             "objects")
+        if isinstance(dataset, (list, tuple)):
+            self._check_data(dataset)
+        dataset = iter(dataset)
 
         # Get run name and number from first Data object
-        data_info = dataset[0]
+        data_info = next(dataset, None)
+        self._check_data([data_info])
         run_number = ''
         run_name = ''
         if len(data_info.run) > 0:
@@ -109,15 +134,26 @@ class NXcanSASWriter(Reader):
         sasentry.attrs['canSAS_class'] = 'SASentry'
         sasentry.attrs['version'] = '1.0'
 
-        for i, data_obj in enumerate(dataset):
-            data_entry = sasentry.create_group("sasdata{0:0=2d}".format(i+1))
-            data_entry.attrs['canSAS_class'] = 'SASdata'
-            if isinstance(data_obj, Data1D):
-                self._write_1d_data(data_obj, data_entry)
-            elif isinstance(data_obj, Data2D):
-                self._write_2d_data(data_obj, data_entry)
+        try:
+            for i, data_obj in enumerate(itertools.chain([data_info],
+                                                         dataset)):
+                self._check_data([data_obj])
+                if self.multi_frame and i > 0:
+                    self._append_frame(data_obj, data_entry)
+                    continue
+                data_entry = sasentry.create_group(
+                    "sasdata{0:0=2d}".format(i+1))
+                data_entry.attrs['canSAS_class'] = 'SASdata'
+                if isinstance(data_obj, Data1D):
+                    self._write_1d_data(data_obj, data_entry)
+                elif isinstance(data_obj, Data2D):
+                    self._write_2d_data(data_obj, data_entry)
+        except Exception:
+            # Don't leave a partly written file behind
+            f.close()
+            os.remove(filename)
+            raise
 
-        data_info = dataset[0]
         # Sample metadata
         sample_entry = sasentry.create_group('sassample')
         sample_entry.attrs['canSAS_class'] = 'SASsample'
@@ -285,6 +321,18 @@ class NXcanSASWriter(Reader):
 
         f.close()
 
+    @staticmethod
+    def _check_data(dataset):
+        """
+        Checks that all the entries of dataset can be written
+
+        :param dataset: A list of data objects
+        """
+        valid_data = all([isinstance(d, (Data1D, Data2D)) for d in dataset])
+        if not valid_data:
+            raise ValueError("All entries of dataset must be Data1D or Data2D"
+                             "objects")
+
     def _write_1d_data(self, data_obj, data_entry):
         """
         Writes the contents of a Data1D object to a SASdata h5py Group
@@ -293,25 +341,30 @@ class NXcanSASWriter(Reader):
         :param data_entry: A h5py Group object representing the SASdata
         """
         data_entry.attrs['signal'] = 'I'
-        data_entry.attrs['I_axes'] = 'Q'
-        data_entry.attrs['Q_indices'] = [0]
-        q_entry = data_entry.create_dataset('Q', data=data_obj.x)
+        if self.multi_frame:
+            data_entry.attrs['I_axes'] = '.,Q'
+            data_entry.attrs['Q_indices'] = [1]
+        else:
+            data_entry.attrs['I_axes'] = 'Q'
+            data_entry.attrs['Q_indices'] = [0]
+        q_entry = self._create_dataset(data_entry, 'Q', data_obj.x)
         q_entry.attrs['units'] = data_obj.x_unit
-        i_entry = data_entry.create_dataset('I', data=data_obj.y)
+        i_entry = self._create_intensity(data_entry, 'I', data_obj.y)
         i_entry.attrs['units'] = data_obj.y_unit
         if data_obj.dy is not None:
             i_entry.attrs['uncertainties'] = 'Idev'
-            i_dev_entry = data_entry.create_dataset('Idev', data=data_obj.dy)
+            i_dev_entry = self._create_intensity(data_entry, 'Idev',
+                                                 data_obj.dy)
             i_dev_entry.attrs['units'] = data_obj.y_unit
         if data_obj.dx is not None:
             q_entry.attrs['resolutions'] = 'dQ'
-            dq_entry = data_entry.create_dataset('dQ', data=data_obj.dx)
+            dq_entry = self._create_dataset(data_entry, 'dQ', data_obj.dx)
             dq_entry.attrs['units'] = data_obj.x_unit
         elif data_obj.dxl is not None:
             q_entry.attrs['resolutions'] = ['dQl','dQw']
-            dql_entry = data_entry.create_dataset('dQl', data=data_obj.dxl)
+            dql_entry = self._create_dataset(data_entry, 'dQl', data_obj.dxl)
             dql_entry.attrs['units'] = data_obj.x_unit
-            dqw_entry = data_entry.create_dataset('dQw', data=data_obj.dxw)
+            dqw_entry = self._create_dataset(data_entry, 'dQw', data_obj.dxw)
             dqw_entry.attrs['units'] = data_obj.x_unit
 
     def _write_2d_data(self, data, data_entry):
@@ -322,8 +375,12 @@ class NXcanSASWriter(Reader):
         :param data_entry: A h5py Group object representing the SASdata
         """
         data_entry.attrs['signal'] = 'I'
-        data_entry.attrs['I_axes'] = 'Qx,Qy'
-        data_entry.attrs['Q_indices'] = [0,1]
+        if self.multi_frame:
+            data_entry.attrs['I_axes'] = '.,Qx,Qy'
+            data_entry.attrs['Q_indices'] = [1,2]
+        else:
+            data_entry.attrs['I_axes'] = 'Qx,Qy'
+            data_entry.attrs['Q_indices'] = [0,1]
 
         (n_rows, n_cols) = (len(data.y_bins), len(data.x_bins))
 
@@ -340,29 +397,105 @@ class NXcanSASWriter(Reader):
         qx = np.reshape(data.qx_data, (n_rows, n_cols))
         qy = np.reshape(data.qy_data, (n_rows, n_cols))
 
-        i_entry = data_entry.create_dataset('I', data=intensity)
+        i_entry = self._create_intensity(data_entry, 'I', intensity)
         i_entry.attrs['units'] = data.I_unit
-        qx_entry = data_entry.create_dataset('Qx', data=qx)
+        qx_entry = self._create_dataset(data_entry, 'Qx', qx)
         qx_entry.attrs['units'] = data.Q_unit
-        qy_entry = data_entry.create_dataset('Qy', data=qy)
+        qy_entry = self._create_dataset(data_entry, 'Qy', qy)
         qy_entry.attrs['units'] = data.Q_unit
         if (data.err_data is not None
                 and not all(v is None for v in data.err_data)):
             d_i = np.reshape(data.err_data, (n_rows, n_cols))
             i_entry.attrs['uncertainties'] = 'Idev'
-            i_dev_entry = data_entry.create_dataset('Idev', data=d_i)
+            i_dev_entry = self._create_intensity(data_entry, 'Idev', d_i)
             i_dev_entry.attrs['units'] = data.I_unit
         if (data.dqx_data is not None
                 and not all(v is None for v in data.dqx_data)):
             qx_entry.attrs['resolutions'] = 'dQx'
-            dqx_entry = data_entry.create_dataset('dQx', data=data.dqx_data)
+            dqx = np.reshape(data.dqx_data, (n_rows, n_cols))
+            dqx_entry = self._create_dataset(data_entry, 'dQx', dqx)
             dqx_entry.attrs['units'] = data.Q_unit
         if (data.dqy_data is not None
                 and not all(v is None for v in data.dqy_data)):
             qy_entry.attrs['resolutions'] = 'dQy'
-            dqy_entry = data_entry.create_dataset('dQy', data=data.dqy_data)
+            dqy = np.reshape(data.dqy_data, (n_rows, n_cols))
+            dqy_entry = self._create_dataset(data_entry, 'dQy', dqy)
             dqy_entry.attrs['units'] = data.Q_unit
         if data.mask is not None and not all(v is None for v in data.mask):
             data_entry.attrs['mask'] = "mask"
             mask = np.invert(np.asarray(data.mask, dtype=bool))
-            data_entry.create_dataset('mask', data=mask)
+            mask = np.reshape(mask, (n_rows, n_cols))
+            self._create_dataset(data_entry, 'mask', mask)
+
+    def _create_dataset(self, data_entry, name, data, maxshape=None):
+        """
+        Creates a data array in a SASdata group, with the compression and
+        chunking options of the writer
+
+        :param data_entry: A h5py Group object representing the SASdata
+        :param name: name of the data array
+        :param data: the values to write
+        :param maxshape: maximum shape of an extendable array
+        :return: the h5py Dataset
+        """
+        data = np.asarray(data)
+        options = {}
+        if data.ndim > 0 and data.size > 0:
+            # Scalars can't be chunked or compressed
+            if self.compression is not None:
+                options['compression'] = self.compression
+                options['compression_opts'] = self.compression_opts
+            if self.chunks is not None:
+                options['chunks'] = self.chunks
+            if maxshape is not None:
+                options['maxshape'] = maxshape
+                if self.chunks is None:
+                    # A frame per chunk
+                    options['chunks'] = (1,) + data.shape[1:]
+        return data_entry.create_dataset(name, data=data, **options)
+
+    def _create_intensity(self, data_entry, name, data):
+        """
+        Creates an intensity array, I or Idev, as 4 byte floats if asked for
+        and as the first frame of an extendable array in multi-frame mode
+
+        :param data_entry: A h5py Group object representing the SASdata
+        :param name: name of the data array
+        :param data: the values to write
+        :return: the h5py Dataset
+        """
+        data = np.asarray(data)
+        if self.float32:
+            data = data.astype(np.float32)
+        if self.multi_frame:
+            return self._create_dataset(data_entry, name, data[np.newaxis],
+                                        maxshape=(None,) + data.shape)
+        return self._create_dataset(data_entry, name, data)
+
+    def _append_frame(self, data_obj, data_entry):
+        """
+        Appends the intensities of a data set as a new frame of the I and
+        Idev arrays of a SASdata group
+
+        :param data_obj: A Data1D or Data2D object of the same type and size
+            as the first frame
+        :param data_entry: A h5py Group object representing the SASdata
+        """
+        if isinstance(data_obj, Data1D):
+            is_2d = False
+            frames = [('I', data_obj.y), ('Idev', data_obj.dy)]
+        else:
+            is_2d = True
+            frames = [('I', data_obj.data), ('Idev', data_obj.err_data)]
+        if is_2d != ('Qx' in data_entry):
+            raise ValueError("All frames must be either Data1D or Data2D "
+                             "objects")
+        for name, values in frames:
+            if name not in data_entry:
+                continue
+            dataset = data_entry[name]
+            if values is None:
+                raise ValueError("{} is missing from a frame".format(name))
+            values = np.reshape(values, dataset.shape[1:])
+            dataset.resize(dataset.shape[0] + 1, axis=0)
+            dataset[-1] = values
@@ -1,5 +1,4 @@
 import os
-import time
 from sas.sascalc.dataloader.readers.red2d_reader import Reader as Red2DReader
 
 class Red2DWriter(Red2DReader):
@@ -10,26 +9,22 @@ class Red2DWriter(Red2DReader):
 
         :param filename: file name to write
         :param data: data2D
+        :param thread: the writing stops when thread.isquit() is true,
+            which is checked after every write_chunk points
+        :return: False if the writing was stopped, otherwise True
         """
         # Write the file
         fd = open(filename, 'w')
-        t = time.localtime()
-        time_str = time.strftime("%H:%M on %b %d %y", t)
-
-        header_str = "Data columns are Qx - Qy - I(Qx,Qy)\n\nASCII data"
-        header_str += " created at %s \n\n" % time_str
         # simple 2D header
-        fd.write(header_str)
+        fd.write(self.header_string())
         # write qx qy I values
-        for i in range(len(data.data)):
+        for lines in self.format_data_lines(data):
             if thread.isquit():
                 fd.close()
                 os.remove(filename)
                 return False
 
-            fd.write("%g  %g  %g\n" % (data.qx_data[i],
-                                        data.qy_data[i],
-                                       data.data[i]))
+            fd.write(lines)
 
         fd.close()
 
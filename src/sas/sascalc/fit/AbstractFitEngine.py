@@ -161,7 +161,7 @@ class FitData1D(Data1D):
         # Check error bar; if no error bar found, set it constant(=1)
         # TODO: Should provide an option for users to set it like percent,
         # constant, or dy data
-        if dy is None or dy == [] or dy.all() == 0:
+        if dy is None or len(dy) == 0 or not np.all(dy):
             self.dy = np.ones(len(y))
         else:
             self.dy = np.asarray(dy).copy()
@@ -598,6 +598,9 @@ class FResult(object):
         self.iterations = 0
         self.inputs = []
         self.fitter_id = None
+        # Model evaluations served from the cache of the fitness or computed
+        self.cache_hits = 0
+        self.cache_misses = 0
         if self.model is not None and self.data is not None:
             self.inputs = [(self.model, self.data)]
 
@@ -611,6 +614,13 @@ class FResult(object):
         """
         self.fitness = fitness
 
+    def cache_hit_rate(self):
+        """
+        Fraction of the model evaluations of the fit served from the cache
+        """
+        calls = self.cache_hits + self.cache_misses
+        return float(self.cache_hits) / calls if calls else 0.0
+
     def __str__(self):
         """
         """
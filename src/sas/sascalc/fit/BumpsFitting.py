@@ -4,6 +4,7 @@ BumpsFitting module runs the bumps optimizer.
 from __future__ import print_function
 
 import os
+from collections import OrderedDict
 from datetime import timedelta, datetime
 import traceback
 
@@ -19,6 +20,11 @@ try:
     FIT_CONFIG.selected_id = fitters.LevenbergMarquardtFit.id
     def get_fitter():
         return FIT_CONFIG.selected_fitter, FIT_CONFIG.selected_values
+    def get_fit_options():
+        return FIT_CONFIG.selected_id, dict(FIT_CONFIG.selected_values)
+    def set_fit_options(fit_id, values):
+        FIT_CONFIG.selected_id = fit_id
+        FIT_CONFIG.values[fit_id].update(values)
 except ImportError:
     # CRUFT: Bumps changed its handling of fit options around 0.7.5.6
     # Preserve bumps default fitter in case someone wants it later
@@ -28,6 +34,12 @@ except ImportError:
     def get_fitter():
         fitopts = fitters.FIT_OPTIONS[fitters.FIT_DEFAULT]
         return fitopts.fitclass, fitopts.options.copy()
+    def get_fit_options():
+        fitopts = fitters.FIT_OPTIONS[fitters.FIT_DEFAULT]
+        return fitters.FIT_DEFAULT, fitopts.options.copy()
+    def set_fit_options(fit_id, values):
+        fitters.FIT_DEFAULT = fit_id
+        fitters.FIT_OPTIONS[fit_id].options.update(values)
 
 
 from bumps.mapper import SerialMapper, MPMapper
@@ -117,9 +129,24 @@ class ConvergenceMonitor(object):
 # define reference parameters for each sas parameter, but then we would not
 # be able to express constraints using python expressions in the usual way
 # from bumps, and would instead need to use string expressions.
+# Memory used by each SasFitness to remember the theory and residuals of
+# the parameter vectors already evaluated [bytes]
+EVAL_CACHE_BYTES = 16 * 2**20
+
+def _nbytes(arrays):
+    """
+    Memory used by a sequence of arrays
+    """
+    return sum(np.asarray(v).nbytes for v in arrays)
+
 class SasFitness(object):
     """
     Wrap SAS model as a bumps fitness object
+
+    The theory and residuals of the last parameter vectors, up to
+    EVAL_CACHE_BYTES, are kept, so that the optimizer returning to a point
+    it already visited doesn't evaluate the model again. cache_hits and
+    cache_misses count the evaluations served from the cache and computed.
     """
     def __init__(self, model, data, fitted=[], constraints={},
                  initial_values=None, **kw):
@@ -141,6 +168,10 @@ class SasFitness(object):
         #print("constraints", constraints)
         self.constraints = dict(constraints)
         self.set_fitted(fitted)
+        self.cache_bytes = EVAL_CACHE_BYTES
+        self.cache_hits = self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._cache_nbytes = 0
         self.update()
 
     def _reset_pars(self, names, values):
@@ -206,8 +237,20 @@ class SasFitness(object):
 
     def _recalculate(self):
         if self._dirty:
-            self._residuals, self._theory \
-                = self.data.residuals(self.model.evalDistribution)
+            # The exact parameter values, in a fixed order
+            key = tuple(self._pars[k].value for k in sorted(self._pars))
+            value = self._cache.pop(key, None)
+            if value is None:
+                self.cache_misses += 1
+                value = self.data.residuals(self.model.evalDistribution)
+                self._cache_nbytes += _nbytes(value)
+            else:
+                self.cache_hits += 1
+            # Most recently used last
+            self._cache[key] = value
+            while self._cache and self._cache_nbytes > self.cache_bytes:
+                self._cache_nbytes -= _nbytes(self._cache.popitem(last=False)[1])
+            self._residuals, self._theory = value
             self._dirty = False
 
     def numpoints(self):
@@ -309,6 +352,8 @@ class BumpsFit(FitEngine):
             R.residuals = fitness.residuals()
             R.index = fitness.data.idx
             R.fitter_id = self.fitter_id
+            R.cache_hits = fitness.cache_hits
+            R.cache_misses = fitness.cache_misses
             # TODO: should scale stderr by sqrt(chisq/DOF) if dy is unknown
             R.success = result['success']
             if R.success:
@@ -0,0 +1,268 @@
+"""
+Run the independent fits of a batch in a pool of processes.
+
+Each fitter of the batch, usually a BumpsFit holding the model and data
+of one data set, is pickled and fitted in a worker process. The results
+come back one fitter at a time, in the batch order, as soon as the fit is
+done.
+
+sasmodels builds the classes of its models at run time, so they can't be
+pickled by reference. Models are pickled by their id, the file defining
+them and their state, and rebuilt from the sasmodels model registry, or
+from the file for plugin models, when unpickled. Product models are
+pickled by the ids and files of their form and structure factors.
+"""
+from __future__ import print_function
+
+import io
+import pickle
+import traceback
+from multiprocessing import Event, Pool, TimeoutError, cpu_count
+
+from sasmodels import sasview_model
+from sasmodels.product import make_product_info
+from sasmodels.sasview_model import SasviewModel, make_model_from_info
+
+from .BumpsFitting import get_fit_options, set_fit_options
+
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+# Seconds between abort checks while waiting for a fit to end
+POLL_INTERVAL = 0.1
+
+# Abort flag of a worker process, shared with the parent process
+_abort_event = None
+# Product model classes built in this process
+_PRODUCT_CLASSES = {}
+
+
+class _ModelPickler(pickle.Pickler):
+    """
+    Pickler storing sasmodels models by id, file and state
+    """
+    def __init__(self, fid):
+        pickle.Pickler.__init__(self, fid, PROTOCOL)
+        self._models = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, SasviewModel):
+            return None
+        key = id(obj)
+        if key in self._models:
+            return ('model', self._models[key][0])
+        index = len(self._models)
+        # Keep obj alive so that its id isn't reused
+        self._models[key] = (index, obj)
+        state = dict(obj.__dict__)
+        state.pop('_model', None)
+        return ('model', index, model_spec(obj.__class__), state)
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    """
+    Unpickler rebuilding the models stored by _ModelPickler
+    """
+    def __init__(self, fid):
+        pickle.Unpickler.__init__(self, fid)
+        self._models = {}
+
+    def persistent_load(self, pid):
+        if len(pid) == 2:
+            return self._models[pid[1]]
+        _, index, spec, state = pid
+        cls = model_class(spec)
+        model = cls.__new__(cls)
+        model.__dict__.update(state)
+        self._models[index] = model
+        return model
+
+
+def dumps(obj):
+    """
+    Pickle an object that may hold sasmodels models.
+
+    :param obj: object to pickle
+    :return: bytes
+    """
+    fid = io.BytesIO()
+    _ModelPickler(fid).dump(obj)
+    return fid.getvalue()
+
+
+def loads(data):
+    """
+    Unpickle an object pickled by dumps.
+
+    :param data: bytes
+    :return: the object
+    """
+    return _ModelUnpickler(io.BytesIO(data)).load()
+
+
+def model_spec(cls):
+    """
+    Describe a sasmodels model class so that model_class can rebuild it.
+
+    :param cls: model class
+    :return: (id, filename) of the model, or ('product', (id, filename) of
+        the form factor, (id, filename) of the structure factor)
+    """
+    composition = getattr(cls._model_info, 'composition', None)
+    if composition is not None and composition[0] == 'product':
+        return ('product',) + tuple((info.id, info.filename)
+                                    for info in composition[1])
+    return cls.id, getattr(cls, 'filename', None)
+
+
+def model_class(spec):
+    """
+    Find or build the sasmodels model class described by model_spec.
+
+    :param spec: description returned by model_spec
+    :return: the model class
+    :raise ValueError: when a model can't be found
+    """
+    if spec[0] != 'product':
+        return find_model_class(*spec)
+    if spec not in _PRODUCT_CLASSES:
+        p_cls, s_cls = [find_model_class(*part) for part in spec[1:]]
+        info = make_product_info(p_cls._model_info, s_cls._model_info)
+        _PRODUCT_CLASSES[spec] = make_model_from_info(info)
+    return _PRODUCT_CLASSES[spec]
+
+
+def find_model_class(model_id, filename):
+    """
+    Find the class of a sasmodels model.
+
+    :param model_id: id of the model
+    :param filename: file defining the model
+    :return: the model class
+    :raise ValueError: when the model can't be found
+    """
+    if not sasview_model.MODELS:
+        sasview_model.load_standard_models()
+    for cls in list(sasview_model.MODELS.values()):
+        if getattr(cls, 'id', None) == model_id \
+                and getattr(cls, 'filename', None) == filename:
+            return cls
+    if filename is None:
+        raise ValueError("unknown model %r" % model_id)
+    # Plugin model not loaded in this process yet
+    return sasview_model.load_custom_model(filename)
+
+
+class _AbortMonitor(object):
+    """
+    Stands for the fit thread in a worker process: the fit stops when the
+    parent process sets the abort event.
+    """
+    def isquit(self):
+        if _abort_event is not None and _abort_event.is_set():
+            raise KeyboardInterrupt("Fitting: terminated by the user.")
+
+
+def _init_worker(abort_event, fit_options):
+    """
+    Initialize a worker process
+
+    :param abort_event: event set to stop the fits
+    :param fit_options: (id, settings) of the optimizer selected in the
+        parent process, which spawned workers don't inherit
+    """
+    global _abort_event
+    _abort_event = abort_event
+    set_fit_options(*fit_options)
+
+
+def _fit_in_process(job):
+    """
+    Run the fit of a pickled fitter.
+
+    :param job: (pickled fitter, reset_flag)
+    :return: (pickled list of FResult, traceback of an error)
+    """
+    if _abort_event is not None and _abort_event.is_set():
+        return None, None
+    data, reset_flag = job
+    try:
+        fitter = loads(data)
+        result = fitter.fit(handler=None, curr_thread=_AbortMonitor(),
+                            reset_flag=reset_flag)
+        return dumps(result), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _restore_inputs(fitter, result):
+    """
+    Point the results at the models and data of the fitter in this process
+    rather than at their copies, and set the fitted parameter values in the
+    models as a fit in this process would.
+    """
+    arranges = [M for M in fitter.fit_arrange_dict.values() if M.get_to_fit()]
+    for res, arrange in zip(result, arranges):
+        res.model = arrange.get_model().model
+        res.data = arrange.get_data()
+        res.inputs = [(res.model, res.data)]
+        if res.success:
+            for name, value in zip(res.param_list, res.pvec):
+                res.model.setParam(name, value)
+
+
+def fit_batch(fitters, workers=None, reset_flag=True, handler=None,
+              curr_thread=None):
+    """
+    Run the fitters of a batch in parallel.
+
+    The fits are independent: each one starts from the state of its
+    fitter when the batch starts, so results can't be chained.
+
+    :param fitters: list of fitters, such as BumpsFit objects
+    :param workers: number of processes, defaults to the number of cores
+    :param reset_flag: start each fit from the values set in its fitter
+    :param handler: FitHandler told about the progress of the batch
+    :param curr_thread: thread running the batch; its isquit method raises
+        KeyboardInterrupt to stop the fits
+    :return: iterator over the result of each fitter, a list of FResult,
+        in the order of fitters
+    :raise KeyboardInterrupt: when curr_thread is stopped
+    :raise RuntimeError: when a fit fails, with the error of the worker
+    """
+    fitters = list(fitters)
+    if workers is None:
+        workers = cpu_count()
+    workers = max(1, min(workers, len(fitters)))
+    jobs = [(dumps(fitter), reset_flag) for fitter in fitters]
+    abort_event = Event()
+    pool = Pool(workers, initializer=_init_worker,
+                initargs=(abort_event, get_fit_options()))
+    try:
+        results = pool.imap(_fit_in_process, jobs)
+        for count, fitter in enumerate(fitters, 1):
+            while True:
+                try:
+                    data, error = results.next(POLL_INTERVAL)
+                    break
+                except TimeoutError:
+                    if curr_thread is not None:
+                        try:
+                            curr_thread.isquit()
+                        except KeyboardInterrupt:
+                            # Let the running fits end at their next step
+                            abort_event.set()
+                            pool.close()
+                            pool.join()
+                            raise
+            if error is not None:
+                raise RuntimeError(error)
+            if data is None:
+                raise KeyboardInterrupt("Fitting: terminated by the user.")
+            result = loads(data)
+            _restore_inputs(fitter, result)
+            if handler is not None:
+                handler.progress(count, len(fitters))
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,348 @@
+"""
+Batch fitting without the GUI.
+
+Fits each data set of a list of data files with the model, parameters,
+fit range, resolution and weighting saved in a fit page (.fitv), as the
+batch fit of the fitting perspective does, then writes a table of the
+fitted parameters and the fit of each data set.
+
+Run with::
+
+    python -m sas.sascalc.fit.batchfit page.fitv "data/*.xml" -o results -j 4
+
+Each fit starts from the parameter values of the fit page, so the fits
+of a batch are independent and run in *workers* processes. With --chain,
+each fit starts from the result of the previous one, as with Chain
+Fitting in the GUI, and the fits run one after the other.
+"""
+from __future__ import print_function, division
+
+import os
+import csv
+import glob
+import logging
+import argparse
+
+import numpy as np
+import h5py
+
+from sas.sascalc.dataloader.loader import Loader
+from sas.sascalc.dataloader.data_info import Data2D
+
+from .BumpsFitting import BumpsFit
+from .batch import fit_batch
+from .fitstate import FitState, make_model, make_data, get_data_weight
+
+logger = logging.getLogger(__name__)
+
+# Base name of the parameter table written by run
+TABLE_NAME = "batch_fit"
+
+
+def load_page(fitfile, page=0):
+    """
+    Load a saved fit page.
+
+    :param fitfile: fit page (.fitv) or project (.svs) file
+    :param page: index of the fit page in the file
+    :return: PageState
+    :raise ValueError: when the file has no such fit page
+    """
+    fits = FitState(fitfile).fits
+    if page >= len(fits):
+        raise ValueError("%s has %d fit pages" % (fitfile, len(fits)))
+    return fits[page]
+
+
+def find_files(patterns):
+    """
+    Expand the glob patterns of the data files.
+
+    :param patterns: list of file names or glob patterns
+    :return: list of file names, in the order of the patterns
+    :raise ValueError: when a pattern matches no file
+    """
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise ValueError("no file matches %s" % pattern)
+        files.extend(matches)
+    return files
+
+
+def load_data(files, loader=None):
+    """
+    Load the data sets of the data files.
+
+    :param files: list of file names
+    :param loader: Loader, created if not given
+    :return: list of (name, data) for each data set of each file, where
+        name is the file name, followed by the index of the data set for
+        files holding several data sets
+    """
+    if loader is None:
+        loader = Loader()
+    datasets = []
+    for path in files:
+        entries = loader.load(path)
+        name = os.path.basename(path)
+        if len(entries) == 1:
+            datasets.append((name, entries[0]))
+        else:
+            datasets.extend(("%s:%d" % (name, index), data)
+                            for index, data in enumerate(entries))
+    return datasets
+
+
+def make_fitters(state, datasets, sparse_tolerance=None):
+    """
+    Build the fitters of a batch.
+
+    The fitters share the model of the fit page, as the fitters of the
+    GUI batch fit share the model of their page.
+
+    :param state: PageState of the fit page
+    :param datasets: list of (name, data)
+    :param sparse_tolerance: relative weight below which 1D resolution
+        weights are dropped, or None to apply the full resolution
+    :return: list of BumpsFit, one for each data set
+    :raise ValueError: when the fit page has no fitted parameters, or a
+        data set doesn't have the dimension of the fit page
+    """
+    model, fitted = make_model(state)
+    if not fitted:
+        raise ValueError("no fitted parameters in the fit page")
+    fitters = []
+    for fit_id, (name, data) in enumerate(datasets):
+        if isinstance(data, Data2D) != bool(state.enable2D):
+            raise ValueError("%s: the fit page is for %s data"
+                             % (name, "2D" if state.enable2D else "1D"))
+        data, smearer = make_data(state, model, data, sparse_tolerance)
+        # Weight the fit as the GUI does, through the data uncertainties
+        weight = get_data_weight(state, data)
+        if weight is not None:
+            if state.enable2D:
+                data.err_data = weight
+            else:
+                data.dy = weight
+        fitter = BumpsFit()
+        fitter.fitter_id = fit_id
+        fitter.set_model(model, fit_id, fitted, data=data)
+        fitter.set_data(data=data, id=fit_id, smearer=smearer,
+                        qmin=state.qmin, qmax=state.qmax)
+        fitter.select_problem_for_fit(id=fit_id, value=1)
+        fitters.append(fitter)
+    return fitters
+
+
+def fit_all(fitters, workers=1, chain=False):
+    """
+    Run the fits of a batch.
+
+    :param fitters: list of BumpsFit
+    :param workers: number of processes running independent fits
+    :param chain: start each fit from the result of the previous one
+    :return: iterator over the FResult of each fitter, in order
+    """
+    if workers > 1 and not chain and len(fitters) > 1:
+        for result in fit_batch(fitters, workers=workers, reset_flag=True):
+            yield result[0]
+        return
+    for fitter in fitters:
+        result = fitter.fit(reset_flag=not chain)[0]
+        if result.success:
+            # Start the next fit from this result
+            for name, value in zip(result.param_list, result.pvec):
+                result.model.setParam(name, value)
+        yield result
+
+
+def parameter_columns(results):
+    """
+    List the fitted parameters of a batch.
+
+    :param results: list of FResult
+    :return: list of parameter names, in the order of the first results
+    """
+    columns = []
+    for result in results:
+        columns.extend(name for name in result.param_list
+                       if name not in columns)
+    return columns
+
+
+def parameter_rows(names, results):
+    """
+    Build the rows of the parameter table of a batch.
+
+    Failed fits and parameters missing from a fit are NaN.
+
+    :param names: name of the data set of each result
+    :param results: list of FResult
+    :return: (column names, rows of chi2, parameter values and errors)
+    """
+    columns = parameter_columns(results)
+    header = ["Data", "Chi2"]
+    for param in columns:
+        header.extend([param, "error on %s" % param])
+    rows = []
+    for name, result in zip(names, results):
+        row = [np.NaN] * (2*len(columns) + 1)
+        if result.success:
+            row[0] = result.fitness
+            for index, param in enumerate(result.param_list):
+                column = 2*columns.index(param) + 1
+                row[column] = result.pvec[index]
+                if result.stderr is not None:
+                    row[column + 1] = result.stderr[index]
+        rows.append([name] + row)
+    return header, rows
+
+
+def fit_curve(result):
+    """
+    Tabulate the fit of a data set over the fitted points.
+
+    :param result: FResult
+    :return: (column names, 2D array with a column for each name)
+    """
+    data, index = result.data, result.index
+    if isinstance(data.sas_data, Data2D):
+        header = ["Qx", "Qy", "I", "dI", "I_fit", "residual"]
+        columns = [data.qx_data[index], data.qy_data[index],
+                   data.data[index], data.res_err_data[index]]
+    else:
+        header = ["Q", "I", "dI", "I_fit", "residual"]
+        columns = [data.x[index], data.y[index], data.dy[index]]
+    columns += [result.theory, result.residuals]
+    return header, np.column_stack(columns)
+
+
+def write_csv(path, names, results):
+    """
+    Write the parameter table of a batch to a CSV file and the fit of each
+    data set to a text file named after the data set in the same folder.
+
+    :param path: name of the CSV file
+    :param names: name of the data set of each result
+    :param results: list of FResult
+    """
+    header, rows = parameter_rows(names, results)
+    with open(path, 'w') as fid:
+        writer = csv.writer(fid, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+    folder = os.path.dirname(path)
+    for name, result in zip(names, results):
+        columns, values = fit_curve(result)
+        filename = os.path.join(folder, "%s_fit.txt" % name.replace(':', '_'))
+        np.savetxt(filename, values, header="  ".join(columns))
+
+
+def write_hdf5(path, names, results):
+    """
+    Write the parameter table of a batch and the fit of each data set to
+    an HDF5 file: the table as a dataset for each column of the
+    "parameters" group, and the fits as groups named after their data
+    sets in the "fits" group.
+
+    :param path: name of the HDF5 file
+    :param names: name of the data set of each result
+    :param results: list of FResult
+    """
+    header, rows = parameter_rows(names, results)
+    with h5py.File(path, 'w') as fid:
+        table = fid.create_group("parameters")
+        table.create_dataset("Data", data=np.array(names, dtype='S'))
+        values = np.array([row[1:] for row in rows], dtype=float)
+        for column, label in enumerate(header[1:]):
+            table.create_dataset(label, data=values[:, column])
+        fits = fid.create_group("fits")
+        for name, result in zip(names, results):
+            group = fits.create_group(name)
+            columns, values = fit_curve(result)
+            for column, label in enumerate(columns):
+                group.create_dataset(label, data=values[:, column])
+
+
+WRITERS = {
+    'csv': write_csv,
+    'hdf5': write_hdf5,
+}
+EXTENSIONS = {
+    'csv': '.csv',
+    'hdf5': '.h5',
+}
+
+
+def run(fitfile, patterns, output=".", workers=1, chain=False, page=0,
+        file_format='csv', sparse_tolerance=None):
+    """
+    Fit data files with a saved fit page and write the results.
+
+    :param fitfile: fit page (.fitv) or project (.svs) file
+    :param patterns: list of data file names or glob patterns
+    :param output: folder of the results
+    :param workers: number of processes running independent fits
+    :param chain: start each fit from the result of the previous one
+    :param page: index of the fit page in fitfile
+    :param file_format: 'csv' or 'hdf5'
+    :param sparse_tolerance: relative weight below which 1D resolution
+        weights are dropped, or None to apply the full resolution
+    :return: list of (name, FResult) for each data set
+    """
+    if file_format not in WRITERS:
+        raise ValueError("unknown format %r" % file_format)
+    state = load_page(fitfile, page)
+    datasets = load_data(find_files(patterns))
+    fitters = make_fitters(state, datasets, sparse_tolerance)
+    names = [name for name, _ in datasets]
+    results = []
+    for name, result in zip(names, fit_all(fitters, workers, chain)):
+        if result.success:
+            logger.info("%s: chi2/Npts = %g", name, result.fitness)
+        else:
+            logger.warning("%s did not fit:\n%s", name, result.mesg)
+        results.append(result)
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    path = os.path.join(output, TABLE_NAME + EXTENSIONS[file_format])
+    WRITERS[file_format](path, names, results)
+    return list(zip(names, results))
+
+
+def main(argv=None):
+    """
+    Command line interface of run.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fit data files with a fit page saved by SasView.")
+    parser.add_argument("fitfile", help="fit page (.fitv) or project file")
+    parser.add_argument("data", nargs="+",
+                        help="data files, or glob patterns of data files")
+    parser.add_argument("-o", "--output", default=".",
+                        help="folder of the results [%(default)s]")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of processes [%(default)s]")
+    parser.add_argument("--chain", action="store_true",
+                        help="start each fit from the previous result")
+    parser.add_argument("--page", type=int, default=0,
+                        help="index of the fit page in the file [%(default)s]")
+    parser.add_argument("--format", choices=sorted(WRITERS), default='csv',
+                        help="format of the results [%(default)s]")
+    parser.add_argument("--sparse-tolerance", type=float, default=None,
+                        help="drop the 1D resolution weights smaller than "
+                        "this fraction of the largest weight of each point")
+    opts = parser.parse_args(argv)
+
+    from .fitstate import setup_sasview
+    setup_sasview()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    run(opts.fitfile, opts.data, output=opts.output, workers=opts.workers,
+        chain=opts.chain, page=opts.page, file_format=opts.format,
+        sparse_tolerance=opts.sparse_tolerance)
+
+
+if __name__ == "__main__":
+    main()
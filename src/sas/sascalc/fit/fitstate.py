@@ -202,8 +202,8 @@ def model_name(state):
     else:
         return p_model
 
-def get_data_weight(state):
-    # type: (FitState) -> np.ndarray
+def get_data_weight(state, data=None):
+    # type: (FitState, Optional[Data1D|Data2D]) -> np.ndarray
     """
     Get error bars on data.  These could be the values computed by reduction
     and stored in the file, the square root of the intensity (if instensity
@@ -211,16 +211,21 @@ def get_data_weight(state):
     percentage of the intensity, such as 2% or 5% depending on relative
     counting time), or one for equal weight uncertainty depending on the
     value of state.dI_*.
+
+    The weights are computed for *data* if it is given rather than for
+    the data saved with the state.
     """
     # Cribbed from perspectives/fitting/utils.py:get_weight and
     # perspectives/fitting/fitpage.py: get_weight_flag
     weight = None
+    if data is None:
+        data = state.data
     if state.enable2D:
-        dy_data = state.data.err_data
-        data = state.data.data
+        dy_data = data.err_data
+        data = data.data
     else:
-        dy_data = state.data.dy
-        data = state.data.y
+        dy_data = data.dy
+        data = data.y
     if state.dI_noweight:
         weight = np.ones_like(data)
     elif state.dI_didata:
@@ -274,12 +279,12 @@ def parse_optional_float(value):
     else:
         return None
 
-def make_fitness(state):
-    # type: (FitState) -> SasFitness
+def make_model(state):
+    # type: (FitState) -> Tuple["SasviewModel", List[str]]
     """
-    Return a Bumps fitness object for the given fit state.
-
-    Raises ValueError if could not parse the fit state.
+    Return the model of the given fit state, with its parameter values,
+    limits and dispersity distributions, and the names of its fitted
+    parameters.
     """
     # Load the model
     category_name = state.categorycombobox
@@ -322,13 +327,27 @@ def make_fitness(state):
     #print("pars", model.params)
     #print("limits", model.details)
     #print("fitted", fitted)
+    return model, fitted
+
+def make_data(state, model, data=None, sparse_tolerance=None):
+    # type: (FitState, "SasviewModel", Optional[Data1D|Data2D], Optional[float]) -> Tuple[Data1D|Data2D, Optional["Smearer"]]
+    """
+    Return a copy of the data with the resolution of the given fit state,
+    and the smearer for the model.
+
+    The data saved with the state is used unless *data* is given.
+
+    1D resolutions are applied as sparse matrices truncated to the relative
+    weight *sparse_tolerance* if it is given; see PySmear.set_sparse.
 
+    Raises ValueError if could not parse the fit state.
+    """
     # Set the resolution
-    data = copy.deepcopy(state.data)
+    data = copy.deepcopy(state.data if data is None else data)
     if state.disable_smearer:
         smearer = None
     elif state.enable_smearer:
-        smearer = smear_selection(data, model)
+        smearer = smear_selection(data, model, sparse_tolerance)
     elif state.pinhole_smearer:
         # see sasgui/perspectives/fitting/basepage.py: reset_page_helper
         dx_percent = state.dx_percent
@@ -343,16 +362,27 @@ def make_fitness(state):
         else:
             data.dx = percent * data.x
             data.dxl = data.dxw = None  # be sure it is not slit-smeared
-        smearer = smear_selection(data, model)
+        smearer = smear_selection(data, model, sparse_tolerance)
     elif state.slit_smearer:
         # see sasgui/perspectives/fitting/fitpage.py: _set_pinhole_smear
         data_len = len(data.x)
         data.dx = None
         data.dxl = (state.dxl if state.dxl is not None else 0.) * np.ones(data_len)
         data.dxw = (state.dxw if state.dxw is not None else 0.) * np.ones(data_len)
-        smearer = smear_selection(data, model)
+        smearer = smear_selection(data, model, sparse_tolerance)
     else:
         raise ValueError("expected resolution specification for fit")
+    return data, smearer
+
+def make_fitness(state):
+    # type: (FitState) -> SasFitness
+    """
+    Return a Bumps fitness object for the given fit state.
+
+    Raises ValueError if could not parse the fit state.
+    """
+    model, fitted = make_model(state)
+    data, smearer = make_data(state, model)
 
     # Set the data weighting (dI, sqrt(I), I, or uniform)
     weight = get_data_weight(state)
@@ -14,6 +14,7 @@ import sys
 
 import numpy as np  # type: ignore
 from numpy import pi, exp # type:ignore
+from scipy import sparse
 
 from sasmodels.resolution import Slit1D, Pinhole1D
 from sasmodels.sesans import SesansTransform
@@ -21,7 +22,10 @@ from sasmodels.resolution2d import Pinhole2D
 
 from sas.sascalc.data_util.nxsunit import Converter
 
-def smear_selection(data, model = None):
+# Default relative weight below which sparse 1D resolutions are truncated
+SPARSE_TOLERANCE = 1e-6
+
+def smear_selection(data, model = None, sparse_tolerance=None):
     """
     Creates the right type of smearer according
     to the data.
@@ -37,6 +41,9 @@ def smear_selection(data, model = None):
 
     :param data: Data1D object
     :param model: sas.model instance
+    :param sparse_tolerance: if not None, apply 1D pinhole and slit
+        resolutions as sparse matrices truncated to this relative weight;
+        see PySmear.set_sparse
     """
     # Sanity check. If we are not dealing with a SAS Data1D
     # object, just return None
@@ -90,7 +97,7 @@ def smear_selection(data, model = None):
             #print "data1D.dx[0]",data1D.dx[0],data1D.dxl[0]
     # If we found resolution smearing data, return a QSmearer
     if _found_resolution:
-         return pinhole_smear(data, model)
+         return pinhole_smear(data, model, sparse_tolerance)
 
     # Look for slit smearing data
     _found_slit = False
@@ -113,7 +120,7 @@ def smear_selection(data, model = None):
                 break
     # If we found slit smearing data, return a slit smearer
     if _found_slit:
-        return slit_smear(data, model)
+        return slit_smear(data, model, sparse_tolerance)
     return None
 
 
@@ -121,12 +128,69 @@ class PySmear(object):
     """
     Wrapper for pure python sasmodels resolution functions.
     """
-    def __init__(self, resolution, model, offset=None):
+    def __init__(self, resolution, model, offset=None, sparse_tolerance=None):
         self.model = model
         self.resolution = resolution
         if offset is None:
             offset = np.searchsorted(self.resolution.q_calc, self.resolution.q[0])
         self.offset = offset
+        # Sparse resolution matrix, with a row per data point
+        self.sparse_tolerance = None
+        self._weights = None
+        # Rows of the sparse matrix in the fitted window and the q_calc
+        # points outside the window that they use
+        self._window = None
+        self._window_weights = None
+        self._outside = None
+        # Model values on the outside points and the model state they are for
+        self._outside_state = None
+        self._outside_values = None
+        if sparse_tolerance is not None:
+            self.set_sparse(sparse_tolerance)
+
+    def __getstate__(self):
+        # The window and the model values are rebuilt on the first evaluation
+        state = self.__dict__.copy()
+        for name in ('_window', '_window_weights', '_outside',
+                     '_outside_state', '_outside_values'):
+            state[name] = None
+        return state
+
+    def set_sparse(self, tolerance=SPARSE_TOLERANCE):
+        """
+        Apply the resolution as a sparse matrix.
+
+        The weights of each data point smaller than tolerance times its
+        largest weight are dropped and the others scaled up to keep the
+        sum of the weights. The model is then only evaluated outside of
+        the fitted range where it contributes to the fitted points, and
+        these values are reused while the model parameters don't change.
+
+        :param tolerance: relative weight, or None to apply the resolution
+            as the dense matrix of the resolution function
+        """
+        self._window = self._outside_state = None
+        if tolerance is None:
+            self.sparse_tolerance = self._weights = None
+            return
+        weight_matrix = getattr(self.resolution, 'weight_matrix', None)
+        if weight_matrix is None:
+            raise ValueError("%s has no resolution matrix"
+                             % self.resolution.__class__.__name__)
+        # A row per data point, pruned in place without a dense copy
+        weights = sparse.csr_matrix(weight_matrix.T, dtype=float)
+        total = np.asarray(weights.sum(axis=1)).ravel()
+        largest = abs(weights).max(axis=1).toarray().ravel()
+        rows = np.repeat(np.arange(weights.shape[0]), np.diff(weights.indptr))
+        weights.data[np.abs(weights.data) < tolerance*largest[rows]] = 0
+        weights.eliminate_zeros()
+        kept = np.asarray(weights.sum(axis=1)).ravel()
+        scale = np.ones_like(total)
+        nonzero = kept != 0
+        scale[nonzero] = total[nonzero]/kept[nonzero]
+        weights.data *= np.repeat(scale, np.diff(weights.indptr))
+        self._weights = weights
+        self.sparse_tolerance = tolerance
 
     def apply(self, iq_in, first_bin=0, last_bin=None):
         """
@@ -139,6 +203,8 @@ class PySmear(object):
         first_bin:last_bin set to the resolution smeared values.
         """
         if last_bin is None: last_bin = len(iq_in)
+        if self._weights is not None:
+            return self._apply_sparse(iq_in, first_bin, min(last_bin, len(iq_in)-1))
         start, end = first_bin + self.offset, last_bin + self.offset
         q_calc = self.resolution.q_calc
         iq_calc = np.empty_like(q_calc)
@@ -151,6 +217,31 @@ class PySmear(object):
         return smeared
     __call__ = apply
 
+    def _apply_sparse(self, iq_in, first_bin, last_bin):
+        """
+        Apply the sparse resolution matrix to the bins of the fitted window.
+        The other bins are returned unchanged.
+        """
+        start, end = first_bin + self.offset, last_bin + self.offset
+        if self._window != (first_bin, last_bin):
+            self._window_weights = self._weights[first_bin:last_bin+1]
+            used = np.unique(self._window_weights.indices)
+            self._outside = used[(used < start) | (used > end)]
+            self._window = (first_bin, last_bin)
+            self._outside_state = None
+        iq_calc = np.zeros(len(self.resolution.q_calc))
+        iq_calc[start:end+1] = iq_in[first_bin:last_bin+1]
+        if len(self._outside):
+            state = _model_state(self.model)
+            if state is None or state != self._outside_state:
+                q_outside = self.resolution.q_calc[self._outside]
+                self._outside_values = self.model.evalDistribution(q_outside)
+                self._outside_state = state
+            iq_calc[self._outside] = self._outside_values
+        smeared = np.array(iq_in, dtype=float)
+        smeared[first_bin:last_bin+1] = self._window_weights.dot(iq_calc)
+        return smeared
+
     def get_bin_range(self, q_min=None, q_max=None):
         """
         For a given q_min, q_max, find the corresponding indices in the data.
@@ -165,17 +256,30 @@ class PySmear(object):
         last = np.searchsorted(q, q_max)
         return first, min(last,len(q)-1)
 
-def slit_smear(data, model=None):
+def _model_state(model):
+    """
+    Return the parameter values and dispersity settings of a model, or None
+    if the model does not expose them.
+    """
+    params = getattr(model, 'params', None)
+    dispersion = getattr(model, 'dispersion', None)
+    if params is None or dispersion is None:
+        return None
+    return (tuple(sorted(params.items())),
+            tuple(sorted((name, tuple(sorted(settings.items())))
+                         for name, settings in dispersion.items())))
+
+def slit_smear(data, model=None, sparse_tolerance=None):
     q = data.x
     width = data.dxw if data.dxw is not None else 0
     height = data.dxl if data.dxl is not None else 0
     # TODO: width and height seem to be reversed
-    return PySmear(Slit1D(q, height, width), model)
+    return PySmear(Slit1D(q, height, width), model, sparse_tolerance=sparse_tolerance)
 
-def pinhole_smear(data, model=None):
+def pinhole_smear(data, model=None, sparse_tolerance=None):
     q = data.x
     width = data.dx if data.dx is not None else 0
-    return PySmear(Pinhole1D(q, width), model)
+    return PySmear(Pinhole1D(q, width), model, sparse_tolerance=sparse_tolerance)
 
 
 class PySmear2D(object):
@@ -191,6 +295,18 @@ class PySmear2D(object):
         self.index = None
         self.coords = 'polar'
         self.smearer = True
+        # Pinhole2D of the last evaluation and what it was built from
+        self._resolution = None
+        self._resolution_arrays = None
+        self._resolution_key = None
+
+    def __getstate__(self):
+        # The resolution is rebuilt on the first evaluation
+        state = self.__dict__.copy()
+        state['_resolution'] = None
+        state['_resolution_arrays'] = None
+        state['_resolution_key'] = None
+        return state
 
     def set_accuracy(self, accuracy='Low'):
         """
@@ -239,9 +355,7 @@ class PySmear2D(object):
         then find smeared intensity
         """
         if self.smearer:
-            res = Pinhole2D(data=self.data, index=self.index,
-                            nsigma=3.0, accuracy=self.accuracy,
-                            coords=self.coords)
+            res = self.get_resolution()
             val = self.model.evalDistribution(res.q_calc)
             return res.apply(val)
         else:
@@ -252,3 +366,31 @@ class PySmear2D(object):
             val = self.model.evalDistribution(q_calc)
             return val
 
+    def get_resolution(self):
+        """
+        Get the Pinhole2D resolution of the data points in the index.
+
+        Building the over sampling grid and the Gaussian weights costs as
+        much as a model evaluation, so the resolution is kept until the
+        data, its q and dq arrays, the index, the accuracy or the
+        coordinates change.
+
+        :return: Pinhole2D
+        """
+        data = self.data
+        arrays = (data, data.qx_data, data.qy_data, data.q_data,
+                  data.dqx_data, data.dqy_data)
+        index = self.index
+        if index is not None:
+            index = np.asarray(index, dtype=bool).tobytes()
+        key = (index, self.accuracy, self.coords)
+        if self._resolution is None or key != self._resolution_key \
+                or any(a is not b for a, b in
+                       zip(arrays, self._resolution_arrays)):
+            self._resolution = Pinhole2D(data=data, index=self.index,
+                                         nsigma=3.0, accuracy=self.accuracy,
+                                         coords=self.coords)
+            self._resolution_arrays = arrays
+            self._resolution_key = key
+        return self._resolution
+
@@ -3,7 +3,6 @@ Adapters for fitting module
 """
 import copy
 import numpy as np
-import math
 from sas.sascalc.data_util.uncertainty import Uncertainty
 from sas.sasgui.plottools.plottables import Data1D as PlotData1D
 from sas.sasgui.plottools.plottables import Data2D as PlotData2D
@@ -72,6 +71,9 @@ class Data1D(PlotData1D, LoadData1D):
     def _perform_operation(self, other, operation):
         """
         """
+        data, other = self._common_x_operands(other)
+        if data is not self:
+            return data._perform_operation(other, operation)
         # First, check the data compatibility
         dy, dy_other = self._validity_check(other)
         result = Data1D(x=[], y=[], lam=[], dx=None, dy=None, dlam=None)
@@ -86,34 +88,26 @@ class Data1D(PlotData1D, LoadData1D):
         else:
             result.dxl = np.zeros(len(self.x))
 
-        for i in range(len(self.x)):
-            result.x[i] = self.x[i]
-            if self.dx is not None and len(self.x) == len(self.dx):
-                result.dx[i] = self.dx[i]
-            if self.dxw is not None and len(self.x) == len(self.dxw):
-                result.dxw[i] = self.dxw[i]
-            if self.dxl is not None and len(self.x) == len(self.dxl):
-                result.dxl[i] = self.dxl[i]
-            
-            a = Uncertainty(self.y[i], dy[i]**2)
-            if isinstance(other, Data1D):
-                b = Uncertainty(other.y[i], dy_other[i]**2)
-                if other.dx is not None:
-                    result.dx[i] *= self.dx[i]
-                    result.dx[i] += (other.dx[i]**2)
-                    result.dx[i] /= 2
-                    result.dx[i] = math.sqrt(result.dx[i])
-                if result.dxl is not None and other.dxl is not None:
-                    result.dxl[i] *= self.dxl[i]
-                    result.dxl[i] += (other.dxl[i]**2)
-                    result.dxl[i] /= 2
-                    result.dxl[i] = math.sqrt(result.dxl[i])
-            else:
-                b = other
-            
-            output = operation(a, b)
-            result.y[i] = output.x
-            result.dy[i] = math.sqrt(math.fabs(output.variance))
+        if self.dxw is not None and len(self.x) == len(self.dxw):
+            result.dxw[:] = self.dxw
+        if self.dxl is not None and len(self.x) == len(self.dxl):
+            result.dxl[:] = self.dxl
+
+        a = Uncertainty(np.asarray(self.y), np.asarray(dy)**2)
+        if isinstance(other, Data1D):
+            b = Uncertainty(np.asarray(other.y), np.asarray(dy_other)**2)
+            if other.dx is not None and self.dx is not None:
+                result.dx[:] = np.sqrt((np.asarray(self.dx)**2
+                                        + np.asarray(other.dx)**2) / 2)
+            if result.dxl is not None and other.dxl is not None:
+                result.dxl[:] = np.sqrt((result.dxl*self.dxl
+                                         + np.asarray(other.dxl)**2) / 2)
+        else:
+            b = other
+
+        output = operation(a, b)
+        result.y[:] = output.x
+        result.dy[:] = np.sqrt(np.fabs(output.variance))
         return result
     
     def _perform_union(self, other):
@@ -222,6 +216,9 @@ class Theory1D(PlotTheory1D, LoadData1D):
     def _perform_operation(self, other, operation):
         """
         """
+        data, other = self._common_x_operands(other)
+        if data is not self:
+            return data._perform_operation(other, operation)
         # First, check the data compatibility
         dy, dy_other = self._validity_check(other)
         result = self.clone_without_data(len(self.x))
@@ -235,39 +232,29 @@ class Theory1D(PlotTheory1D, LoadData1D):
         else:
             result.dxl = np.zeros(len(self.x))
 
-        for i in range(np.size(self.x)):
-            result.x[i] = self.x[i]
-            if self.dx is not None and len(self.x) == len(self.dx):
-                result.dx[i] = self.dx[i]
-            if self.dxw is not None and len(self.x) == len(self.dxw):
-                result.dxw[i] = self.dxw[i]
-            if self.dxl is not None and len(self.x) == len(self.dxl):
-                result.dxl[i] = self.dxl[i]
-            
-            a = Uncertainty(self.y[i], dy[i]**2)
-            if isinstance(other, Data1D):
-                b = Uncertainty(other.y[i], dy_other[i]**2)
-                if other.dx is not None:
-                    result.dx[i] *= self.dx[i]
-                    result.dx[i] += (other.dx[i]**2)
-                    result.dx[i] /= 2
-                    result.dx[i] = math.sqrt(result.dx[i])
-                if result.dxl is not None and other.dxl is not None:
-                    result.dxl[i] *= self.dxl[i]
-                    other.dxl[i] += (other.dxl[i]**2)
-                    result.dxl[i] /= 2
-                    result.dxl[i] = math.sqrt(result.dxl[i])
-                if result.dxw is not None and self.dxw is not None:
-                    result.dxw[i] *= self.dxw[i]
-                    other.dxw[i] += (other.dxw[i]**2)
-                    result.dxw[i] /= 2
-                    result.dxw[i] = math.sqrt(result.dxw[i])
-            else:
-                b = other
-            
-            output = operation(a, b)
-            result.y[i] = output.x
-            result.dy[i] = math.sqrt(math.fabs(output.variance))
+        if self.dxw is not None and len(self.x) == len(self.dxw):
+            result.dxw[:] = self.dxw
+        if self.dxl is not None and len(self.x) == len(self.dxl):
+            result.dxl[:] = self.dxl
+
+        a = Uncertainty(np.asarray(self.y), np.asarray(dy)**2)
+        if isinstance(other, Data1D):
+            b = Uncertainty(np.asarray(other.y), np.asarray(dy_other)**2)
+            if other.dx is not None and self.dx is not None:
+                result.dx[:] = np.sqrt((np.asarray(self.dx)**2
+                                        + np.asarray(other.dx)**2) / 2)
+            if result.dxl is not None and other.dxl is not None:
+                result.dxl[:] = np.sqrt((result.dxl*self.dxl
+                                         + np.asarray(other.dxl)**2) / 2)
+            if result.dxw is not None and other.dxw is not None:
+                result.dxw[:] = np.sqrt((result.dxw*self.dxw
+                                         + np.asarray(other.dxw)**2) / 2)
+        else:
+            b = other
+
+        output = operation(a, b)
+        result.y[:] = output.x
+        result.dy[:] = np.sqrt(np.fabs(output.variance))
         return result
     
     def _perform_union(self, other):
@@ -408,43 +395,26 @@ class Data2D(PlotData2D, LoadData2D):
             result.dqx_data = None
             result.dqy_data = None
         else:
-            result.dqx_data = np.zeros(len(self.data))
-            result.dqy_data = np.zeros(len(self.data))
-        for i in range(np.size(self.data)):
-            result.data[i] = self.data[i]
-            if self.err_data is not None and \
-                            np.size(self.data) == np.size(self.err_data):
-                result.err_data[i] = self.err_data[i]    
-            if self.dqx_data is not None:
-                result.dqx_data[i] = self.dqx_data[i]
-            if self.dqy_data is not None:
-                result.dqy_data[i] = self.dqy_data[i]
-            result.qx_data[i] = self.qx_data[i]
-            result.qy_data[i] = self.qy_data[i]
-            result.q_data[i] = self.q_data[i]
-            result.mask[i] = self.mask[i]
-            
-            a = Uncertainty(self.data[i], dy[i]**2)
-            if isinstance(other, Data2D):
-                b = Uncertainty(other.data[i], dy_other[i]**2)
-                if other.dqx_data is not None and \
-                        result.dqx_data is not None:
-                    result.dqx_data[i] *= self.dqx_data[i]
-                    result.dqx_data[i] += (other.dqx_data[i]**2)
-                    result.dqx_data[i] /= 2
-                    result.dqx_data[i] = math.sqrt(result.dqx_data[i])     
-                if other.dqy_data is not None and \
-                        result.dqy_data is not None:
-                    result.dqy_data[i] *= self.dqy_data[i]
-                    result.dqy_data[i] += (other.dqy_data[i]**2)
-                    result.dqy_data[i] /= 2
-                    result.dqy_data[i] = math.sqrt(result.dqy_data[i])
-            else:
-                b = other
-            
-            output = operation(a, b)
-            result.data[i] = output.x
-            result.err_data[i] = math.sqrt(math.fabs(output.variance))
+            result.dqx_data = np.array(self.dqx_data, dtype=float)
+            result.dqy_data = np.array(self.dqy_data, dtype=float)
+
+        a = Uncertainty(np.asarray(self.data), np.asarray(dy)**2)
+        if isinstance(other, Data2D):
+            b = Uncertainty(np.asarray(other.data), np.asarray(dy_other)**2)
+            if other.dqx_data is not None and result.dqx_data is not None:
+                result.dqx_data = np.sqrt((result.dqx_data**2
+                                           + np.asarray(other.dqx_data)**2)
+                                          / 2)
+            if other.dqy_data is not None and result.dqy_data is not None:
+                result.dqy_data = np.sqrt((result.dqy_data**2
+                                           + np.asarray(other.dqy_data)**2)
+                                          / 2)
+        else:
+            b = other
+
+        output = operation(a, b)
+        result.data = np.asarray(output.x, dtype=float)
+        result.err_data = np.sqrt(np.fabs(output.variance))
         return result
     
     def _perform_union(self, other):
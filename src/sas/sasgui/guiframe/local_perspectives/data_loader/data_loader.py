@@ -26,6 +26,8 @@ if config.APPLICATION_STATE_EXTENSION is not None:
 EXTENSIONS = config.PLUGIN_STATE_EXTENSIONS + extension_list
 PLUGINS_WLIST = config.PLUGINS_WLIST
 APPLICATION_WLIST = config.APPLICATION_WLIST
+# Number of files read at the same time
+LOAD_WORKERS = 4
 
 
 class Plugin(PluginBase):
@@ -161,6 +163,7 @@ class Plugin(PluginBase):
         output = {}
         exception_occurred = False
 
+        to_load = []
         for p_file in path:
             basename = os.path.basename(p_file)
             # Skip files that start with a period
@@ -181,10 +184,18 @@ class Plugin(PluginBase):
                 logger.info(log_msg)
                 file_errors[basename] = [log_msg]
                 continue
+            to_load.append(p_file)
+
+        if to_load:
+            message = "Loading {} file(s)...\n".format(len(to_load))
+            self.load_update(message=message, info="info")
+        # Read the files in parallel, processing them as they are loaded
+        loaded = self.loader.load_many(to_load, format, workers=LOAD_WORKERS)
+        for count, (p_file, temp, load_error) in enumerate(loaded, 1):
+            basename = os.path.basename(p_file)
             try:
-                message = "Loading {}...\n".format(p_file)
-                self.load_update(message=message, info="info")
-                temp = self.loader.load(p_file, format)
+                if load_error is not None:
+                    raise load_error
                 if not isinstance(temp, list):
                     temp = [temp]
                 for item in temp:
@@ -200,8 +211,9 @@ class Plugin(PluginBase):
                         else:
                             file_errors[basename] = [error_message]
 
-                self.load_update(message="Loaded {}\n".format(p_file),
-                                 info="info")
+                message = "Loaded {} ({}/{})\n".format(p_file, count,
+                                                       len(to_load))
+                self.load_update(message=message, info="info")
             except NoKnownLoaderException as e:
                 exception_occurred = True
                 error_message = "Loading data failed!\n" + e.message
@@ -3,7 +3,6 @@
 """
 import time
 import sys
-import os
 
 from sas.sascalc.data_util.calcthread import CalcThread
 
@@ -50,17 +49,11 @@ class DataReader(CalcThread):
         self.starttime = time.time()
         output = []
         error_message = ""
-        for path in self.list_path:
-            basename = os.path.basename(path)
-            _, extension = os.path.splitext(basename)
-            if self.load_state_flag:
-                if extension.lower() in EXTENSIONS:
-                    pass
-            else:
-                if extension.lower() not in EXTENSIONS:
-                    pass
+        # Read the files in parallel, reporting each one as it is loaded
+        for path, temp, load_error in self.loader.load_many(self.list_path):
             try:
-                temp = self.loader.load(path)
+                if load_error is not None:
+                    raise load_error
                 if temp.__class__.__name__ == "list":
                     for item in temp:
                         data = self.transform_data(item, path)
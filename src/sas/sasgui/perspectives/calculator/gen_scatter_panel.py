@@ -145,7 +145,11 @@ class SasGenPanel(ScrolledPanel, PanelBase):
         self.omfreader = sas_gen.OMFReader()
         self.sldreader = sas_gen.SLDReader()
         self.pdbreader = sas_gen.PDBReader()
+        # Keep the parsed files in the user directory
+        for reader in (self.omfreader, self.sldreader, self.pdbreader):
+            reader.use_cache = True
         self.model = sas_gen.GenSAS()
+        self.model.set_num_threads()
         self.param_dic = self.model.params
         self.parameters = []
         self.data = None
@@ -992,20 +996,23 @@ class SasGenPanel(ScrolledPanel, PanelBase):
         """
         out = np.empty(0)
         #s = time.time()
-        for ind in range(len(input[0])):
+        # 2D points are computed in chunks so that the model threads
+        # have enough q-points to share between them
+        step = 1 if self.is_avg else 50
+        for ind in range(0, len(input[0]), step):
             if self.is_avg:
-                if ind % 1 == 0 and update is not None:
+                if update is not None:
                     update()
                     time.sleep(0.1)
                 inputi = [input[0][ind:ind + 1], [], input[2][ind:ind + 1]]
                 outi = self.model.run(inputi)
                 out = np.append(out, outi)
             else:
-                if ind % 50 == 0  and update is not None:
+                if update is not None:
                     update()
                     time.sleep(0.001)
-                inputi = [input[0][ind:ind + 1], input[1][ind:ind + 1],
-                          input[2][ind:ind + 1]]
+                inputi = [input[0][ind:ind + step], input[1][ind:ind + step],
+                          input[2][ind:ind + step]]
                 outi = self.model.runXY(inputi)
                 out = np.append(out, outi)
         #print time.time() - s
@@ -5,6 +5,7 @@ This module provides a GUI for the file converter
 import wx
 import sys
 import os
+import itertools
 import numpy as np
 from wx.lib.scrolledpanel import ScrolledPanel
 from sas.sasgui.guiframe.panel_base import PanelBase
@@ -192,7 +193,7 @@ class ConverterPanel(ScrolledPanel, PanelBase):
         :param filename: The header file to extract the data from
         :return x_data: A 1D array containing all the x coordinates of the data
         :return y_data: A 1D array containing all the y coordinates of the data
-        :return frame_data: A dictionary of the form *{frame_number: data}*, where data is a 2D numpy array containing the intensity data
+        :return frame_data: A generator of Data2D objects, one per selected frame, which reads each frame from the file as it is reached
         """
         loader = BSLLoader(filename)
         frames = [0]
@@ -226,7 +227,7 @@ class ConverterPanel(ScrolledPanel, PanelBase):
         if not should_continue:
             return None
 
-        frame_data = loader.load_frames(frames)
+        frame_data = loader.iter_frames(frames)
 
         return frame_data
 
@@ -353,12 +354,18 @@ class ConverterPanel(ScrolledPanel, PanelBase):
             w.write(frame_data, output_path)
 
     def convert_2d_data(self, dataset):
+        """
+        Writes a list, or a generator, of Data2D objects to an NXcanSAS file,
+        with the metadata set on the first of them
+        """
         metadata = self.get_metadata()
+        dataset = iter(dataset)
+        first = next(dataset)
         for key, value in metadata.items():
-            setattr(dataset[0], key, value)
+            setattr(first, key, value)
 
         w = NXcanSASWriter()
-        w.write(dataset, self.output.GetPath())
+        w.write(itertools.chain([first], dataset), self.output.GetPath())
 
     def on_convert(self, event):
         """Called when the Convert button is clicked"""
@@ -2,6 +2,7 @@
 import sys
 import time
 from sas.sascalc.data_util.calcthread import CalcThread
+from sas.sascalc.fit.batch import fit_batch
 
 def map_getattr(classInstance, classFunc, *args):
     """
@@ -28,7 +29,15 @@ class FitThread(CalcThread):
                  updatefn=None,
                  yieldtime=0.03,
                  worktime=0.03,
-                 reset_flag=False):
+                 reset_flag=False,
+                 workers=1,
+                 batch_updatefn=None):
+        """
+        :param workers: number of processes running the fits of a batch;
+            chained batch fits (reset_flag False) always run one at a time
+        :param batch_updatefn: function called with the results of each fit
+            of a batch as soon as it ends, when the fits run in parallel
+        """
         CalcThread.__init__(self, completefn, updatefn, yieldtime, worktime)
         self.handler = handler
         self.fitter = fn
@@ -40,6 +49,8 @@ class FitThread(CalcThread):
         self.updatefn = updatefn
         #Relative error desired in the sum of squares.
         self.reset_flag = reset_flag
+        self.workers = workers
+        self.batch_updatefn = batch_updatefn
 
     def isquit(self):
         """
@@ -58,6 +69,9 @@ class FitThread(CalcThread):
         """
         msg = ""
         try:
+            if self.workers > 1 and self.reset_flag and len(self.fitter) > 1:
+                self.compute_parallel()
+                return
             import copy
             list_handler = []
             list_curr_thread = []
@@ -72,10 +86,10 @@ class FitThread(CalcThread):
                 list_reset_flag.append(self.reset_flag)
                 list_fit_function.append('fit')
                 list_map_get_attr.append(map_getattr)
-            #from multiprocessing import Pool
+            list_ftol = [1.49012e-8] * len(self.fitter)
             inputs = zip(list_map_get_attr, self.fitter, list_fit_function,
                          list_q, list_q, list_handler, list_curr_thread,
-                         list_reset_flag)
+                         list_ftol, list_reset_flag)
             result = list(map(map_apply, inputs))
 
             self.complete(result=result,
@@ -101,5 +115,30 @@ class FitThread(CalcThread):
             if self.handler is not None:
                 self.handler.error(msg=traceback.format_exc())
 
+    def compute_parallel(self):
+        """
+        Perform the independent fits of a batch in a pool of processes,
+        passing the results of each fit to batch_updatefn as they come
+        """
+        result = []
+        for list_res in fit_batch(self.fitter, workers=self.workers,
+                                  reset_flag=self.reset_flag,
+                                  handler=self.handler, curr_thread=self):
+            result.append(list_res)
+            if self.batch_updatefn is not None:
+                self.batch_updatefn(result=[list_res],
+                                    batch_inputs=self.batch_inputs,
+                                    batch_outputs=self.batch_outputs,
+                                    page_id=self.page_id,
+                                    pars=self.pars)
+        streamed = len(result) if self.batch_updatefn is not None else 0
+        self.complete(result=result,
+                      batch_inputs=self.batch_inputs,
+                      batch_outputs=self.batch_outputs,
+                      page_id=self.page_id,
+                      pars=self.pars,
+                      elapsed=time.time() - self.starttime,
+                      streamed=streamed)
+
 
 
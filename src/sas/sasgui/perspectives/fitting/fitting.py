@@ -20,6 +20,7 @@ import logging
 import numpy as np
 import time
 from copy import deepcopy
+from multiprocessing import cpu_count
 import traceback
 
 import bumps.options
@@ -45,7 +46,7 @@ from sas.sasgui.guiframe.events import EVT_SLICER_PARS_UPDATE
 from sas.sasgui.guiframe.gui_style import GUIFRAME_ID
 from sas.sasgui.guiframe.plugin_base import PluginBase
 from sas.sasgui.guiframe.data_processor import BatchCell
-from sas.sasgui.guiframe.gui_manager import MDIFrame
+from sas.sasgui.guiframe.gui_manager import MDIFrame, custom_value
 from sas.sasgui.guiframe.documentation_window import DocumentationWindow
 
 from sas.sasgui.perspectives.calculator.model_editor import TextDialog
@@ -65,6 +66,9 @@ from .gpu_options import GpuOptions
 logger = logging.getLogger(__name__)
 
 MAX_NBR_DATA = 4
+# Number of processes running the independent fits of a batch, set by
+# BATCH_FIT_WORKERS in the custom config; one per core by default
+BATCH_FIT_WORKERS = custom_value('BATCH_FIT_WORKERS', cpu_count())
 
 (PageInfoEvent, EVT_PAGE_INFO) = wx.lib.newevent.NewEvent()
 
@@ -1109,7 +1113,9 @@ class Plugin(PluginBase):
                                  batch_outputs=batch_outputs,
                                  page_id=list_page_id,
                                  completefn=self._batch_fit_complete,
-                                 reset_flag=self.batch_reset_flag)
+                                 reset_flag=self.batch_reset_flag,
+                                 workers=BATCH_FIT_WORKERS,
+                                 batch_updatefn=self._batch_fit_update)
         else:
             ## Perform more than 1 fit at the time
             calc_fit = FitThread(handler=handler,
@@ -1321,14 +1327,31 @@ class Plugin(PluginBase):
         """
         print("update_fit result", result)
 
+    def _batch_fit_update(self, result, pars, page_id,
+                          batch_outputs, batch_inputs):
+        """
+        Display the results of the fits of a batch which already ended
+        while the others are still running
+        :param result: list of objects received from fitters
+        :param pars: list of  fitted parameters names
+        :param page_id: list of page ids which called fit function
+        """
+        msg = self._add_batch_results(result, batch_outputs, batch_inputs)
+        if msg:
+            evt = StatusEvent(status=msg, info="info", type="progress")
+            wx.PostEvent(self.parent, evt)
+
     def _batch_fit_complete(self, result, pars, page_id,
-                            batch_outputs, batch_inputs, elapsed=None):
+                            batch_outputs, batch_inputs, elapsed=None,
+                            streamed=0):
         """
         Display fit result in batch
         :param result: list of objects received from fitters
         :param pars: list of  fitted parameters names
         :param page_id: list of page ids which called fit function
         :param elapsed: time spent at the fitting level
+        :param streamed: number of results already displayed by
+            _batch_fit_update
         """
         uid = page_id[0]
         if uid in self.fit_thread_list:
@@ -1344,9 +1367,29 @@ class Plugin(PluginBase):
 
         if batch_outputs is None:
             batch_outputs = {}
+        msg = self._add_batch_results(result[streamed:], batch_outputs,
+                                      batch_inputs)
+        evt = StatusEvent(status=msg, error="info", type="stop")
+        wx.PostEvent(self.parent, evt)
+        # Remove parameters that are not shown
+        cpage = self.fit_panel.get_page_by_id(uid)
+        tbatch_outputs = {}
+        shownkeystr = cpage.get_copy_params()
+        for key in batch_outputs.keys():
+            if key in ["Chi2", "Data"] or shownkeystr.count(key) > 0:
+                tbatch_outputs[key] = batch_outputs[key]
 
+        wx.CallAfter(self.parent.on_set_batch_result, tbatch_outputs,
+                     batch_inputs, self.sub_menu)
+
+    def _add_batch_results(self, result, batch_outputs, batch_inputs):
+        """
+        Add the results of batch fits to the batch tables and the pages
+        :param result: list of objects received from fitters
+        :return: message listing the fits that failed
+        """
         # format batch_outputs
-        batch_outputs["Chi2"] = []
+        batch_outputs.setdefault("Chi2", [])
         #Don't like these loops
         # Need to create dictionary of all fitted parameters
         # since the number of parameters can differ between each fit result
@@ -1495,19 +1538,7 @@ class Plugin(PluginBase):
                                          fid=data.id,
                                          batch_outputs=batch_outputs,
                                          batch_inputs=batch_inputs)
-
-        evt = StatusEvent(status=msg, error="info", type="stop")
-        wx.PostEvent(self.parent, evt)
-        # Remove parameters that are not shown
-        cpage = self.fit_panel.get_page_by_id(uid)
-        tbatch_outputs = {}
-        shownkeystr = cpage.get_copy_params()
-        for key in batch_outputs.keys():
-            if key in ["Chi2", "Data"] or shownkeystr.count(key) > 0:
-                tbatch_outputs[key] = batch_outputs[key]
-
-        wx.CallAfter(self.parent.on_set_batch_result, tbatch_outputs,
-                     batch_inputs, self.sub_menu)
+        return msg
 
     def on_set_batch_result(self, page_id, fid, batch_outputs, batch_inputs):
         """
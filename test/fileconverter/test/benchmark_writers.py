@@ -0,0 +1,103 @@
+"""
+    Throughput of the 2D Q map and CanSAS XML writers against the point by
+    point writers they replace.
+
+    Run with: python benchmark_writers.py [number of points]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from sas.sascalc.dataloader.data_info import Data1D, Data2D
+from sas.sascalc.file_converter.cansas_writer import CansasWriter
+from sas.sascalc.file_converter.red2d_writer import Red2DWriter
+
+
+class NeverQuit(object):
+    def isquit(self):
+        return False
+
+
+def write_red2d_points(filename, data):
+    """
+    Point by point Red2DWriter.write
+    """
+    with open(filename, 'w') as fd:
+        fd.write(Red2DWriter.header_string())
+        for i in range(len(data.data)):
+            fd.write("%g  %g  %g\n" % (data.qx_data[i], data.qy_data[i],
+                                       data.data[i]))
+
+
+class PointCansasWriter(CansasWriter):
+    """
+    CansasWriter building an lxml node per value
+    """
+    def _write_data(self, datainfo, entry_node):
+        node = self.create_element("SASdata")
+        self.append(node, entry_node)
+        for i in range(len(datainfo.x)):
+            point = self.create_element("Idata")
+            node.append(point)
+            self.write_node(point, "Q", datainfo.x[i],
+                            {'unit': datainfo.x_unit})
+            self.write_node(point, "I", datainfo.y[i],
+                            {'unit': datainfo.y_unit})
+            self.write_node(point, "Idev", datainfo.dy[i],
+                            {'unit': datainfo.y_unit})
+            self.write_node(point, "Qdev", datainfo.dx[i],
+                            {'unit': datainfo.x_unit})
+
+
+def timed(label, n_points, write, path):
+    start = time.time()
+    write(path)
+    elapsed = time.time() - start
+    size = os.path.getsize(path) / 1.0e6
+    print("%-32s %8.3f s %10.0f points/s %8.1f MB" % (
+        label, elapsed, n_points / elapsed, size))
+    with open(path, 'rb') as fid:
+        return fid.read()
+
+
+def main(n_points=10**6):
+    rng = np.random.RandomState(0)
+    data2d = Data2D(data=rng.uniform(0, 100, n_points),
+                    qx_data=rng.uniform(-0.1, 0.1, n_points),
+                    qy_data=rng.uniform(-0.1, 0.1, n_points))
+    n_1d = n_points // 10
+    data1d = Data1D(x=np.linspace(0.001, 0.5, n_1d),
+                    y=rng.uniform(0, 100, n_1d),
+                    dx=rng.uniform(0, 0.01, n_1d),
+                    dy=rng.uniform(0, 1, n_1d))
+    data1d.x_unit = "1/A"
+    data1d.y_unit = "1/cm"
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmpdir, "benchmark")
+        old = timed("Red2D, point by point", n_points,
+                    lambda p: write_red2d_points(p, data2d), path)
+        new = timed("Red2D, in chunks", n_points,
+                    lambda p: Red2DWriter().write(p, data2d, NeverQuit()),
+                    path)
+        # the header holds the time of writing
+        assert old.split(b"\n", 4)[4] == new.split(b"\n", 4)[4]
+
+        old = timed("CanSAS XML, node per value", n_1d,
+                    lambda p: PointCansasWriter().write(p, [data1d]), path)
+        new = timed("CanSAS XML, Idata blocks", n_1d,
+                    lambda p: CansasWriter().write(p, [data1d]), path)
+        assert old == new
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main(*[int(v) for v in sys.argv[1:]])
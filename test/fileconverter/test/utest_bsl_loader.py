@@ -1,11 +1,15 @@
 import os
 import os.path
+import shutil
+import tempfile
 import unittest
 
 from xml.etree import ElementTree as ET
 import numpy as np
 
 from sas.sascalc.file_converter.bsl_loader import BSLLoader
+from sas.sascalc.file_converter.nxcansas_writer import NXcanSASWriter
+from sas.sascalc.dataloader.readers.cansas_reader_HDF5 import Reader
 
 def find(filename):
     return os.path.join(os.path.dirname(__file__), filename)
@@ -39,3 +43,37 @@ class bsl_test(unittest.TestCase):
         q_test = np.allclose(i_data_array, i_data_load, atol=1e-13)
 
         self.assertTrue(q_test)
+
+    def test_frames(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            frames = np.random.RandomState(2).uniform(0, 10, (5, 3, 4))
+            with open(os.path.join(tmpdir, "X01000.I2D"), 'w') as header:
+                header.write("title\n\n")
+                header.write("4 3 5 0 0 0 0 0 0 0\n")
+                header.write("X01001.I2D\n")
+            frames.astype('>f4').tofile(os.path.join(tmpdir, "X01001.I2D"))
+            loader = BSLLoader(os.path.join(tmpdir, "X01000.I2D"))
+            expected = frames.astype('>f4').reshape(5, 12)
+
+            np.testing.assert_array_equal(loader.load_data(3), expected[3])
+            data = loader.load_frames([0, 2, 4])
+            self.assertEqual(len(data), 3)
+            np.testing.assert_array_equal(data[1].data, expected[2])
+            np.testing.assert_array_equal(data[2].qx_data,
+                                          np.tile(np.arange(1, 5), 3))
+            np.testing.assert_array_equal(data[2].qy_data,
+                                          np.repeat(np.arange(1, 4), 4))
+            data = loader.load_frames(slice(1, None, 2))
+            np.testing.assert_array_equal([d.data for d in data],
+                                          expected[1::2])
+
+            # Stream the frames to an NXcanSAS file
+            path = os.path.join(tmpdir, "frames.h5")
+            NXcanSASWriter().write(loader.iter_frames(), path)
+            written = Reader().read(path)
+            self.assertEqual(len(written), 5)
+            for frame, data in zip(expected, written):
+                np.testing.assert_array_equal(data.data, frame)
+        finally:
+            shutil.rmtree(tmpdir)
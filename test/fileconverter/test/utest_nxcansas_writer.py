@@ -1,6 +1,11 @@
 from sas.sascalc.file_converter.nxcansas_writer import NXcanSASWriter
 from sas.sascalc.dataloader.loader import Loader
+from sas.sascalc.dataloader.readers.cansas_reader_HDF5 import \
+    Reader as HDF5Reader
 
+import copy
+import h5py
+import numpy as np
 import os
 import os.path
 import unittest
@@ -49,6 +54,71 @@ class nxcansas_writer(unittest.TestCase):
         self.assertTrue(len(data.qy_data) == len(self.data_2d.qy_data))
         self._check_metadata(data, self.data_2d)
 
+    def test_write_options(self):
+        """
+        Test compressed, chunked and float32 data arrays
+        """
+        writer = NXcanSASWriter(compression='gzip', compression_opts=4,
+                                chunks=True, float32=True)
+        writer.write([self.data_2d], self.write_file_2d)
+        with h5py.File(self.write_file_2d, 'r') as h5:
+            sasdata = h5['sasentry01']['sasdata01']
+            self.assertEqual(sasdata['I'].compression, 'gzip')
+            self.assertEqual(sasdata['I'].dtype, np.float32)
+            self.assertEqual(sasdata['Qx'].dtype, np.float64)
+            self.assertIsNotNone(sasdata['Qx'].chunks)
+        data = self.loader.load(self.write_file_2d)[0]
+        np.testing.assert_allclose(data.data, self.data_2d.data, rtol=1e-6)
+        np.testing.assert_array_equal(data.qx_data, self.data_2d.qx_data)
+        self._check_metadata(data, self.data_2d)
+
+        NXcanSASWriter(compression='lzf').write([self.data_1d],
+                                                self.write_file_1d)
+        data = self.loader.load(self.write_file_1d)[0]
+        np.testing.assert_array_equal(data.y, self.data_1d.y)
+
+    def test_write_frames(self):
+        """
+        Test frames appended to a single SASdata group
+        """
+        frames = []
+        for scale in (1.0, 2.0, 3.0):
+            frame = copy.deepcopy(self.data_2d)
+            frame.data = frame.data * scale
+            frames.append(frame)
+        writer = NXcanSASWriter(multi_frame=True)
+        writer.write(iter(frames), self.write_file_2d)
+        with h5py.File(self.write_file_2d, 'r') as h5:
+            sasentry = h5['sasentry01']
+            self.assertEqual(len([k for k in sasentry if 'sasdata' in k]), 1)
+            shape = sasentry['sasdata01']['I'].shape
+            self.assertEqual(shape[0], 3)
+            self.assertEqual(shape[1:], sasentry['sasdata01']['Qx'].shape)
+        data = HDF5Reader().read(self.write_file_2d)
+        self.assertEqual(len(data), 3)
+        for written, frame in zip(data, frames):
+            np.testing.assert_array_equal(written.data, frame.data)
+            np.testing.assert_array_equal(written.qy_data, frame.qy_data)
+        data = HDF5Reader().read(self.write_file_2d, frames=[1])
+        self.assertEqual(len(data), 1)
+        np.testing.assert_array_equal(data[0].data, frames[1].data)
+
+        frames = []
+        for scale in (1.0, 2.0):
+            frame = copy.deepcopy(self.data_1d)
+            frame.y = frame.y * scale
+            frames.append(frame)
+        writer.write(frames, self.write_file_1d)
+        data = HDF5Reader().read(self.write_file_1d)
+        self.assertEqual(len(data), 2)
+        np.testing.assert_array_equal(data[1].y, frames[1].y)
+        np.testing.assert_array_equal(data[1].x, frames[1].x)
+
+        # frames of another size or type are refused
+        self.assertRaises(ValueError, writer.write,
+                          [self.data_1d, self.data_2d], self.write_file_1d)
+        self.assertFalse(os.path.isfile(self.write_file_1d))
+
     def _check_metadata(self, written, correct):
         self.assertTrue(written.title == correct.title)
         self.assertTrue(written.sample.name == correct.sample.name)
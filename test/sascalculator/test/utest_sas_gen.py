@@ -3,6 +3,9 @@ Unit tests for the sas_gen
 """
 
 import os.path
+import time
+import shutil
+import tempfile
 import warnings
 warnings.simplefilter("ignore")
 
@@ -41,6 +44,20 @@ class sas_gen_test(unittest.TestCase):
         self.assertEqual(f.pos_y[0], -1.008)
         self.assertEqual(f.pos_z[0], 3.326)
 
+    def test_pdbreader_xray(self):
+        """
+        Test the X-ray SLD of the .pdb atoms
+        """
+        neutron = self.pdbloader.read(find("c60.pdb"))
+        xray = sas_gen.PDBReader(probe='xray').read(find("c60.pdb"))
+        self.assertAlmostEqual(neutron.sld_n[0], 7.332e-6, 8)
+        self.assertTrue(xray.sld_n[0] > 2*neutron.sld_n[0])
+        np.testing.assert_array_equal(xray.vol_pix, neutron.vol_pix)
+        self.assertIs(sas_gen.element_sld('C', 'xray'),
+                      sas_gen.element_sld('C', 'xray'))
+        self.assertEqual(sas_gen._element_sld.cache_info().maxsize, 1024)
+        self.assertRaises(ValueError, sas_gen.element_sld, 'C', 'muon')
+
     def test_omfreader(self):
         """
         Test .omf file loaded
@@ -55,6 +72,100 @@ class sas_gen_test(unittest.TestCase):
         self.assertEqual(output.pos_y[0], 0.0)
         self.assertEqual(output.pos_z[0], 0.0)
 
+    def test_omfreader_binary(self):
+        """
+        Test OVF 2.0 binary 4 and 8 data segments
+        """
+        m = np.array([[0., 0., 0.], [1.e5, 0., 0.],
+                      [0., 2.e5, 0.], [0., 0., 3.e5]])
+        header = ["# OOMMF OVF 2.0", "# Segment count: 1",
+                  "# Begin: Segment", "# Begin: Header", "# Title: test",
+                  "# meshtype: rectangular", "# meshunit: m",
+                  "# valuedim: 3", "# valueunits: A/m A/m A/m",
+                  "# xbase: 1e-09", "# ybase: 1e-09", "# zbase: 1e-09",
+                  "# xstepsize: 2e-09", "# ystepsize: 2e-09",
+                  "# zstepsize: 2e-09", "# xnodes: 2", "# ynodes: 2",
+                  "# znodes: 1", "# xmin: 0", "# ymin: 0", "# zmin: 0",
+                  "# xmax: 4e-09", "# ymax: 4e-09", "# zmax: 2e-09",
+                  "# End: Header"]
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for size, check in ((4, 1234567.0), (8, 123456789012345.0)):
+                path = os.path.join(tmpdir, "binary%d.ovf" % size)
+                with open(path, 'wb') as fid:
+                    fid.write(("\n".join(header) + "\n").encode())
+                    fid.write(("# Begin: Data Binary %d\n" % size).encode())
+                    dtype = '<f%d' % size
+                    fid.write(np.array([check], dtype=dtype).tobytes())
+                    fid.write(m.astype(dtype).tobytes())
+                    fid.write(b"\n# End: Data Binary\n# End: Segment\n")
+                f = self.omfloader.read(path)
+                np.testing.assert_allclose(f.mx, sas_gen.mag2sld(m[:, 0], "A/m"))
+                np.testing.assert_allclose(f.mz, sas_gen.mag2sld(m[:, 2], "A/m"))
+                self.assertEqual(f.xnodes, 2)
+                self.assertAlmostEqual(f.xstepsize, 20.0)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_reader_cache(self):
+        """
+        Test that a second read comes from the binary cache
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            reader = sas_gen.PDBReader()
+            reader.cache_dir = tmpdir
+            reader.read(find("c60.pdb"))
+            self.assertEqual(os.listdir(tmpdir), [])
+            reader.use_cache = True
+            parsed = reader.read(find("c60.pdb"))
+            self.assertEqual(len(os.listdir(tmpdir)), 1)
+            reader._read = None
+            cached = reader.read(find("c60.pdb"))
+            self.assertIsInstance(cached.pos_x, np.memmap)
+            np.testing.assert_array_equal(cached.pos_x, parsed.pos_x)
+            np.testing.assert_array_equal(cached.sld_n, parsed.sld_n)
+            np.testing.assert_array_equal(cached.vol_pix, parsed.vol_pix)
+            self.assertEqual(cached.line_x, parsed.line_x)
+            self.assertEqual(cached.pix_type, 'atom')
+            # the cached arrays are copied on write
+            cached.pos_x -= 1.0
+            np.testing.assert_array_equal(reader.read(find("c60.pdb")).pos_x,
+                                          parsed.pos_x)
+            # the atom slds depend on the probe
+            xray = sas_gen.PDBReader(probe='xray')
+            xray.cache_dir = tmpdir
+            xray.use_cache = True
+            xray.read(find("c60.pdb"))
+            self.assertEqual(len(os.listdir(tmpdir)), 2)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_prune_cache(self):
+        """
+        Test that the least recently used cache entries are removed first
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            now = time.time()
+            entries = []
+            for age, probe in ((2, 'neutron'), (1, 'xray')):
+                reader = sas_gen.PDBReader(probe=probe)
+                reader.cache_dir = tmpdir
+                reader.use_cache = True
+                reader.read(find("c60.pdb"))
+                path = reader._cache_path(find("c60.pdb"))
+                os.utime(path, (now - 3600*age, now - 3600*age))
+                entries.append(os.path.basename(path))
+            sas_gen.prune_cache(tmpdir, max_age=3*3600)
+            self.assertEqual(len(os.listdir(tmpdir)), 2)
+            sas_gen.prune_cache(tmpdir, max_age=1.5*3600)
+            self.assertEqual(os.listdir(tmpdir), entries[1:])
+            sas_gen.prune_cache(tmpdir, max_bytes=0)
+            self.assertEqual(os.listdir(tmpdir), [])
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_calculator(self):
         """
         Test that the calculator calculates.
@@ -67,6 +178,129 @@ class sas_gen_test(unittest.TestCase):
         x = np.linspace(0, 0.1, 11)[1:]
         model.runXY([x, x])
 
+    def test_calculator_threads(self):
+        """
+        Test that the threaded calculation matches the serial one.
+        """
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(f)
+        model = sas_gen.GenSAS()
+        model.set_sld_data(omf2sld.output)
+        x = np.linspace(-0.1, 0.1, 21)
+        serial = model.runXY([x, x[::-1]])
+        model.set_num_threads(3)
+        threaded = model.runXY([x, x[::-1]])
+        np.testing.assert_array_equal(serial, threaded)
+        # the pool is kept between evaluations and not copied
+        pool = model._pool
+        model.runXY([x, x[::-1]])
+        self.assertIs(model._pool, pool)
+        self.assertIsNone(model.clone()._pool)
+        model.set_num_threads(2)
+        self.assertIsNone(model._pool)
+        np.testing.assert_array_equal(model.runXY([x, x[::-1]]), serial)
+
+    def test_compacted_pixels(self):
+        """
+        Test that only contributing pixels are kept, once per solvent sld.
+        """
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(f)
+        model = sas_gen.GenSAS()
+        model.set_sld_data(omf2sld.output)
+        x = np.linspace(0, 0.1, 11)[1:]
+        model.runXY([x, x])
+        pixels = model._get_pixels()
+        model.runXY([x, x])
+        self.assertIs(model._get_pixels(), pixels)
+        self.assertTrue(0 < pixels.shape[1] < len(omf2sld.output.pos_x))
+        self.assertTrue(np.all(pixels[3:7].any(axis=0)))
+        model.params['solvent_SLD'] = 1.0e-6
+        self.assertEqual(model._get_pixels().shape[1],
+                         len(omf2sld.output.pos_x))
+
+    def test_polarized_channels(self):
+        """
+        Test the spin channels against a per pixel evaluation of cal_msld.
+        """
+        rng = np.random.RandomState(1)
+        pos = rng.uniform(-20, 20, (3, 10))
+        sld = rng.uniform(-2e-6, 2e-6, (4, 10))
+        data = sas_gen.MagSLD(pos[0], pos[1], pos[2], *sld)
+        data.set_pixel_volumes(rng.uniform(1, 2, 10))
+        model = sas_gen.GenSAS()
+        model.set_sld_data(data)
+        model.params['Up_frac_in'] = 0.3
+        model.params['Up_frac_out'] = 0.8
+        model.params['Up_theta'] = 25.0
+        qx = np.array([0.0, 0.05, -0.03, -0.02, 0.1])
+        qy = np.array([0.0, 0.02, 0.04, -0.05, 0.0])
+        Iq = model.runXY([qx, qy])
+
+        fin, fout = 0.3, 0.8
+        s_theta = np.radians(25.0)
+        expected = []
+        for q_x, q_y in zip(qx, qy):
+            q_angle = np.pi/2 - (np.pi/2 if q_x == 0 else np.arctan2(q_y, q_x))
+            m_perp = 0.0 if q_x == 0 and q_y == 0 else 1.0
+            # cal_msld receives (mx, my, mz) as (m_max, m_theta, m_phi)
+            a = (m_perp*sld[1]*np.cos(q_angle) - sld[3]*np.sin(q_angle))
+            sigma_x = a*np.cos(q_angle)*np.cos(s_theta) \
+                - a*np.sin(q_angle)*np.sin(s_theta)
+            sigma_y = -a*np.cos(q_angle)*np.sin(s_theta) \
+                - a*np.sin(q_angle)*np.cos(s_theta)
+            sigma_z = sld[2]
+            phase = data.vol_pix * np.exp(1j*(q_x*pos[0] + q_y*pos[1]))
+            channels = [
+                (fin*fout)**0.25 * (sld[0] - sigma_x),
+                ((1-fin)*(1-fout))**0.25 * (sld[0] + sigma_x),
+                (fin*(1-fout))**0.25 * (sigma_y + 1j*sigma_z),
+                ((1-fin)*fout)**0.25 * (sigma_y - 1j*sigma_z),
+            ]
+            expected.append(sum(abs(np.sum(c*phase))**2 for c in channels))
+        expected = np.array(expected) * 1.0e8 / np.sum(data.vol_pix)
+        np.testing.assert_allclose(Iq, expected, rtol=1e-10)
+
+    def test_fft_backend(self):
+        """
+        Test that the fft backend matches the direct sum on an OMF grid.
+        """
+        f = self.omfloader.read(find("A_Raw_Example-1.omf"))
+        omf2sld = sas_gen.OMF2SLD()
+        omf2sld.set_data(f)
+        model = sas_gen.GenSAS()
+        model.set_sld_data(omf2sld.output)
+        model.params['Up_frac_in'] = 0.3
+        model.params['Up_theta'] = 20.0
+        x = np.linspace(-0.2, 0.2, 21)
+        qx, qy = [v.ravel() for v in np.meshgrid(x, x)]
+        direct = model.runXY([qx, qy])
+        model.set_backend('fft', tolerance=1.0e-3)
+        fft = model.runXY([qx, qy])
+        self.assertIsNotNone(model._get_fft())
+        self.assertLess(np.max(np.abs(fft - direct)), 1.0e-3 * direct.max())
+
+        # atomic data falls back to the direct sum
+        model.set_sld_data(self.pdbloader.read(find("c60.pdb")))
+        self.assertIsNone(model._get_fft())
+        model.runXY([qx, qy])
+
+    def test_debye_histogram(self):
+        """
+        Test that the P(r) histogram matches the direct Debye sum.
+        """
+        f = self.pdbloader.read(find("c60.pdb"))
+        model = sas_gen.GenSAS()
+        model.set_sld_data(f)
+        q = np.linspace(0.001, 1.0, 51)
+        direct = model.run([q, []])
+        tolerance = 1.0e-4
+        model.set_debye_bin_width(sas_gen.debye_bin_width(q[-1], tolerance))
+        binned = model.run([q, []])
+        self.assertLess(np.max(np.abs(binned - direct)), tolerance * direct[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,12 +3,16 @@
 """
 
 import os.path
+import shutil
+import tempfile
 import warnings
 import math
 warnings.simplefilter("ignore")
 
 import unittest
+import numpy as np
 from sas.sascalc.dataloader.loader import Loader
+from sas.sascalc.dataloader.readers.ascii_reader import Reader
 from sas.sascalc.dataloader.data_info import Data2D
 
 
@@ -130,6 +134,34 @@ class ABSReaderTests(unittest.TestCase):
             self.assertFalse(math.isnan(f_2d.qx_data[i]))
             self.assertFalse(math.isnan(f_2d.qy_data[i]))
 
+    def test_data_blocks(self):
+        """
+        Test that data read in blocks stops at the footer, including a
+        footer with the same number of columns, and at a change of delimiter.
+        """
+        values = np.random.RandomState(3).uniform(0.001, 1.0, (53, 3))
+        lines = ["Q I dI", "1 2", "header"]
+        lines += ["%r %r %r" % tuple(row) for row in values[:20]]
+        lines += [""]
+        lines += ["%r %r %r" % tuple(row) for row in values[20:]]
+        # the reader sorts the data by q
+        expected = values[np.argsort(values[:, 0])]
+        tmpdir = tempfile.mkdtemp()
+        try:
+            for footer in (["# footer", "1 2 3"], ["1 2 3 4", "1 2 3"],
+                           ["1; 2"], []):
+                path = os.path.join(tmpdir, "blocks.txt")
+                with open(path, 'w') as fid:
+                    fid.write("\n".join(lines + footer) + "\n")
+                reader = Reader()
+                reader.block_lines = 7
+                f = reader.read(path)[0]
+                np.testing.assert_array_equal(f.x, expected[:, 0])
+                np.testing.assert_array_equal(f.y, expected[:, 1])
+                np.testing.assert_array_equal(f.dy, expected[:, 2])
+        finally:
+            shutil.rmtree(tmpdir)
+
 
 if __name__ == '__main__':
     unittest.main()
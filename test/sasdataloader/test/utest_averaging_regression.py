@@ -0,0 +1,317 @@
+"""
+Regression tests of the array based averaging in manipulations
+against the original point by point implementation.
+"""
+
+import copy
+import math
+import unittest
+import numpy as np
+
+import sas.sascalc.dataloader.data_info as data_info
+from sas.sascalc.dataloader.manipulations import (Binning, CircularAverage,
+                                                  Ring, SectorPhi, SectorQ,
+                                                  flip_phi, get_dq_data)
+
+
+def circular_average(avg, data2D, ismask=False):
+    """
+    Point by point CircularAverage.__call__
+    """
+    finite = np.isfinite(data2D.data)
+    data = data2D.data[finite]
+    q_data = data2D.q_data[finite]
+    err_data = data2D.err_data[finite]
+    mask_data = data2D.mask[finite]
+    dq_data = None
+    if data2D.dqx_data is not None and data2D.dqy_data is not None:
+        dq_data = get_dq_data(data2D)
+    nbins = int(math.ceil((avg.r_max - avg.r_min) / avg.bin_width))
+    x = np.zeros(nbins)
+    y = np.zeros(nbins)
+    err_y = np.zeros(nbins)
+    err_x = np.zeros(nbins)
+    y_counts = np.zeros(nbins)
+    for npt in range(len(data)):
+        if ismask and not mask_data[npt]:
+            continue
+        q_value = q_data[npt]
+        data_n = data[npt]
+        if not (avg.r_min <= q_value and q_value <= avg.r_max):
+            continue
+        i_q = int(math.floor((q_value - avg.r_min) / avg.bin_width))
+        if i_q == nbins:
+            i_q = nbins - 1
+        y[i_q] += data_n
+        x[i_q] += q_value
+        if err_data[npt] == 0.0:
+            err_y[i_q] += abs(data_n)
+        else:
+            err_y[i_q] += err_data[npt] * err_data[npt]
+        if dq_data is not None:
+            err_x[i_q] += dq_data[npt]
+        else:
+            err_x = None
+        y_counts[i_q] += 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        err_y = np.sqrt(np.fabs(err_y)) / y_counts
+        err_y[err_y == 0] = np.average(err_y)
+        y = y / y_counts
+        x = x / y_counts
+    idx = np.isfinite(y) & np.isfinite(x)
+    d_x = err_x[idx] / y_counts[idx] if err_x is not None else None
+    return x[idx], y[idx], err_y[idx], d_x
+
+
+def ring(avg, data2D):
+    """
+    Point by point Ring.__call__
+    """
+    finite = np.isfinite(data2D.data)
+    data = data2D.data[finite]
+    q_data = data2D.q_data[finite]
+    err_data = data2D.err_data[finite]
+    qx_data = data2D.qx_data[finite]
+    qy_data = data2D.qy_data[finite]
+    nbins = avg.nbins_phi
+    phi_bins = np.zeros(nbins)
+    phi_counts = np.zeros(nbins)
+    phi_err = np.zeros(nbins)
+    phi_shift = math.pi / nbins
+    for npt in range(len(data)):
+        q_value = q_data[npt]
+        if not (avg.r_min <= q_value and q_value <= avg.r_max):
+            continue
+        phi_value = math.atan2(qy_data[npt], qx_data[npt]) + math.pi
+        i_phi = int(math.floor(nbins * (phi_value + phi_shift)
+                               / (2 * math.pi)))
+        if i_phi >= nbins:
+            i_phi = 0
+        phi_bins[i_phi] += data[npt]
+        if err_data[npt] == 0.0:
+            phi_err[i_phi] += math.fabs(data[npt])
+        else:
+            phi_err[i_phi] += err_data[npt] * err_data[npt]
+        phi_counts[i_phi] += 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi_bins = phi_bins / phi_counts
+        phi_err = np.sqrt(phi_err) / phi_counts
+    phi_values = 2.0 * math.pi / nbins * np.arange(nbins)
+    idx = np.isfinite(phi_bins)
+    return phi_values[idx], phi_bins[idx], phi_err[idx], None
+
+
+def sector(avg, data2D, run):
+    """
+    Point by point _Sector._agv
+    """
+    finite = np.isfinite(data2D.data)
+    data = data2D.data[finite]
+    q_data = data2D.q_data[finite]
+    err_data = data2D.err_data[finite]
+    qx_data = data2D.qx_data[finite]
+    qy_data = data2D.qy_data[finite]
+    dq_data = None
+    if data2D.dqx_data is not None and data2D.dqy_data is not None:
+        dq_data = get_dq_data(data2D)
+    x = np.zeros(avg.nbins)
+    y = np.zeros(avg.nbins)
+    y_err = np.zeros(avg.nbins)
+    x_err = np.zeros(avg.nbins)
+    y_counts = np.zeros(avg.nbins)
+    phi_min = flip_phi(avg.phi_min)
+    phi_max = flip_phi(avg.phi_max)
+    if run == 'phi':
+        binning = Binning(avg.phi_min, avg.phi_max, avg.nbins, avg.base)
+    else:
+        binning = Binning(avg.r_min, avg.r_max, avg.nbins, avg.base)
+    for n in range(len(data)):
+        q_value = q_data[n]
+        data_n = data[n]
+        is_in = False
+        phi_value = math.atan2(qy_data[n], qx_data[n]) + math.pi
+        if avg.r_min > q_value or q_value > avg.r_max:
+            continue
+        if run == 'q2':
+            phi_min_minor = flip_phi(phi_min - math.pi)
+            phi_max_minor = flip_phi(phi_max - math.pi)
+            if phi_min_minor > phi_max_minor:
+                is_in = (phi_value > phi_min_minor or
+                         phi_value < phi_max_minor)
+            else:
+                is_in = (phi_value > phi_min_minor and
+                         phi_value < phi_max_minor)
+        if phi_min > phi_max:
+            is_in = is_in or (phi_value > phi_min or phi_value < phi_max)
+        else:
+            is_in = is_in or (phi_value >= phi_min and phi_value < phi_max)
+        if not is_in:
+            continue
+        if run == 'phi':
+            i_bin = binning.get_bin_index(phi_value)
+        else:
+            i_bin = binning.get_bin_index(q_value)
+        if i_bin == avg.nbins:
+            i_bin = avg.nbins - 1
+        y[i_bin] += data_n
+        x[i_bin] += q_value
+        if err_data[n] == 0.0:
+            y_err[i_bin] += abs(data_n)
+        else:
+            y_err[i_bin] += err_data[n]**2
+        if dq_data is not None:
+            x_err[i_bin] += dq_data[n]
+        else:
+            x_err = None
+        y_counts[i_bin] += 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y = y/y_counts
+        y_err = np.sqrt(y_err)/y_counts
+        if run == 'phi':
+            step = (avg.phi_max - avg.phi_min) / avg.nbins
+            x = (np.arange(avg.nbins) + 0.5) * step + avg.phi_min
+        else:
+            x = x/y_counts
+    idx = np.isfinite(y) & np.isfinite(y_err)
+    d_x = x_err[idx] / y_counts[idx] if x_err is not None else None
+    return x[idx], y[idx], y_err[idx], d_x
+
+
+class AveragingRegression(unittest.TestCase):
+    """
+        Compare the averaging classes with the point by point loops
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        n = 64
+        qx, qy = np.meshgrid(np.linspace(-0.05, 0.05, n),
+                             np.linspace(-0.04, 0.06, n))
+        data = rng.normal(10.0, 3.0, n*n)
+        err = rng.uniform(0.1, 1.0, n*n)
+        # points without errors, negative counts and bad points
+        err[rng.randint(0, n*n, 200)] = 0.0
+        data[rng.randint(0, n*n, 200)] *= -1
+        data[rng.randint(0, n*n, 50)] = np.nan
+
+        self.data = data_info.Data2D(data=data, err_data=err)
+        self.data.qx_data = qx.ravel()
+        self.data.qy_data = qy.ravel()
+        self.data.q_data = np.sqrt(qx**2 + qy**2).ravel()
+        self.data.mask = rng.uniform(size=n*n) > 0.2
+        self.data.detector.append(data_info.Detector())
+
+        self.smeared = data_info.Data2D(data=data, err_data=err)
+        for name in ('qx_data', 'qy_data', 'q_data', 'mask', 'detector'):
+            setattr(self.smeared, name, getattr(self.data, name))
+        self.smeared.dqx_data = 0.001 + 0.01*self.data.q_data
+        self.smeared.dqy_data = 0.0005 + 0.002*self.data.q_data
+
+    def compare(self, output, expected):
+        x, y, dy, dx = expected
+        np.testing.assert_allclose(output.x, x, rtol=1e-12)
+        np.testing.assert_allclose(output.y, y, rtol=1e-12)
+        np.testing.assert_allclose(output.dy, dy, rtol=1e-12)
+        if dx is None:
+            self.assertIsNone(output.dx)
+        else:
+            np.testing.assert_allclose(output.dx, dx, rtol=1e-12)
+
+    def test_circular_average(self):
+        """
+            Test circular averaging with and without mask and dq
+        """
+        for data in (self.data, self.smeared):
+            for r_min, r_max, width in ((0.0, 0.07, 0.002),
+                                        (0.01, 0.03, 0.0007)):
+                avg = CircularAverage(r_min=r_min, r_max=r_max,
+                                      bin_width=width)
+                for ismask in (False, True):
+                    self.compare(avg(data, ismask=ismask),
+                                 circular_average(avg, data, ismask))
+
+    def test_ring(self):
+        """
+            Test ring averaging
+        """
+        for nbins in (7, 20, 36):
+            avg = Ring(r_min=0.01, r_max=0.04, nbins=nbins)
+            self.compare(avg(self.data), ring(avg, self.data))
+
+    def test_sector_q(self):
+        """
+            Test I(q) sector averaging, including a sector across phi = 0
+            and log binning
+        """
+        for data in (self.data, self.smeared):
+            for phi_min, phi_max in ((0, math.pi/2), (1.0, 2.5),
+                                     (5.5, 0.7), (-0.5, 0.5)):
+                for base in (None, 10):
+                    avg = SectorQ(r_min=0.005, r_max=0.05, phi_min=phi_min,
+                                  phi_max=phi_max, nbins=25, base=base)
+                    self.compare(avg(data), sector(avg, data, 'q2'))
+
+    def test_sector_phi(self):
+        """
+            Test I(phi) sector averaging
+        """
+        for phi_min, phi_max in ((0, 2*math.pi), (0, math.pi/2),
+                                 (1.0, 4.0)):
+            for base in (None, 10):
+                avg = SectorPhi(r_min=0.01, r_max=0.04, phi_min=phi_min,
+                                phi_max=phi_max, nbins=19, base=base)
+                self.compare(avg(self.smeared),
+                             sector(avg, self.smeared, 'phi'))
+
+    def test_polar_index(self):
+        """
+            Test that the polar index is reused until the data is replaced
+        """
+        index = self.data.get_polar_index()
+        self.assertIs(self.data.get_polar_index(), index)
+        finite = np.isfinite(self.data.data)
+        np.testing.assert_array_equal(index.finite, finite)
+        np.testing.assert_array_equal(
+            index.phi, np.arctan2(self.data.qy_data, self.data.qx_data))
+        pixels = index.ring(0.01, 0.03)
+        expected = np.flatnonzero(finite & (self.data.q_data >= 0.01)
+                                  & (self.data.q_data <= 0.03))
+        np.testing.assert_array_equal(pixels, expected)
+
+        self.data.mask = self.data.mask.copy()
+        self.assertIsNot(self.data.get_polar_index(), index)
+        index = self.data.get_polar_index()
+        self.data.qx_data = -self.data.qx_data
+        new_index = self.data.get_polar_index()
+        self.assertIsNot(new_index, index)
+        np.testing.assert_array_equal(
+            new_index.phi, np.arctan2(self.data.qy_data, self.data.qx_data))
+
+    def test_polar_index_copy(self):
+        """
+            Test that copies of the data build their own polar index
+        """
+        index = self.data.get_polar_index()
+        data = copy.deepcopy(self.data)
+        self.assertIsNone(data._polar_index)
+        # as the masking panel does
+        data.data[::2] = np.nan
+        avg = CircularAverage(r_min=0.0, r_max=0.06, bin_width=0.005)
+        self.compare(avg(data), circular_average(avg, data))
+        self.assertIs(self.data.get_polar_index(), index)
+
+    def test_polar_index_dq(self):
+        """
+            Test that the resolution is computed once per polar index
+        """
+        index = self.smeared.get_polar_index()
+        dq = index.get_dq(self.smeared)
+        np.testing.assert_array_equal(dq, get_dq_data(self.smeared))
+        self.assertIs(index.get_dq(self.smeared), dq)
+        self.smeared.dqx_data = 2*self.smeared.dqx_data
+        index = self.smeared.get_polar_index()
+        np.testing.assert_array_equal(index.get_dq(self.smeared), 2*dq)
+
+
+if __name__ == '__main__':
+    unittest.main()
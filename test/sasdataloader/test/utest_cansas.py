@@ -3,6 +3,8 @@
 """
 import os
 import sys
+import shutil
+import tempfile
 import unittest
 import logging
 import warnings
@@ -11,6 +13,8 @@ if sys.version_info[0] >= 3:
 else:
     from StringIO import StringIO
 
+import h5py
+import numpy as np
 from lxml import etree
 from lxml.etree import XMLSyntaxError
 from xml.dom import minidom
@@ -21,6 +25,7 @@ from sas.sascalc.dataloader.loader import Loader
 from sas.sascalc.dataloader.data_info import Data1D, Data2D
 from sas.sascalc.dataloader.readers.xml_reader import XMLreader
 from sas.sascalc.dataloader.readers.cansas_reader import Reader
+from sas.sascalc.dataloader.readers import cansas_reader_HDF5
 from sas.sascalc.dataloader.readers.cansas_constants import CansasConstants
 
 logger = logging.getLogger(__name__)
@@ -208,6 +213,69 @@ class cansas_reader_xml(unittest.TestCase):
         if os.path.isfile(self.write_1_0_filename):
             os.remove(self.write_1_0_filename)
 
+    def test_write_chunks(self):
+        """
+        Test that the data points are written the same in any size of chunk,
+        including columns shorter than Q
+        """
+        data = Data1D(x=np.linspace(0.001, 0.1, 23),
+                      y=np.linspace(1.0, 2.0, 23).astype(np.float32),
+                      dy=np.linspace(0.1, 0.2, 23)[:10])
+        data.xaxis("Q", "1/A")
+        data.yaxis("I", "1/cm")
+        tmpdir = tempfile.mkdtemp()
+        try:
+            contents = []
+            for chunk in (4, 10, 10000):
+                path = os.path.join(tmpdir, "chunk%d.xml" % chunk)
+                writer = Reader()
+                writer.write_chunk = chunk
+                writer.write(path, data)
+                with open(path, 'rb') as fid:
+                    contents.append(fid.read())
+            self.assertEqual(contents[0], contents[1])
+            self.assertEqual(contents[0], contents[2])
+            idata = etree.fromstring(contents[0]).findall(".//{*}Idata")
+            self.assertEqual(len(idata), 23)
+            self.assertEqual(len(idata[9]), 3)
+            self.assertEqual(len(idata[10]), 2)
+            self.assertEqual(idata[12][1].text, str(data.y[12]))
+            self.assertEqual(idata[12][1].get("unit"), "1/cm")
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_write_streamed(self):
+        """
+        Test that the data points are streamed to the file rather than
+        added to the document
+        """
+        documents = []
+
+        class StreamedReader(Reader):
+            def _write_doc(self, filename, doc):
+                documents.append(etree.tostring(doc))
+                Reader._write_doc(self, filename, doc)
+
+        data = Data1D(x=np.linspace(0.001, 0.1, 23),
+                      y=np.linspace(1.0, 2.0, 23))
+        data.xaxis("Q", "1/A")
+        data.yaxis("I", "1/cm")
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "streamed.xml")
+            writer = StreamedReader()
+            writer.write_chunk = 5
+            writer.write(path, data)
+            self.assertIsNone(writer._streamed_idata)
+            doc = etree.fromstring(documents[0])
+            self.assertEqual(len(doc.findall(".//{*}SASdata")), 1)
+            self.assertEqual(doc.findall(".//{*}Idata"), [])
+            written = Reader().read(path)[0]
+            np.testing.assert_array_equal(written.x, data.x)
+            np.testing.assert_array_equal(written.y, data.y)
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_processing_instructions(self):
         reader = XMLreader(self.isis_1_1, self.schema_1_1)
         valid = reader.validate_xml()
@@ -314,6 +382,62 @@ class cansas_reader_hdf5(unittest.TestCase):
             else:
                 self._check_2d_data(data)
 
+    def test_multi_frame(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "frames.h5")
+            rng = np.random.RandomState(5)
+            q = np.linspace(0.001, 0.1, 20)
+            i_1d = rng.uniform(1.0, 2.0, (6, 20))
+            qx, qy = np.meshgrid(np.linspace(-0.1, 0.1, 8),
+                                 np.linspace(-0.1, 0.1, 7))
+            i_2d = rng.uniform(1.0, 2.0, (6, 7, 8))
+            with h5py.File(path, 'w') as f:
+                entry = f.create_group("sasentry01")
+                entry.attrs["canSAS_class"] = "SASentry"
+                entry["title"] = "frames"
+                data_1d = entry.create_group("sasdata01")
+                data_1d.attrs["canSAS_class"] = "SASdata"
+                data_1d.attrs["I_axes"] = "Time,Q"
+                data_1d.attrs["Q_indices"] = 1
+                data_1d["Q"] = q
+                data_1d["I"] = i_1d
+                data_1d["I"].attrs["uncertainties"] = "Idev"
+                data_1d["Idev"] = 0.1*i_1d
+                data_2d = entry.create_group("sasdata02")
+                data_2d.attrs["canSAS_class"] = "SASdata"
+                data_2d.attrs["I_axes"] = "Time,Q,Q"
+                data_2d.attrs["Q_indices"] = [1, 2]
+                data_2d["Q"] = np.array([qx, qy])
+                data_2d["I"] = i_2d
+
+            reader = cansas_reader_HDF5.Reader()
+            data = reader.read(path)
+            data_1d = [d for d in data if isinstance(d, Data1D)]
+            data_2d = [d for d in data if isinstance(d, Data2D)]
+            self.assertEqual(len(data_1d), 6)
+            self.assertEqual(len(data_2d), 6)
+            for frame in range(6):
+                np.testing.assert_array_equal(data_1d[frame].y, i_1d[frame])
+                np.testing.assert_array_equal(data_1d[frame].dy,
+                                              0.1*i_1d[frame])
+                np.testing.assert_array_equal(data_2d[frame].data,
+                                              i_2d[frame].flatten())
+                np.testing.assert_array_equal(data_2d[frame].qx_data,
+                                              qx.flatten())
+
+            for frames, expected in ((4, [4]), ([0, -1], [0, 5]),
+                                     (slice(1, None, 2), [1, 3, 5])):
+                data = reader.read(path, frames=frames)
+                self.assertEqual(len(data), 2*len(expected))
+                y = [d.y for d in data if isinstance(d, Data1D)]
+                np.testing.assert_array_equal(y, i_1d[expected])
+                images = [d.data for d in data if isinstance(d, Data2D)]
+                np.testing.assert_array_equal(
+                    images, i_2d[expected].reshape(len(expected), -1))
+        finally:
+            shutil.rmtree(tmpdir)
+
     def _check_multiple_data(self, data):
         self.assertEqual(data.title, "MH4_5deg_16T_SLOW")
         self.assertEqual(data.run[0], '33837')
@@ -0,0 +1,235 @@
+"""
+Regression tests of the array based Data1D and Data2D arithmetic
+against the original point by point implementation.
+"""
+
+import math
+import unittest
+import numpy as np
+
+from sas.sascalc.data_util.uncertainty import Uncertainty
+from sas.sascalc.dataloader.data_info import Data1D, Data2D
+
+OPERATIONS = [
+    lambda a, b: a + b,
+    lambda a, b: b + a,
+    lambda a, b: a - b,
+    lambda a, b: b - a,
+    lambda a, b: a * b,
+    lambda a, b: b * a,
+    lambda a, b: a / b,
+    lambda a, b: b / a,
+]
+
+# The loops square numpy scalars with pow(), which may be off by one ulp
+RTOL = 1e-15
+
+
+def combine(dq, dq_self, dq_other):
+    """
+    Point by point combination of resolutions
+    """
+    dq *= dq_self
+    dq += dq_other**2
+    dq /= 2
+    return math.sqrt(dq)
+
+
+def operation_1d(data, other, operation):
+    """
+    Point by point Data1D._perform_operation
+    """
+    x = np.array(data.x, dtype=float)
+    y = np.zeros(len(data.x))
+    dy = np.zeros(len(data.x))
+    dx = np.array(data.dx, dtype=float)
+    dxl = None if data.dxl is None else np.array(data.dxl, dtype=float)
+    for i in range(len(data.x)):
+        a = Uncertainty(data.y[i], data.dy[i]**2)
+        if isinstance(other, Data1D):
+            b = Uncertainty(other.y[i], other.dy[i]**2)
+            if other.dx is not None:
+                dx[i] = combine(dx[i], data.dx[i], other.dx[i])
+            if dxl is not None and other.dxl is not None:
+                dxl[i] = combine(dxl[i], data.dxl[i], other.dxl[i])
+        else:
+            b = other
+        output = operation(a, b)
+        y[i] = output.x
+        dy[i] = math.sqrt(math.fabs(output.variance))
+    return x, y, dy, dx, dxl
+
+
+def operation_2d(data, other, operation):
+    """
+    Point by point Data2D._perform_operation
+    """
+    values = np.zeros(len(data.data))
+    err = np.zeros(len(data.data))
+    dqx = np.array(data.dqx_data, dtype=float)
+    dqy = np.array(data.dqy_data, dtype=float)
+    for i in range(len(data.data)):
+        a = Uncertainty(data.data[i], data.err_data[i]**2)
+        if isinstance(other, Data2D):
+            b = Uncertainty(other.data[i], other.err_data[i]**2)
+            if other.dqx_data is not None:
+                dqx[i] = combine(dqx[i], data.dqx_data[i],
+                                 other.dqx_data[i])
+                dqy[i] = combine(dqy[i], data.dqy_data[i],
+                                 other.dqy_data[i])
+        else:
+            b = other
+        output = operation(a, b)
+        values[i] = output.x
+        err[i] = math.sqrt(math.fabs(output.variance))
+    return values, err, dqx, dqy
+
+
+class DataOperations(unittest.TestCase):
+    """
+        Compare the data arithmetic with the point by point loops
+    """
+
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        n = 200
+        x = np.linspace(0.001, 0.5, n)
+        self.data1 = Data1D(x=x, y=rng.uniform(1, 100, n),
+                            dx=rng.uniform(0, 0.01, n),
+                            dy=rng.uniform(0, 1, n))
+        self.data1.dxl = rng.uniform(0, 0.1, n)
+        self.data1.dxw = rng.uniform(0, 0.1, n)
+        self.data2 = Data1D(x=x*1.001, y=rng.uniform(-10, 10, n),
+                            dx=rng.uniform(0, 0.01, n),
+                            dy=rng.uniform(0, 1, n))
+        self.data2.dxl = rng.uniform(0, 0.1, n)
+        # a zero denominator
+        self.data2.y[5] = 0.0
+
+        n = 32*32
+        qx, qy = np.meshgrid(np.linspace(-0.1, 0.1, 32),
+                             np.linspace(-0.1, 0.1, 32))
+        qx, qy = qx.ravel(), qy.ravel()
+        self.image1 = Data2D(data=rng.uniform(1, 100, n),
+                             err_data=rng.uniform(0, 1, n),
+                             qx_data=qx, qy_data=qy,
+                             q_data=np.sqrt(qx**2 + qy**2),
+                             mask=rng.uniform(size=n) > 0.1,
+                             dqx_data=rng.uniform(0, 0.01, n),
+                             dqy_data=rng.uniform(0, 0.01, n))
+        self.image2 = Data2D(data=rng.uniform(-10, 10, n),
+                             err_data=rng.uniform(0, 1, n),
+                             qx_data=qx, qy_data=qy,
+                             q_data=np.sqrt(qx**2 + qy**2),
+                             mask=np.ones(n, dtype=bool),
+                             dqx_data=rng.uniform(0, 0.01, n),
+                             dqy_data=rng.uniform(0, 0.01, n))
+
+    def test_1d(self):
+        """
+            Test operations between Data1D and with scalars
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for operation in OPERATIONS:
+                for other in (self.data2, 3.0, 2):
+                    result = self.data1._perform_operation(other, operation)
+                    x, y, dy, dx, dxl = operation_1d(self.data1, other,
+                                                     operation)
+                    np.testing.assert_array_equal(result.x, x)
+                    np.testing.assert_allclose(result.y, y, rtol=RTOL)
+                    np.testing.assert_allclose(result.dy, dy, rtol=RTOL)
+                    np.testing.assert_allclose(result.dx, dx, rtol=RTOL)
+                    np.testing.assert_allclose(result.dxl, dxl, rtol=RTOL)
+                    np.testing.assert_array_equal(result.dxw, self.data1.dxw)
+
+        result = self.data1 - self.data2
+        np.testing.assert_array_equal(result.y, self.data1.y - self.data2.y)
+
+    def test_2d(self):
+        """
+            Test operations between Data2D and with scalars
+        """
+        for operation in OPERATIONS:
+            for other in (self.image2, 3.0):
+                result = self.image1._perform_operation(other, operation)
+                data, err, dqx, dqy = operation_2d(self.image1, other,
+                                                   operation)
+                np.testing.assert_allclose(result.data, data, rtol=RTOL)
+                np.testing.assert_allclose(result.err_data, err, rtol=RTOL)
+                np.testing.assert_allclose(result.dqx_data, dqx, rtol=RTOL)
+                np.testing.assert_allclose(result.dqy_data, dqy, rtol=RTOL)
+                np.testing.assert_array_equal(result.qx_data,
+                                              self.image1.qx_data)
+                np.testing.assert_array_equal(result.mask, self.image1.mask)
+
+    def test_incompatible(self):
+        """
+            Test that data sets on other q values are refused
+        """
+        self.data2.x[-1] *= 1.1
+        self.assertRaises(ValueError, self.data1.__add__, self.data2)
+        self.image2.qy_data = self.image2.qy_data * 1.05
+        self.assertRaises(ValueError, self.image1.__sub__, self.image2)
+
+    def test_interpolate(self):
+        """
+            Test linear and log-log interpolation with error propagation
+        """
+        x = np.linspace(0.01, 0.2, 20)
+        data = Data1D(x=x, y=3*x + 1, dx=0.1*x, dy=np.full(20, 0.2))
+        middle = (x[1:] + x[:-1]) / 2
+        result = data.interpolate(middle)
+        np.testing.assert_allclose(result.x, middle)
+        np.testing.assert_allclose(result.y, 3*middle + 1)
+        np.testing.assert_allclose(result.dy, np.full(19, 0.2/np.sqrt(2)))
+        np.testing.assert_allclose(result.dx, 0.1*middle)
+        self.assertIsNone(result.dxl)
+        # at the data points
+        result = data.interpolate(x[::-1])
+        np.testing.assert_allclose(result.y, data.y[::-1])
+        np.testing.assert_allclose(result.dy, data.dy)
+
+        data = Data1D(x=x, y=x**-2, dy=0.1*x**-2)
+        result = data.interpolate(middle, scale='log')
+        np.testing.assert_allclose(result.y, middle**-2)
+        self.assertTrue(np.all(result.dy < 0.1*middle**-2))
+        self.assertTrue(np.all(result.dy > 0.1*middle**-2/np.sqrt(2)))
+
+        self.assertRaises(ValueError, data.interpolate, [0.001, 0.1])
+        self.assertRaises(ValueError, data.interpolate, middle, 'cubic')
+
+    def test_interpolated_operation(self):
+        """
+            Test operations between data sets on different x values
+        """
+        x = np.linspace(0.01, 0.5, 50)
+        buffer = Data1D(x=x, y=0.5*x + 2, dx=np.full(50, 0.01),
+                        dy=np.full(50, 0.1))
+        x_sample = np.linspace(0.005, 0.6, 80)
+        sample = Data1D(x=x_sample, y=np.full(80, 10.0),
+                        dx=np.full(80, 0.03), dy=np.full(80, 0.5))
+        self.assertRaises(ValueError, sample.__sub__, buffer)
+
+        sample.interpolation = 'linear'
+        result = sample - buffer
+        inside = (x_sample >= 0.01) & (x_sample <= 0.5)
+        np.testing.assert_array_equal(result.x, x_sample[inside])
+        np.testing.assert_allclose(result.y, 8.0 - 0.5*x_sample[inside])
+        np.testing.assert_allclose(result.dx, np.sqrt((0.03**2 + 0.01**2)/2))
+        self.assertTrue(np.all(result.dy > 0.5))
+        self.assertIsNone(result.interpolation)
+        # the operands are untouched
+        self.assertEqual(len(sample.x), 80)
+        self.assertEqual(len(buffer.x), 50)
+
+        # same x values are used as they are
+        buffer.interpolation = 'log'
+        result = buffer / buffer
+        np.testing.assert_allclose(result.y, np.ones(50))
+
+        far = Data1D(x=x + 1, y=x, dy=x)
+        self.assertRaises(ValueError, sample.__add__, far)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -76,6 +76,50 @@ class ExtensionRegistryTests(unittest.TestCase):
         err_msg = data.errors[0]
         self.assertTrue("does not fully meet the CanSAS v1.x specification" in err_msg)
 
+    def test_lazy_readers(self):
+        """
+        Check that the default readers are only created when used
+        """
+        loader = Loader()
+        xml_reader = loader.loaders['.xml'][0].__self__
+        txt_reader = loader.loaders['.txt'][0].__self__
+        self.assertFalse(hasattr(xml_reader._local, 'reader'))
+        self.assertFalse(hasattr(txt_reader._local, 'reader'))
+
+        loader.load(find("ascii_test_6.txt"))
+        self.assertTrue(hasattr(txt_reader._local, 'reader'))
+        self.assertFalse(hasattr(xml_reader._local, 'reader'))
+
+        # The wildcards and writers need all the readers
+        self.assertTrue(any(".xml" in card for card in loader.wildcards))
+        self.assertTrue(hasattr(xml_reader._local, 'reader'))
+        self.assertEqual(len(loader.lookup_writers("data.xml")), 1)
+
+    def test_load_many(self):
+        """
+        Load several files with threads and processes, keeping the
+        errors of the files that could not be loaded
+        """
+        paths = [self.valid_file, find("ascii_test_6.txt"),
+                 find("not_a_file.txt"), self.valid_file_wrong_unknown_ext]
+        serial = [self.loader.load(path) for path in paths if
+                  os.path.isfile(path)]
+        for executor in ('thread', 'process'):
+            results = list(self.loader.load_many(paths, workers=2,
+                                                 executor=executor))
+            self.assertEqual([path for path, _, _ in results], paths)
+            self.assertIsNone(results[2][1])
+            self.assertTrue(isinstance(results[2][2], Exception))
+            loaded = [data for _, data, _ in results if data is not None]
+            self.assertEqual(len(loaded), len(serial))
+            for data, expected in zip(loaded, serial):
+                self.assertTrue(np.all(data[0].y == expected[0].y))
+        unordered = self.loader.load_many(paths, workers=3, ordered=False)
+        self.assertEqual(sorted(path for path, _, _ in unordered),
+                         sorted(paths))
+        self.assertRaises(ValueError, self.loader.load_many, paths,
+                          executor='fork')
+
     def tearDown(self):
         if os.path.isfile(self.valid_file_wrong_known_ext):
             os.remove(self.valid_file_wrong_known_ext)
@@ -5,9 +5,13 @@ import warnings
 warnings.simplefilter("ignore")
 
 import unittest
+import numpy as np
 from sas.sascalc.dataloader.loader import  Loader
+from sas.sascalc.dataloader.readers.red2d_reader import Reader
 
 import os.path
+import shutil
+import tempfile
 
 
 def find(filename):
@@ -35,6 +39,41 @@ class abs_reader(unittest.TestCase):
 
         self.assertEqual(f.meta_data['loader'],"IGOR/DAT 2D Q_map")
 
+    def test_non_numbers(self):
+        """
+            Test that non numbers in the data are read as zeros
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "non_numbers.dat")
+            with open(path, 'w') as fid:
+                fid.write("Data columns Qx - Qy - I(Qx,Qy)\n\nASCII data\n")
+                fid.write("0.1 0.1 1.0\n0.2 0.1 --\n")
+                fid.write("0.1\t0.2 3.0\n0.2 0.2 4.0\n")
+            f = Reader().read(path)[0]
+            np.testing.assert_array_equal(f.data, [1.0, 0.0, 3.0, 4.0])
+            np.testing.assert_array_equal(f.qy_data, [0.1, 0.1, 0.2, 0.2])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_write(self):
+        """
+            Test that the data written in chunks is read back
+        """
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "written.dat")
+            writer = Reader()
+            writer.write_chunk = 1000
+            writer.write(path, self.data_list[0])
+            f = Reader().read(path)[0]
+            np.testing.assert_allclose(f.data, self.data_list[0].data,
+                                       rtol=1e-5)
+            np.testing.assert_allclose(f.qx_data, self.data_list[0].qx_data,
+                                       rtol=1e-5)
+        finally:
+            shutil.rmtree(tmpdir)
+
 
 if __name__ == '__main__':
     unittest.main()
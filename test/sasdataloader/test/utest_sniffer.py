@@ -0,0 +1,92 @@
+"""
+    Unit tests for the file format sniffer
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from sas.sascalc.dataloader import sniffer
+from sas.sascalc.dataloader.loader import Registry as Loader
+from sas.sascalc.dataloader.loader_exceptions import NoKnownLoaderException
+
+
+def find(filename):
+    return os.path.join(os.path.dirname(__file__), filename)
+
+
+class SnifferTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def copy(self, filename, new_name):
+        path = os.path.join(self.tmpdir, new_name)
+        shutil.copyfile(filename, path)
+        return path
+
+    def test_known_files(self):
+        """
+        Check the format found for the test data files
+        """
+        expected = {
+            "cansas1d.xml": 'cansas',
+            "ISIS_1_1.xml": 'cansas',
+            "jan08002.ABS": 'abs',
+            "sam14_cor.ABS": 'abs',
+            "exp18_14_igor_2dqxqy.dat": 'red2d',
+            "MP_New.sans": 'danse',
+            os.path.join("sesans_examples", "sphere2micron.ses"): 'sesans',
+            os.path.join("test_data", "MAR07232_rest.h5"): 'hdf5',
+            os.path.join("..", "..", "fileconverter", "test", "Z83000.QAX"): 'bsl',
+            "S2-30dq.d1d": None,
+            "test_3_columns.txt": None,
+            "corrupt.png": None,
+        }
+        for filename, file_format in expected.items():
+            self.assertEqual(sniffer.sniff(find(filename)), file_format,
+                             filename)
+
+    def test_signatures(self):
+        """
+        Check the binary signatures
+        """
+        signature = sniffer.HDF5_SIGNATURE
+        self.assertEqual(sniffer.sniff_header(signature + b'\x00' * 8), 'hdf5')
+        self.assertEqual(sniffer.sniff_header(b'\x00' * 512 + signature),
+                         'hdf5')
+        self.assertEqual(sniffer.sniff_header(b'II*\x00\x08\x00'), 'tiff')
+        self.assertEqual(sniffer.sniff_header(b'MM\x00*\x00\x08'), 'tiff')
+        self.assertEqual(sniffer.sniff_header(b'<?xml version="1.0"?><a/>'),
+                         None)
+        self.assertEqual(sniffer.sniff_header(b''), None)
+
+    def test_load_renamed_files(self):
+        """
+        Load files whose extension does not match their contents
+        """
+        loader = Loader()
+        correct = loader.load(find("jan08002.ABS"))[0]
+        renamed = loader.load(self.copy(find("jan08002.ABS"), "data.xyz"))[0]
+        self.assertEqual(renamed.x.tolist(), correct.x.tolist())
+        self.assertEqual(renamed.y.tolist(), correct.y.tolist())
+
+        correct = loader.load(find("MP_New.sans"))[0]
+        renamed = loader.load(self.copy(find("MP_New.sans"), "MP_New.xyz"))[0]
+        self.assertEqual(renamed.data.tolist(), correct.data.tolist())
+
+    def test_bsl_header(self):
+        """
+        BSL/OTOKO header files point to the file converter
+        """
+        path = find(os.path.join("..", "..", "fileconverter", "test",
+                                 "Z83000.QAX"))
+        self.assertRaises(NoKnownLoaderException, Loader().load, path)
+
+
+if __name__ == '__main__':
+    unittest.main()
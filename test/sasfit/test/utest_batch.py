@@ -0,0 +1,175 @@
+"""
+    Unit tests for the parallel batch fitting support
+"""
+
+import time
+import unittest
+from multiprocessing import Event
+
+import numpy as np
+
+from bumps.options import FIT_CONFIG
+from sasmodels.sasview_model import load_standard_models, MultiplicationModel
+
+from sas.sascalc.dataloader.data_info import Data1D
+from sas.sascalc.fit.BumpsFitting import (BumpsFit, get_fit_options,
+                                          set_fit_options)
+from sas.sascalc.fit import batch
+from sas.sascalc.fit.batch import (dumps, loads, find_model_class,
+                                   fit_batch)
+
+
+class BatchPickleTests(unittest.TestCase):
+
+    def setUp(self):
+        models = dict((m.name, m) for m in load_standard_models())
+        self.model = models['sphere']()
+        self.model.setParam('radius', 45.0)
+        self.model.dispersion['radius']['width'] = 0.1
+        x = np.linspace(0.001, 0.3, 50)
+        self.data = Data1D(x=x, y=self.model.evalDistribution(x),
+                           dy=np.full(50, 0.1))
+
+    def test_model(self):
+        """
+        Models are rebuilt from the model registry with their state
+        """
+        copy = loads(dumps(self.model))
+        self.assertIs(copy.__class__, self.model.__class__)
+        self.assertIsNot(copy, self.model)
+        self.assertEqual(copy.getParam('radius'), 45.0)
+        self.assertEqual(copy.dispersion['radius']['width'], 0.1)
+        np.testing.assert_array_equal(copy.evalDistribution(self.data.x),
+                                      self.data.y)
+        # a model referred to twice is unpickled once
+        first, second = loads(dumps([self.model, self.model]))
+        self.assertIs(first, second)
+
+    def test_product_model(self):
+        """
+        Product models are rebuilt from their form and structure factors
+        """
+        models = dict((m.name, m) for m in load_standard_models())
+        model = MultiplicationModel(self.model, models['hardsphere']())
+        model.setParam('radius_effective', 60.0)
+        first, second = loads(dumps(model)), loads(dumps(model))
+        self.assertIs(first.__class__, second.__class__)
+        self.assertEqual(first.getParam('radius_effective'), 60.0)
+        np.testing.assert_array_equal(first.evalDistribution(self.data.x),
+                                      model.evalDistribution(self.data.x))
+
+    def test_fitter(self):
+        """
+        Fitters keep their models and data
+        """
+        fitter = BumpsFit()
+        fitter.set_model(self.model, 0, pars=['radius', 'scale'])
+        fitter.set_data(self.data, 0, qmin=0.001, qmax=0.3)
+        fitter.select_problem_for_fit(0, 1)
+        copy = loads(dumps(fitter))
+        arrange = copy.fit_arrange_dict[0]
+        self.assertEqual(arrange.get_model().model.getParam('radius'), 45.0)
+        np.testing.assert_array_equal(arrange.get_data().y, self.data.y)
+
+    def test_unknown_model(self):
+        self.assertRaises(ValueError, find_model_class, 'no_such_model', None)
+
+
+class FakeResult(object):
+    """
+    Result of FakeFitter
+    """
+    def __init__(self, value):
+        self.value = value
+        self.success = True
+
+
+class FakeFitter(object):
+    """
+    Fitter taking delay seconds, or until it is stopped
+    """
+    fit_arrange_dict = {}
+
+    def __init__(self, value, delay):
+        self.value = value
+        self.delay = delay
+
+    def fit(self, handler=None, curr_thread=None, reset_flag=False):
+        # Like BumpsFit, return the current state when stopped
+        end = time.time() + self.delay
+        while time.time() < end:
+            try:
+                curr_thread.isquit()
+            except KeyboardInterrupt:
+                break
+            time.sleep(0.01)
+        return [FakeResult(self.value)]
+
+
+class StopAfter(object):
+    """
+    Fit thread stopped after some results
+    """
+    def __init__(self, results):
+        self.results = results
+        self.count = 0
+
+    def isquit(self):
+        if self.count >= self.results:
+            raise KeyboardInterrupt("Fitting: terminated by the user.")
+
+
+class FitBatchTests(unittest.TestCase):
+
+    def setUp(self):
+        self.fit_id = FIT_CONFIG.selected_id
+        self.amoeba = dict(FIT_CONFIG.values['amoeba'])
+        set_fit_options('amoeba', {})
+
+    def tearDown(self):
+        FIT_CONFIG.values['amoeba'] = self.amoeba
+        FIT_CONFIG.selected_id = self.fit_id
+        batch._abort_event = None
+
+    def test_order(self):
+        """
+        Results come in the order of the fitters, as soon as they are done
+        """
+        fitters = [FakeFitter(0, 0.5), FakeFitter(1, 0.0), FakeFitter(2, 0.0)]
+        start = time.time()
+        values = []
+        for result in fit_batch(fitters, workers=2):
+            values.append((result[0].value, time.time() - start))
+        self.assertEqual([value for value, _ in values], [0, 1, 2])
+        # the first fit doesn't hold the second worker
+        self.assertLess(values[-1][1], 1.0)
+
+    def test_abort(self):
+        """
+        Stopping the fit thread stops the running fits
+        """
+        fitters = [FakeFitter(0, 0.0), FakeFitter(1, 60.0),
+                   FakeFitter(2, 60.0)]
+        thread = StopAfter(1)
+        start = time.time()
+        values = []
+        with self.assertRaises(KeyboardInterrupt):
+            for result in fit_batch(fitters, workers=2, curr_thread=thread):
+                values.append(result[0].value)
+                thread.count += 1
+        self.assertEqual(values, [0])
+        self.assertLess(time.time() - start, 30.0)
+
+    def test_fit_options(self):
+        """
+        Workers use the optimizer selected in the parent process
+        """
+        options = dict(get_fit_options()[1], steps=7)
+        batch._init_worker(Event(), ('de', {}))
+        self.assertEqual(get_fit_options()[0], 'de')
+        batch._init_worker(Event(), ('amoeba', options))
+        self.assertEqual(get_fit_options(), ('amoeba', options))
+
+
+if __name__ == '__main__':
+    unittest.main()
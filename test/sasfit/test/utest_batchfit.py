@@ -0,0 +1,122 @@
+"""
+    Unit tests for the batch fitting without the GUI
+"""
+
+import os
+import csv
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from sas.sascalc.fit.AbstractFitEngine import FResult
+from sas.sascalc.fit import batchfit
+
+
+def find(filename):
+    return os.path.join(os.path.dirname(__file__), filename)
+
+
+DATA_FILE = find(os.path.join("..", "..", "sasinvariant", "test",
+                              "latex_smeared.xml"))
+
+
+class BatchFitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.state = batchfit.load_page(find("fitstate.fitv"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_find_files(self):
+        """
+        Glob patterns are expanded in order
+        """
+        for name in ("b.xml", "a.xml", "c.txt"):
+            open(os.path.join(self.tmpdir, name), 'w').close()
+        files = batchfit.find_files([os.path.join(self.tmpdir, "*.xml"),
+                                     os.path.join(self.tmpdir, "c.txt")])
+        self.assertEqual([os.path.basename(f) for f in files],
+                         ["a.xml", "b.xml", "c.txt"])
+        self.assertRaises(ValueError, batchfit.find_files,
+                          [os.path.join(self.tmpdir, "*.h5")])
+
+    def test_make_fitters(self):
+        """
+        Each data set gets a fitter set up as the fit page
+        """
+        datasets = batchfit.load_data([DATA_FILE, DATA_FILE])
+        self.assertEqual([name for name, _ in datasets],
+                         ["latex_smeared.xml:0", "latex_smeared.xml:1"] * 2)
+        fitters = batchfit.make_fitters(self.state, datasets)
+        self.assertEqual(len(fitters), 4)
+        models = set()
+        for fit_id, fitter in enumerate(fitters):
+            self.assertEqual(fitter.fitter_id, fit_id)
+            arrange = fitter.fit_arrange_dict[fit_id]
+            self.assertEqual(arrange.pars, ['scale', 'background', 'sld',
+                                            'sld_solvent', 'radius'])
+            self.assertEqual(arrange.vals[-1], 2462.1)
+            data = arrange.get_data()
+            self.assertEqual(data.get_fit_range(),
+                             (self.state.qmin, self.state.qmax))
+            self.assertIsNotNone(data.smearer)
+            np.testing.assert_array_equal(data.y,
+                                          datasets[fit_id][1].y)
+            models.add(id(arrange.get_model().model))
+        self.assertEqual(len(models), 1)
+
+        fitter = batchfit.make_fitters(self.state, datasets[:1],
+                                       sparse_tolerance=1e-4)[0]
+        smearer = fitter.fit_arrange_dict[0].get_data().smearer
+        self.assertEqual(smearer.sparse_tolerance, 1e-4)
+
+    def test_write(self):
+        """
+        Write parameter tables and fit curves
+        """
+        names = ["a.xml", "b.xml"]
+        results = []
+        for k, success in enumerate([True, False]):
+            fitter = batchfit.make_fitters(
+                self.state, batchfit.load_data([DATA_FILE])[1:])[0]
+            arrange = fitter.fit_arrange_dict[0]
+            data = arrange.get_data()
+            result = FResult(model=arrange.get_model().model, data=data,
+                             param_list=['scale', 'radius'])
+            result.success = success
+            result.fitness = 1.5
+            result.pvec = np.array([1.0, 100.0 + k])
+            result.stderr = np.array([0.1, 2.0])
+            result.index = data.idx
+            result.theory = data.y[data.idx] * 1.1
+            result.residuals = np.ones(np.sum(data.idx))
+            results.append(result)
+
+        path = os.path.join(self.tmpdir, "table.csv")
+        batchfit.write_csv(path, names, results)
+        with open(path) as fid:
+            rows = list(csv.reader(fid))
+        self.assertEqual(rows[0], ["Data", "Chi2", "scale", "error on scale",
+                                   "radius", "error on radius"])
+        self.assertEqual(rows[1], ["a.xml", "1.5", "1.0", "0.1", "100.0",
+                                   "2.0"])
+        self.assertEqual(rows[2], ["b.xml"] + ["nan"] * 5)
+        curve = np.loadtxt(os.path.join(self.tmpdir, "a.xml_fit.txt"))
+        np.testing.assert_allclose(curve[:, 3], results[0].theory)
+
+        path = os.path.join(self.tmpdir, "table.h5")
+        batchfit.write_hdf5(path, names, results)
+        import h5py
+        with h5py.File(path, 'r') as fid:
+            np.testing.assert_array_equal(fid["parameters/radius"][()],
+                                          [100.0, np.NaN])
+            np.testing.assert_array_equal(fid["fits/b.xml/I_fit"][()],
+                                          results[1].theory)
+
+
+if __name__ == '__main__':
+    unittest.main()
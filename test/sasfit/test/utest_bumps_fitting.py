@@ -0,0 +1,91 @@
+"""
+    Unit tests for the bumps fitness of SAS models
+"""
+
+import unittest
+import numpy as np
+
+from sasmodels.sasview_model import load_standard_models
+
+from sas.sascalc.fit.AbstractFitEngine import FitData1D, FResult, Model
+from sas.sascalc.fit.BumpsFitting import SasFitness
+
+
+class CountingModel(object):
+    """
+    Model wrapper counting the evaluations
+    """
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def evalDistribution(self, q):
+        self.calls += 1
+        return self.model.evalDistribution(q)
+
+
+class SasFitnessCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        models = dict((m.name, m) for m in load_standard_models())
+        self.model = CountingModel(models['sphere']())
+        x = np.linspace(0.001, 0.3, 100)
+        data = FitData1D(x=x, y=np.ones(100), dy=np.full(100, 0.1))
+        data.set_fit_range(0.01, 0.2)
+        self.fitness = SasFitness(model=Model(self.model, data), data=data,
+                                  fitted=['radius', 'scale'])
+
+    def evaluate(self, radius):
+        self.fitness.parameters()['radius'].value = radius
+        self.fitness.update()
+        return self.fitness.residuals().copy()
+
+    def test_cache(self):
+        """
+        Parameter vectors already visited are not evaluated again
+        """
+        first = self.evaluate(50.0)
+        theory = self.fitness.theory().copy()
+        second = self.evaluate(60.0)
+        self.assertEqual(self.model.calls, 2)
+        np.testing.assert_array_equal(self.evaluate(50.0), first)
+        np.testing.assert_array_equal(self.fitness.theory(), theory)
+        self.assertEqual(self.model.calls, 2)
+        self.assertEqual((self.fitness.cache_hits,
+                          self.fitness.cache_misses), (1, 2))
+        # any parameter is part of the key
+        self.fitness.parameters()['scale'].value = 2.0
+        self.assertFalse(np.array_equal(self.evaluate(60.0), second))
+        self.assertEqual(self.model.calls, 3)
+
+    def test_cache_size(self):
+        """
+        The least recently used parameter vectors are dropped
+        """
+        entry = 2*8*self.fitness.numpoints()
+        self.fitness.cache_bytes = 2*entry
+        for radius in (10.0, 20.0, 30.0, 20.0, 10.0):
+            self.evaluate(radius)
+        self.assertEqual((self.fitness.cache_hits,
+                          self.fitness.cache_misses), (1, 4))
+        self.assertEqual(self.model.calls, 4)
+        self.assertEqual(self.fitness._cache_nbytes, 2*entry)
+
+        self.fitness.cache_bytes = 0
+        self.evaluate(30.0)
+        self.evaluate(30.0)
+        self.assertEqual(self.fitness.cache_misses, 6)
+        self.assertEqual(self.fitness._cache_nbytes, 0)
+
+    def test_result(self):
+        result = FResult()
+        self.assertEqual(result.cache_hit_rate(), 0.0)
+        result.cache_hits, result.cache_misses = 3, 9
+        self.assertEqual(result.cache_hit_rate(), 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
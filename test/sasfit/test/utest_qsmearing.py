@@ -0,0 +1,165 @@
+"""
+    Unit tests for the resolution smearing of fits
+"""
+
+import unittest
+
+import numpy as np
+
+from sasmodels.sasview_model import load_standard_models
+from sasmodels.resolution2d import Pinhole2D
+
+from sas.sascalc.dataloader.data_info import Data1D, Data2D
+from sas.sascalc.fit.batch import dumps, loads
+from sas.sascalc.fit.qsmearing import smear_selection
+
+
+class PySmear2DTests(unittest.TestCase):
+
+    def setUp(self):
+        models = dict((m.name, m) for m in load_standard_models())
+        self.model = models['sphere']()
+        self.model.setParam('radius', 60.0)
+        qx, qy = np.meshgrid(np.linspace(-0.1, 0.1, 24),
+                             np.linspace(-0.1, 0.1, 24))
+        qx, qy = qx.ravel(), qy.ravel()
+        q = np.sqrt(qx**2 + qy**2)
+        self.data = Data2D(data=np.ones_like(q), err_data=np.ones_like(q),
+                           qx_data=qx, qy_data=qy, q_data=q,
+                           dqx_data=0.05*q, dqy_data=0.02*q,
+                           mask=np.ones_like(q, dtype=bool))
+        self.smearer = smear_selection(self.data, self.model)
+        self.smearer.set_model(self.model)
+        self.index = q < 0.08
+
+    def expected(self, index, accuracy='Low'):
+        res = Pinhole2D(data=self.data, index=index, nsigma=3.0,
+                        accuracy=accuracy)
+        return res.apply(self.model.evalDistribution(res.q_calc))
+
+    def test_resolution_reuse(self):
+        """
+        The resolution is rebuilt only when its inputs change
+        """
+        smearer = self.smearer
+        smearer.set_index(self.index)
+        first = smearer.get_value()
+        res = smearer.get_resolution()
+        np.testing.assert_array_equal(first, self.expected(self.index))
+
+        self.model.setParam('radius', 80.0)
+        np.testing.assert_array_equal(smearer.get_value(),
+                                      self.expected(self.index))
+        self.assertIs(smearer.get_resolution(), res)
+        # same mask in a new array
+        smearer.set_index(self.index.copy())
+        self.assertIs(smearer.get_resolution(), res)
+
+        # mask changed in place
+        smearer.index[np.flatnonzero(smearer.index)[:10]] = False
+        self.assertIsNot(smearer.get_resolution(), res)
+        np.testing.assert_array_equal(smearer.get_value(),
+                                      self.expected(smearer.index))
+
+        res = smearer.get_resolution()
+        smearer.set_accuracy('High')
+        self.assertIsNot(smearer.get_resolution(), res)
+        np.testing.assert_array_equal(
+            smearer.get_value(), self.expected(smearer.index, 'High'))
+
+        res = smearer.get_resolution()
+        self.data.dqx_data = 0.01*self.data.q_data
+        self.assertIsNot(smearer.get_resolution(), res)
+
+    def test_pickle(self):
+        """
+        The resolution is not pickled with the smearer
+        """
+        self.smearer.set_index(self.index)
+        self.smearer.get_value()
+        copy = loads(dumps(self.smearer))
+        self.assertIsNone(copy._resolution)
+        self.assertIsNotNone(self.smearer._resolution)
+
+
+class CountingModel(object):
+    """
+    Model wrapper counting the evaluated points
+    """
+    def __init__(self, model):
+        self.model = model
+        self.params = model.params
+        self.dispersion = model.dispersion
+        self.points = 0
+
+    def evalDistribution(self, q):
+        self.points += len(q)
+        return self.model.evalDistribution(q)
+
+
+class PySmearTests(unittest.TestCase):
+
+    def setUp(self):
+        models = dict((m.name, m) for m in load_standard_models())
+        self.model = models['sphere']()
+        self.model.setParam('radius', 500.0)
+        n = 300
+        self.q = np.logspace(-3, -0.5, n)
+        self.pinhole = Data1D(x=self.q, y=np.ones(n), dx=0.05*self.q)
+        self.slit = Data1D(x=self.q, y=np.ones(n))
+        self.slit.dxl = np.full(n, 0.01)
+        self.slit.dxw = np.zeros(n)
+
+    def smear(self, smearer, first, last):
+        iq = np.zeros(len(self.q))
+        iq[first:last+1] = self.model.evalDistribution(self.q[first:last+1])
+        return smearer(iq, first, last)[first:last+1]
+
+    def test_sparse(self):
+        """
+        Sparse resolutions match the dense ones on the fitted range
+        """
+        for data in (self.pinhole, self.slit):
+            dense = smear_selection(data, self.model)
+            exact = smear_selection(data, self.model, sparse_tolerance=0.0)
+            truncated = smear_selection(data, self.model,
+                                        sparse_tolerance=0.01)
+            self.assertIsNone(dense.sparse_tolerance)
+            self.assertLessEqual(truncated._weights.nnz, exact._weights.nnz)
+            for first, last in ((0, 299), (50, 200)):
+                expected = self.smear(dense, first, last)
+                np.testing.assert_allclose(self.smear(exact, first, last),
+                                           expected, rtol=1e-12)
+                np.testing.assert_allclose(
+                    self.smear(truncated, first, last), expected, rtol=1e-2)
+
+        # the slit weights have long tails
+        self.assertLess(truncated._weights.nnz, exact._weights.nnz)
+        truncated.set_sparse(None)
+        self.assertIsNone(truncated._weights)
+        np.testing.assert_array_equal(self.smear(truncated, 50, 200),
+                                      self.smear(dense, 50, 200))
+
+    def test_outside_values(self):
+        """
+        The model is evaluated outside of the fitted range only where the
+        fitted points need it, and only when its parameters change
+        """
+        model = CountingModel(self.model)
+        smearer = smear_selection(self.pinhole, model, sparse_tolerance=1e-6)
+        self.smear(smearer, 100, 200)
+        outside = model.points
+        self.assertGreater(outside, 0)
+        self.assertLess(outside, len(smearer.resolution.q_calc) - 101)
+        self.smear(smearer, 100, 200)
+        self.assertEqual(model.points, outside)
+        self.model.setParam('radius', 400.0)
+        expected = self.smear(smear_selection(self.pinhole, self.model),
+                              100, 200)
+        np.testing.assert_allclose(self.smear(smearer, 100, 200), expected,
+                                   rtol=1e-6)
+        self.assertEqual(model.points, 2*outside)
+
+
+if __name__ == '__main__':
+    unittest.main()